@@ -0,0 +1,150 @@
+# declarative auto-approval policy for outbound sends, with an audit log
+import os
+import json
+import time
+import fnmatch
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+ACCEPT = "accept"
+REVIEW = "review"
+REJECT = "reject"
+DECISIONS = (ACCEPT, REVIEW, REJECT)
+
+
+def recipients_of(action: str, args: Dict[str, Any]) -> List[str]:
+    """Every address a send would reach (phone numbers, Slack IDs or channels, email addresses)."""
+    if action == "send_emails_bulk":
+        return [str(m.get("recipient_email", "")) for m in args.get("messages", []) if isinstance(m, dict)]
+    if action == "broadcast_message":
+        return [str(r.get("address", "")) for r in args.get("recipients", []) if isinstance(r, dict)]
+    for key in ("recipient_email", "recipient", "recipient_id", "phone_number"):
+        if args.get(key):
+            return [str(args[key])]
+    return []
+
+
+def message_length(action: str, args: Dict[str, Any]) -> int:
+    """Length of the longest message body the send carries."""
+    if action == "send_emails_bulk":
+        return max((len(str(m.get("body", ""))) for m in args.get("messages", []) if isinstance(m, dict)), default=0)
+    return len(str(args.get("message") or args.get("body") or ""))
+
+
+class ApprovalPolicy:
+    """Decides pending sends from a JSON policy file: accept, reject or leave for human review.
+
+    The file holds a `default` decision and an ordered list of `rules`; the
+    first rule whose conditions all hold decides. Conditions: `tools` (glob
+    patterns), `recipients` (glob patterns on phone numbers, Slack IDs or
+    email addresses), `recipient_domains` (email domains), `max_length` and
+    `min_length` (characters), and `rate_limit` (`{"count": n, "seconds": s}`
+    recipients accepted per rule, after which the rule stops matching; a bulk
+    send counts once per recipient and never fits a window smaller than its
+    recipient list). Every recipient
+    of a multi-recipient send must satisfy the conditions. The file is
+    re-read when it changes; without one, every send goes to review.
+    """
+
+    def __init__(self, path: str, audit_path: str = ""):
+        self.path = path
+        self.audit_path = audit_path
+        self.default = REVIEW
+        self.rules: List[Dict[str, Any]] = []
+        self.stats = {ACCEPT: 0, REVIEW: 0, REJECT: 0}
+        self._mtime: Optional[float] = None
+        # (accepted at, recipients) per rate-limited rule
+        self._windows: Dict[int, Deque[Tuple[float, int]]] = {}
+        self._lock = threading.Lock()
+        self._maybe_reload()
+
+    def _maybe_reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            self.rules, self.default, self._mtime = [], REVIEW, None
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                policy = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"WARNING: Failed to load approval policy '{self.path}', every send needs review: {str(e)}")
+            self.rules, self.default, self._mtime = [], REVIEW, mtime
+            return
+        rules = [r for r in policy.get("rules", []) if isinstance(r, dict) and r.get("decision") in DECISIONS]
+        if len(rules) != len(policy.get("rules", [])):
+            print("WARNING: Ignoring approval policy rules without a valid decision (accept, review or reject)")
+        self.rules = rules
+        self.default = policy.get("default", REVIEW) if policy.get("default") in DECISIONS else REVIEW
+        self._windows = {}
+        self._mtime = mtime
+
+    def _matches(self, rule: Dict[str, Any], action: str, recipients: List[str], length: int) -> bool:
+        if rule.get("tools") and not any(fnmatch.fnmatchcase(action, pattern) for pattern in rule["tools"]):
+            return False
+        if "max_length" in rule and length > rule["max_length"]:
+            return False
+        if "min_length" in rule and length < rule["min_length"]:
+            return False
+        if rule.get("recipients"):
+            if not recipients or not all(any(fnmatch.fnmatchcase(r.lower(), pattern.lower()) for pattern in rule["recipients"]) for r in recipients):
+                return False
+        if rule.get("recipient_domains"):
+            domains = {d.lower().lstrip("@") for d in rule["recipient_domains"]}
+            if not recipients or not all("@" in r and r.rsplit("@", 1)[1].lower() in domains for r in recipients):
+                return False
+        return True
+
+    def _within_rate_limit(self, index: int, rule: Dict[str, Any], now: float, recipients: int) -> bool:
+        limit = rule.get("rate_limit")
+        if not limit:
+            return True
+        window = self._windows.setdefault(index, deque())
+        while window and now - window[0][0] >= limit.get("seconds", 3600):
+            window.popleft()
+        return sum(n for _, n in window) + recipients <= limit.get("count", 0)
+
+    def decide(self, action: str, args: Dict[str, Any], thread_id: str = "") -> Tuple[str, str]:
+        """Returns (decision, reason) for one pending send and records auto-decisions in the audit log."""
+        recipients = recipients_of(action, args)
+        length = message_length(action, args)
+        now = time.time()
+        weight = max(1, len(recipients))
+        with self._lock:
+            self._maybe_reload()
+            decision, name, reason = self.default, "default", "no rule matched"
+            for index, rule in enumerate(self.rules):
+                if not self._matches(rule, action, recipients, length):
+                    continue
+                if rule["decision"] == ACCEPT and not self._within_rate_limit(index, rule, now, weight):
+                    continue
+                decision, name = rule["decision"], rule.get("name", f"rule {index + 1}")
+                reason = rule.get("reason", f"matched '{name}'")
+                if decision == ACCEPT and rule.get("rate_limit"):
+                    self._windows[index].append((now, weight))
+                break
+            self.stats[decision] += 1
+        if decision != REVIEW:
+            self._audit({"ts": round(now, 3), "thread_id": thread_id, "action": action, "recipients": recipients, "message_length": length, "decision": decision, "rule": name, "reason": reason})
+        return decision, reason
+
+    def _audit(self, record: Dict[str, Any]):
+        if not self.audit_path:
+            return
+        try:
+            directory = os.path.dirname(self.audit_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.audit_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"WARNING: Failed to write approval audit log: {str(e)}")
+
+    def format_stats(self) -> str:
+        total = sum(self.stats.values())
+        if not total:
+            return "Approval policy: no sends decided"
+        return f"Approval policy: {self.stats[ACCEPT]} auto-accepted, {self.stats[REJECT]} auto-rejected, {self.stats[REVIEW]} sent to review"
@@ -0,0 +1,92 @@
+# background text-to-speech rendering outside the agent graph
+import json
+import asyncio
+from contextlib import suppress
+from typing import Callable, Dict, List, Optional, Tuple
+
+from mcp_pool import MCPSessionPool
+
+
+class AudioRenderQueue:
+    """Renders assistant replies to speech after they are shown, off the critical path.
+
+    Replies are queued per session; each worker takes whatever is waiting
+    (up to `batch_size`, collected for at most `batch_window` seconds), joins
+    the texts of the same session into one synthesis request and calls the
+    generate_audio MCP tool through the shared session pool.
+    """
+
+    def __init__(self, mcp_pool: MCPSessionPool, workers: int = 1, batch_size: int = 8, batch_window: float = 0.2, on_rendered: Optional[Callable[[str, str], None]] = None):
+        self.mcp_pool = mcp_pool
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.on_rendered = on_rendered
+        self.stats = {"queued": 0, "rendered": 0, "requests": 0, "failed": 0}
+        self._queue: "asyncio.Queue[Tuple[str, str]]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def enqueue(self, session: str, text: str):
+        if text and text.strip():
+            self.stats["queued"] += 1
+            self._queue.put_nowait((session, text.strip()))
+
+    async def _next_batch(self) -> List[Tuple[str, str]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.batch_window
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _render(self, session: str, text: str) -> str:
+        result = await self.mcp_pool.call_tool("generate_audio", "generate_audio", {"text": text})
+        outcome = " ".join(c.text for c in result.content if hasattr(c, "text"))
+        try:
+            payload = json.loads(outcome)
+        except ValueError:
+            payload = None
+        if isinstance(payload, dict) and payload.get("status") == "error":
+            raise RuntimeError(f"{payload.get('code')}: {payload.get('detail')}")
+        return outcome
+
+    async def _worker(self):
+        while True:
+            batch = await self._next_batch()
+            by_session: Dict[str, List[str]] = {}
+            for session, text in batch:
+                by_session.setdefault(session, []).append(text)
+            try:
+                for session, texts in by_session.items():
+                    self.stats["requests"] += 1
+                    try:
+                        outcome = await self._render(session, "\n\n".join(texts))
+                        self.stats["rendered"] += len(texts)
+                        if self.on_rendered:
+                            self.on_rendered(session, outcome)
+                    except Exception as e:
+                        self.stats["failed"] += len(texts)
+                        print(f"WARNING: Background audio rendering failed: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def close(self, drain_timeout: float = 10):
+        """Waits briefly for queued replies to be rendered, then stops the workers."""
+        if self._tasks:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
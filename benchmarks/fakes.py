@@ -0,0 +1,205 @@
+# local stand-ins for Groq, Tavily, Slack, SMTP and the chat model used by the offline benchmark
+import io
+import json
+import time
+import uuid
+import wave
+import asyncio
+import threading
+import socketserver
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+def _silent_wav(seconds: float = 0.2, rate: int = 8000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+class FakeServices:
+    """One local HTTP server answering the Slack Web API, Tavily search and Groq speech endpoints.
+
+    Each request sleeps for `latency` seconds to stand in for network time.
+    URLs: `{url}/slack/`, `{url}/tavily`, `{url}/groq`.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = Counter()
+        self._wav = _silent_wav()
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if services.latency:
+                    time.sleep(services.latency)
+                path = self.path.split("?", 1)[0]
+                services.requests[path] += 1
+                if path.startswith("/slack/"):
+                    method = path[len("/slack/"):]
+                    if method == "conversations.open":
+                        payload = {"ok": True, "channel": {"id": f"D{uuid.uuid4().hex[:10].upper()}"}}
+                    else:
+                        payload = {"ok": True, "ts": f"{time.time():.6f}"}
+                    return self._reply(200, json.dumps(payload).encode(), "application/json")
+                if path.startswith("/tavily"):
+                    try:
+                        query = json.loads(raw or b"{}").get("query", "")
+                    except ValueError:
+                        query = ""
+                    results = [
+                        {"title": f"Result {i} for {query}", "url": f"https://example.com/{i}", "content": f"Offline benchmark content {i} about {query}. " * 8, "score": 1 - i / 10}
+                        for i in range(5)
+                    ]
+                    return self._reply(200, json.dumps({"query": query, "results": results, "response_time": services.latency}).encode(), "application/json")
+                if path.startswith("/groq") and path.endswith("/audio/speech"):
+                    return self._reply(200, services._wav, "audio/wav")
+                return self._reply(404, b'{"error": "not found"}', "application/json")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class SMTPSink:
+    """Minimal SMTP server that accepts and counts messages without delivering them."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.delivered = 0
+        self._lock = threading.Lock()
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def _send(self, line: str):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                self._send("220 localhost offline SMTP sink")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode(errors="replace").strip().upper()
+                    if command.startswith(("EHLO", "HELO")):
+                        self._send("250-localhost")
+                        self._send("250-AUTH PLAIN LOGIN")
+                        self._send("250 8BITMIME")
+                    elif command.startswith("AUTH"):
+                        self._send("235 Authentication successful")
+                    elif command == "DATA":
+                        self._send("354 End data with <CR><LF>.<CR><LF>")
+                        while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                            pass
+                        if sink.latency:
+                            time.sleep(sink.latency)
+                        with sink._lock:
+                            sink.delivered += 1
+                        self._send("250 OK queued")
+                    elif command == "QUIT":
+                        self._send("221 Bye")
+                        return
+                    elif command.startswith(("MAIL", "RCPT", "NOOP", "RSET")):
+                        self._send("250 OK")
+                    else:
+                        self._send("502 Command not implemented")
+
+        socketserver.ThreadingTCPServer.daemon_threads = True
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# Request keyword -> (tool, args) the scripted model calls; checked in order
+SCRIPT = [
+    ("search the web", "internet_search", {"query": "Nigerian labour law changes", "max_results": 5}),
+    ("research", "task", {"description": "Search the web for the latest Nigerian labour law changes and summarize them", "subagent_type": "search_assistant"}),
+    ("whatsapp", "send_whatsapp_message", {"phone_number": "+2348012345678", "message": "The meeting moved to 3pm."}),
+    ("email", "send_email", {"recipient_email": "ada@example.com", "subject": "Leave approved", "body": "Hi Ada, your leave request has been approved."}),
+    ("slack", "send_slack_message", {"recipient": "U0123456789", "message": "Payroll is done for this month."}),
+]
+
+
+def _text(message: BaseMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return " ".join(part.get("text", "") for part in message.content if isinstance(part, dict))
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Deterministic chat model: picks a tool call from the latest request, then answers once the tool returns.
+
+    Stands in for ChatGroq so the real agent graph and MCP servers can run
+    without network access; `latency` simulates model response time.
+    """
+
+    latency: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-benchmark"
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        return self
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        self.calls += 1
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=f"Done. {_text(last)[:200]}")
+        request = next((_text(m) for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        if '{"tasks"' in request:
+            return AIMessage(content='{"tasks": []}')
+        lowered = request.lower()
+        for keyword, tool, args in SCRIPT:
+            if keyword in lowered:
+                return AIMessage(content="", tool_calls=[{"name": tool, "args": dict(args), "id": f"call_{uuid.uuid4().hex[:12]}", "type": "tool_call"}])
+        return AIMessage(content="Hello! I can message employees on WhatsApp, email or Slack and research HR topics for you.")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
@@ -0,0 +1,96 @@
+# startup benchmark: import time and time-to-first-prompt of the CLI
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPT_MARKER = b"Enter your query"
+READY_MARKER = b"Agent created successfully."
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    # Startup only validates that keys exist; no API is called before the first query
+    env.setdefault("GROQ_API_KEY", "benchmark")
+    env.setdefault("TAVILY_API_KEY", "benchmark")
+    return env
+
+
+def measure_import(module: str = "blaqie_mcp") -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=_env(), capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure_first_prompt(timeout: float = 120) -> tuple:
+    """Returns (time to first prompt, time until the agent is ready to answer) for one CLI start."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-u", "blaqie_mcp.py"],
+        cwd=ROOT, env=_env(), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    output = b""
+    first_prompt = None
+    try:
+        while READY_MARKER not in output or first_prompt is None:
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError("CLI did not become ready in time")
+            chunk = process.stdout.read1(4096)
+            if not chunk:
+                raise RuntimeError(f"CLI exited before becoming ready: {output.decode(errors='replace')[-500:]}")
+            output += chunk
+            if first_prompt is None and PROMPT_MARKER in output:
+                first_prompt = time.perf_counter() - start
+        return first_prompt, time.perf_counter() - start
+    finally:
+        try:
+            process.communicate(b"exit\n", timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "median_s": round(statistics.median(samples), 4),
+        "min_s": round(min(samples), 4),
+        "max_s": round(max(samples), 4),
+        "runs": len(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Blaqie import time and time-to-first-prompt")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cold", action="store_true", help="Delete the MCP tool schema cache before every run")
+    parser.add_argument("--output", default=None, help="Append the results as a JSON line to this file")
+    args = parser.parse_args()
+
+    schema_cache = os.path.join(ROOT, os.getenv("MCP_SCHEMA_CACHE", os.path.join(".cache", "mcp_tool_schemas.json")))
+    import_samples, prompt_samples, ready_samples = [], [], []
+    for _ in range(args.runs):
+        import_samples.append(measure_import())
+        if args.cold and os.path.exists(schema_cache):
+            os.remove(schema_cache)
+        first_prompt, ready = measure_first_prompt()
+        prompt_samples.append(first_prompt)
+        ready_samples.append(ready)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cold_schema_cache": args.cold,
+        "import": summarize(import_samples),
+        "time_to_first_prompt": summarize(prompt_samples),
+        "time_to_agent_ready": summarize(ready_samples),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(results) + "\n")
+
+
+if __name__ == "__main__":
+    main()
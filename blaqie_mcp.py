@@ -1,24 +1,41 @@
 import os
 import pytz
+import signal
 import asyncio
+import argparse
 import traceback
 import json
 import uuid
 import warnings
-from typing import Dict, Any
-from langgraph.checkpoint.memory import InMemorySaver
+import threading
+import concurrent.futures
+from typing import Dict, Any, List, Optional
+from contextlib import AsyncExitStack, suppress
 from langgraph.types import Command
 from langchain_mcp_adapters.client import MultiServerMCPClient
-from deepagents import async_create_deep_agent
-from langchain_groq import ChatGroq
 from langchain_core.messages import AIMessage, HumanMessage
-from tavily import TavilyClient
 from dotenv import load_dotenv
 import datetime
 from prompts import (
+    BATCH_RESPONSE_PARSER_PROMPT,
     PERSONAL_ASSISTANT_PROMPT,
-    subagents
+    PERSONAL_ASSISTANT_TEXT_PROMPT,
+    subagents,
+    text_only_subagents
 )
+from mcp_pool import MCPSessionPool
+from broadcast import make_broadcast_tool
+from research_cache import make_research_tool, research_cache_from_env
+from employee_directory import EmployeeDirectory
+from approval_policy import ACCEPT, REJECT, ApprovalPolicy
+from audio_queue import AudioRenderQueue
+from stream_renderer import StreamRenderer
+from tracing import TracingCallbackHandler, configure_from_env, tracer
+import model_tiers
+import hitl_parser
+from checkpointer import open_checkpointer
+from compaction import HistoryCompactor, compact_thread
+from dispatcher import ParallelDispatcher, looks_multi_part, plan_request
 
 # Suppress pydantic warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="pydantic")
@@ -29,19 +46,41 @@ load_dotenv()
 # Nigeria timezone
 NIGERIA_TZ = pytz.timezone("Africa/Lagos")
 
-# Initialize Tavily client
+# Validate TAVILY_API_KEY (used by the internet_search server)
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 if not TAVILY_API_KEY:
     raise ValueError("TAVILY_API_KEY environment variable is not set")
-tavily_client = TavilyClient(api_key=TAVILY_API_KEY)
 
 # Validate GROQ_API_KEY
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY environment variable is not set")
 
-# Initialize LLM for parsing user responses
-llm = ChatGroq(model=os.getenv("MODEL", "moonshotai/kimi-k2-instruct-0905"))
+# Spawn MCP servers only when their tool is first used instead of warming them at startup
+MCP_LAZY_SPAWN = os.getenv("MCP_LAZY_SPAWN", "false").lower() in ("1", "true", "yes")
+# Run independent parts of multi-part requests concurrently (at most this many subagent runs at once)
+PARALLEL_DISPATCH = os.getenv("PARALLEL_DISPATCH", "true").lower() in ("1", "true", "yes")
+SUBAGENT_MAX_CONCURRENCY = int(os.getenv("SUBAGENT_MAX_CONCURRENCY", "3"))
+# Voice output: "queue" renders replies to speech in the background after they are shown,
+# "graph" lets the agent call generate_audio itself, "off" disables audio
+VOICE_OUTPUT = os.getenv("VOICE_OUTPUT", "queue").lower()
+AUDIO_WORKERS = int(os.getenv("AUDIO_WORKERS", "1"))
+AUDIO_TOOLS = {"generate_audio", "generate_audio_stats"}
+# CLI output: "tokens" streams model tokens and tool progress as they happen, "values" prints whole messages per step
+STREAM_OUTPUT = os.getenv("STREAM_OUTPUT", "tokens").lower()
+stream_renderer = StreamRenderer()
+MCP_SCHEMA_CACHE = os.getenv("MCP_SCHEMA_CACHE", os.path.join(".cache", "mcp_tool_schemas.json"))
+# Tools that may safely run twice, so the pool re-sends them when a server dies mid-call (never the sends)
+IDEMPOTENT_TOOLS = {
+    "internet_search", "get_search_result", "internet_search_stats", "lookup_employee",
+    "generate_audio", "generate_audio_stats", "whatsapp_message_status",
+}
+# Finished research summaries, reused for repeated or reworded questions (RESEARCH_CACHE_*)
+research_cache = research_cache_from_env()
+
+def get_llm(role: str = "routing"):
+    """Returns the LLM for a role (hitl_parse, routing, planner, compaction or a subagent name); see model_tiers."""
+    return model_tiers.get_model(role)
 
 # MCP server configuration with absolute paths
 server_dir = os.path.abspath("servers")
@@ -72,9 +111,19 @@ mcp_client = MultiServerMCPClient(
             "args": [os.path.join(server_dir, "send_slack_message_server.py")],
             "transport": "stdio",
         },
+        "employee_directory": {
+            "command": "python",
+            "args": [os.path.join(server_dir, "employee_directory_server.py")],
+            "transport": "stdio",
+        },
     }
 )
 
+# Local employee directory used to resolve recipient names in approval replies
+EMPLOYEE_DIRECTORY = os.getenv("EMPLOYEE_DIRECTORY", "employees.csv")
+if os.path.exists(EMPLOYEE_DIRECTORY):
+    hitl_parser.directory = EmployeeDirectory(EMPLOYEE_DIRECTORY, table=os.getenv("EMPLOYEE_DIRECTORY_TABLE", "employees"))
+
 async def parse_user_response(action: str, args: Dict[str, Any], options: Dict[str, bool], user_response: str, valid_tools: list) -> Dict[str, Any]:
     if not user_response.strip():
         return {"type": "respond", "args": "No response provided, please clarify"}
@@ -82,6 +131,16 @@ async def parse_user_response(action: str, args: Dict[str, Any], options: Dict[s
     # Sanitize action to ensure it's a clean string
     action = str(action).strip()
     print(f"DEBUG: Parsing response - action: {action}, args: {args}, user_response: {user_response}")
+
+    # Resolve clear replies locally before paying for an LLM round trip
+    cached = hitl_parser.get_cached(action, args, user_response)
+    if cached is not None:
+        return cached
+    fast_result = hitl_parser.classify_response(action, args, user_response, valid_tools)
+    if fast_result is not None:
+        hitl_parser.put_cached(action, args, user_response, fast_result)
+        return fast_result
+    hitl_parser.stats["llm"] += 1
     
     try:
         # Dynamic f-string prompt remains here for runtime formatting
@@ -186,7 +245,8 @@ Now, process the input and provide the JSON output.
         return {"type": "respond", "args": f"Error formatting prompt: {str(e)}"}
     
     try:
-        response = await llm.ainvoke(prompt)
+        with tracer.span("llm.hitl_parse", "llm", action=action):
+            response = await get_llm("hitl_parse").ainvoke(prompt)
         print(f"DEBUG: LLM response: {response.content}")
         parsed_response = json.loads(response.content)
         # Validate edit action against available tools
@@ -195,6 +255,7 @@ Now, process the input and provide the JSON output.
             if new_action not in valid_tools:
                 print(f"ERROR: Invalid tool in edit response: {new_action}")
                 return {"type": "respond", "args": f"Invalid tool '{new_action}'. Available tools: {', '.join(valid_tools)}"}
+        hitl_parser.put_cached(action, args, user_response, parsed_response)
         return parsed_response
     except json.JSONDecodeError:
         print(f"ERROR: Failed to parse LLM response: {response.content}")
@@ -203,61 +264,371 @@ Now, process the input and provide the JSON output.
         print(f"ERROR: LLM invocation failed: {str(e)}")
         return {"type": "respond", "args": f"LLM invocation failed: {str(e)}"}
 
-async def main():
+async def parse_batch_with_llm(items: List[Dict[str, Any]], user_response: str, valid_tools: list) -> Optional[Dict[int, Dict[str, Any]]]:
+    """Interprets one reply about several pending actions with a single LLM call."""
+    actions = "\n".join(f"{i}. {item['action']} {json.dumps(item['args'], ensure_ascii=False)}" for i, item in enumerate(items, 1))
+    prompt = BATCH_RESPONSE_PARSER_PROMPT.format(tools=", ".join(valid_tools), actions=actions, user_response=user_response)
+    hitl_parser.stats["llm_batch"] += 1
+    try:
+        with tracer.span("llm.hitl_parse_batch", "llm", actions=len(items)):
+            response = await get_llm("hitl_parse").ainvoke(prompt)
+        decisions = {int(d["index"]): {"type": d["type"], "args": d.get("args", {})} for d in json.loads(response.content)["decisions"]}
+    except Exception as e:
+        print(f"ERROR: Failed to parse batch response: {str(e)}")
+        return None
+    for decision in decisions.values():
+        if decision["type"] == "edit" and decision["args"].get("action") not in valid_tools:
+            decision.update(type="respond", args=f"Invalid tool '{decision['args'].get('action')}'. Available tools: {', '.join(valid_tools)}")
+    return decisions
+
+# HITL approval options for every tool that sends something on the user's behalf
+APPROVAL_OPTIONS = {
+    "allow_ignore": False,
+    "allow_respond": True,
+    "allow_edit": True,
+    "allow_accept": True,
+}
+INTERRUPT_CONFIG = {
+    "send_whatsapp_message": APPROVAL_OPTIONS,
+    "send_email": APPROVAL_OPTIONS,
+    "send_emails_bulk": APPROVAL_OPTIONS,
+    "send_slack_message": APPROVAL_OPTIONS,
+    "broadcast_message": APPROVAL_OPTIONS,
+    #"internet_search": False,
+    #"generate_audio": False,
+}
+DEFAULT_CONFIG_OPTIONS = {"allow_accept": True, "allow_edit": True, "allow_respond": True}
+# Routine sends the policy file allows (or forbids) are decided without a human round trip
+approval_policy = ApprovalPolicy(
+    os.getenv("APPROVAL_POLICY", "approval_policy.json"),
+    audit_path=os.getenv("APPROVAL_AUDIT_LOG", os.path.join(".cache", "approval_audit.jsonl")),
+)
+
+def apply_approval_policy(items: List[Dict[str, Any]], thread_id: str) -> Dict[int, Dict[str, Any]]:
+    """Returns decisions, by item index, for the pending actions the approval policy settles on its own."""
+    decided = {}
+    for index, item in enumerate(items):
+        decision, reason = approval_policy.decide(item["action"], item["args"], thread_id)
+        if decision == ACCEPT and item["config"].get("allow_accept"):
+            decided[index] = {"type": "accept", "args": {}}
+        elif decision == REJECT and item["config"].get("allow_respond"):
+            decided[index] = {"type": "respond", "args": f"Not sent: blocked by the approval policy ({reason}). Tell the user instead of retrying."}
+        else:
+            continue
+        print(f"Approval policy {decision}ed {item['action']} ({reason})")
+    return decided
+
+def add_agent_tools(mcp_tools: list, mcp_pool: MCPSessionPool) -> list:
+    """Appends the in-process tools to the MCP tools, giving the main agent's full tool set."""
+    # Broadcasts fan out over the channel servers from here, so they need only one approval
+    mcp_tools.append(make_broadcast_tool(mcp_pool))
+    mcp_tools.append(make_research_tool(mcp_pool, lambda: get_llm("search_assistant"), research_cache))
+    return mcp_tools
+
+def build_agent(tools: list, checkpointer):
+    from deepagents import async_create_deep_agent
+
+    in_graph_audio = VOICE_OUTPUT == "graph"
+    if not in_graph_audio:
+        # Speech is rendered outside the graph, so don't spend model turns on audio tool calls
+        tools = [tool for tool in tools if tool.name not in AUDIO_TOOLS]
+    return async_create_deep_agent(
+        model=get_llm("routing"),
+        tools=tools,
+        subagents=model_tiers.subagent_specs(subagents if in_graph_audio else text_only_subagents, get_llm),
+        instructions=PERSONAL_ASSISTANT_PROMPT if in_graph_audio else PERSONAL_ASSISTANT_TEXT_PROMPT,
+        checkpointer=checkpointer,
+        interrupt_config=INTERRUPT_CONFIG,
+    )
+
+def build_compactor() -> HistoryCompactor:
+    return HistoryCompactor(
+        llm_factory=lambda: get_llm("compaction"),
+        max_tokens=int(os.getenv("HISTORY_MAX_TOKENS", "8000")),
+        keep_last_turns=int(os.getenv("HISTORY_KEEP_TURNS", "4")),
+    )
+
+def current_time_str() -> str:
+    return datetime.datetime.now(NIGERIA_TZ).strftime("%I:%M %p WAT on %A, %B %d, %Y")
+
+def build_audio_queue(mcp_pool: MCPSessionPool, on_rendered=None) -> Optional[AudioRenderQueue]:
+    if VOICE_OUTPUT != "queue":
+        return None
+    audio_queue = AudioRenderQueue(mcp_pool, workers=AUDIO_WORKERS, on_rendered=on_rendered)
+    audio_queue.start()
+    return audio_queue
+
+def last_reply(state) -> str:
+    """Returns the text of the latest assistant message in a thread state."""
+    for message in reversed(state.values.get("messages", [])):
+        if isinstance(message, AIMessage) and message.content and not message.tool_calls:
+            return message.content if isinstance(message.content, str) else str(message.content)
+    return ""
+
+def _action_from_request(request: Any) -> Optional[Dict[str, Any]]:
+    action_request = request.get("action_request") if isinstance(request, dict) else getattr(request, "action_request", None)
+    if not action_request:
+        return None
+    action = action_request["action"]
+    args = action_request["args"]
+    if isinstance(request, dict):
+        description = request.get("description") or f"Proposed: {action} with {args}"
+        config_options = request.get("config") or DEFAULT_CONFIG_OPTIONS
+    else:
+        description = getattr(request, "description", f"Proposed: {action} with {args}")
+        config_options = getattr(request, "config", DEFAULT_CONFIG_OPTIONS)
+    return {"action": action, "args": args, "description": description, "config": config_options}
+
+def extract_interrupts(state) -> List[Dict[str, Any]]:
+    """Returns every pending action request across all interrupts, in resume order.
+
+    Each item carries the action, args, description and allowed options plus
+    the id of the interrupt it belongs to, so one batched Command can answer
+    all of them.
+    """
+    items = []
+    for intr in state.interrupts:
+        interrupt_id = getattr(intr, "id", None) or getattr(intr, "interrupt_id", None)
+        requests = intr.value if isinstance(intr.value, list) else [intr.value]
+        for request in requests:
+            item = _action_from_request(request)
+            if item:
+                items.append({**item, "interrupt_id": interrupt_id})
+    if items or not state.interrupts:
+        return items
+    # Fall back to the tool calls that triggered the interrupt
+    interrupt_id = getattr(state.interrupts[0], "id", None) or getattr(state.interrupts[0], "interrupt_id", None)
+    last_msg = state.values["messages"][-1]
+    if isinstance(last_msg, AIMessage):
+        for tc in last_msg.tool_calls:
+            if tc["name"] in INTERRUPT_CONFIG:
+                items.append({"action": tc["name"], "args": tc["args"], "description": f"Proposed tool call: {tc['name']} with args {tc['args']}", "config": DEFAULT_CONFIG_OPTIONS, "interrupt_id": interrupt_id})
+    return items
+
+def extract_interrupt(state) -> Optional[Dict[str, Any]]:
+    """Returns the action, args, description and allowed options of the first pending interrupt."""
+    items = extract_interrupts(state)
+    return items[0] if items else None
+
+def build_batch_command(items: List[Dict[str, Any]], resume_values: List[Dict[str, Any]]) -> Command:
+    """Packs one resume response per action into a single Command, grouped by interrupt."""
+    by_interrupt: Dict[Any, list] = {}
+    for item, resume_value in zip(items, resume_values):
+        by_interrupt.setdefault(item["interrupt_id"], []).append(resume_value)
+    if len(by_interrupt) == 1:
+        return Command(resume=next(iter(by_interrupt.values())))
+    return Command(resume=by_interrupt)
+
+def build_resume_value(parsed_response: Dict[str, Any], config_options: Dict[str, bool]) -> Optional[list]:
+    """Builds the resume value (aligned with LangGraph HITL), or None if the decision is not allowed."""
+    command_type = parsed_response["type"]
+    command_args = parsed_response["args"]
+    if command_type == "accept" and config_options.get("allow_accept"):
+        return [{"type": "accept"}]  # Empty args for accept
+    if command_type == "edit" and config_options.get("allow_edit"):
+        return [{"type": "edit", "args": command_args}]  # Nested action/args
+    if command_type == "respond" and config_options.get("allow_respond"):
+        return [{"type": "response", "args": command_args}]  # String feedback
+    return None
+
+# A read still waiting for a line after its prompt was interrupted; the next prompt reuses it
+_pending_input: Optional[concurrent.futures.Future] = None
+
+def _read_line(prompt: str, future: concurrent.futures.Future):
+    try:
+        future.set_result(input(prompt))
+    except BaseException as e:
+        future.set_exception(e)
+
+async def ainput(prompt: str) -> str:
+    """input() on a daemon thread, so startup work keeps running while the user types.
+
+    Ctrl-C raises KeyboardInterrupt here instead of cancelling the whole run,
+    so callers can cancel the pending action as they did with a plain input().
+    """
+    global _pending_input
+    if _pending_input is None or _pending_input.done():
+        _pending_input = concurrent.futures.Future()
+        threading.Thread(target=_read_line, args=(prompt, _pending_input), daemon=True).start()
+    else:
+        print(prompt, end="", flush=True)
+    line = asyncio.wrap_future(_pending_input)
+    loop = asyncio.get_running_loop()
+    interrupted = loop.create_future()
+    previous = None
+    if threading.current_thread() is threading.main_thread():
+        # asyncio.run's own SIGINT handler would cancel main; take Ctrl-C over while waiting for input
+        previous = signal.getsignal(signal.SIGINT)
+        signal.signal(signal.SIGINT, lambda signum, frame: loop.call_soon_threadsafe(lambda: interrupted.done() or interrupted.set_result(None)))
     try:
-        # Fetch MCP tools
-        print("Fetching MCP tools...")
-        mcp_tools = await mcp_client.get_tools()
-        valid_tools = [tool.name for tool in mcp_tools]
-        print(f"Fetched {len(mcp_tools)} tools: {valid_tools}")
-
-        # Initialize checkpointer
-        checkpointer = InMemorySaver()
-
-        # Create agent with interrupt config for HITL
-        print("Creating agent...")
-        agent = async_create_deep_agent(
-            model=llm,
-            tools=mcp_tools,
-            subagents=subagents,
-            instructions=PERSONAL_ASSISTANT_PROMPT,
-            checkpointer=checkpointer,
-            interrupt_config={
-                "send_whatsapp_message": {
-                    "allow_ignore": False,
-                    "allow_respond": True,
-                    "allow_edit": True,
-                    "allow_accept": True,
-                },
-                "send_email": {
-                    "allow_ignore": False,
-                    "allow_respond": True,
-                    "allow_edit": True,
-                    "allow_accept": True,
-                },
-                "send_slack_message": {
-                    "allow_ignore": False,
-                    "allow_respond": True,
-                    "allow_edit": True,
-                    "allow_accept": True,
-                },
-                #"internet_search": False,
-                #"generate_audio": False,
-            }
-        )
-        print("Agent created successfully.")
-
-        # Generate unique thread ID
-        thread_id = str(uuid.uuid4())
-        print(f"Generated thread_id: {thread_id}")
+        await asyncio.wait({line, interrupted}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        if previous is not None:
+            signal.signal(signal.SIGINT, previous)
+    if line.done():
+        return line.result()
+    raise KeyboardInterrupt
+
+async def initialize(args: argparse.Namespace, mcp_pool: MCPSessionPool, exit_stack: AsyncExitStack):
+    """Loads tools, the checkpointer and the agent. Runs in the background behind the first prompt."""
+    # Tool schemas come from the on-disk cache, so this only spawns servers whose code changed
+    print("Fetching MCP tools...")
+    mcp_tools = add_agent_tools(await mcp_pool.get_tools(), mcp_pool)
+    valid_tools = [tool.name for tool in mcp_tools]
+    print(f"Fetched {len(mcp_tools)} tools: {valid_tools}")
+    if not MCP_LAZY_SPAWN:
+        mcp_pool.warm_up()
+
+    # Initialize checkpointer
+    checkpointer = await exit_stack.enter_async_context(
+        open_checkpointer(args.checkpointer, args.checkpoint_db, args.keep_checkpoints)
+    )
+    print(f"Using {args.checkpointer} checkpointer (keeping last {args.keep_checkpoints} checkpoints per thread)")
+
+    # Create agent with interrupt config for HITL
+    print("Creating agent...")
+    agent = build_agent(mcp_tools, checkpointer)
+    print("Agent created successfully.")
+    return agent, valid_tools
+
+async def stream_run(agent, payload, config: Dict[str, Any]):
+    """Runs the agent on new input or a resume command, printing output as it is produced."""
+    if STREAM_OUTPUT == "tokens":
+        await stream_renderer.run(agent, payload, config)
+        return
+    async for chunk in agent.astream(payload, config=config, stream_mode="values"):
+        if "messages" in chunk:
+            chunk["messages"][-1].pretty_print()
+
+async def decide_batch(items: List[Dict[str, Any]], valid_tools: list) -> Optional[List[Dict[str, Any]]]:
+    """Shows every pending action at once and collects a decision for each. Returns None on 'exit'."""
+    for i, item in enumerate(items, 1):
+        print(f"{i}. {item['description']}")
+    if len(items) > 1:
+        print("\nReply for all at once, e.g. 'approve all', 'approve 1-3, edit 4 to ...', 'cancel 2'. (or 'exit' to stop)")
+    else:
+        print("\nDo you want to proceed with this, make changes, or cancel? (or 'exit' to stop)")
+    decisions: Dict[int, Dict[str, Any]] = {}
+    while len(decisions) < len(items):
+        try:
+            with tracer.span("hitl.wait", "hitl.wait", actions=len(items)):
+                user_response = (await ainput("Your response: ")).strip()
+        except (KeyboardInterrupt, EOFError):
+            print("\nInterrupt response interrupted. Canceling remaining actions.")
+            for i in range(1, len(items) + 1):
+                decisions.setdefault(i, {"type": "respond", "args": "Action canceled due to interruption"})
+            break
+        if user_response.lower() == "exit":
+            print("Exiting...")
+            return None
+
+        undecided = [i for i in range(1, len(items) + 1) if i not in decisions]
+        if len(undecided) == 1:
+            item = items[undecided[0] - 1]
+            decisions[undecided[0]] = await parse_user_response(item["action"], item["args"], item["config"], user_response, valid_tools)
+            continue
+        parsed = hitl_parser.parse_batch_reply(user_response, len(items))
+        if parsed is None:
+            parsed = await parse_batch_with_llm(items, user_response, valid_tools) or {}
+        for index, decision in parsed.items():
+            if index in decisions:
+                continue
+            if isinstance(decision, str):
+                # Free-text edit for one item: reuse the single-action parser
+                item = items[index - 1]
+                decision = await parse_user_response(item["action"], item["args"], item["config"], decision, valid_tools)
+            decisions[index] = decision
+        remaining = [i for i in range(1, len(items) + 1) if i not in decisions]
+        if remaining:
+            print(f"Still need a decision for: {', '.join(map(str, remaining))}")
+    return [decisions[i] for i in range(1, len(items) + 1)]
+
+async def resolve_interrupts(agent, config: Dict[str, Any], valid_tools: list) -> bool:
+    """Decides all pending interrupts in one round and resumes with a single Command. Returns False on 'exit'."""
+    state = await agent.aget_state(config)
+    while state.interrupts:
+        print("\nInterrupt detected (via state):")
+
+        # Extract every pending action/args
+        items = extract_interrupts(state)
+        if not items:
+            print("No tool call found in interrupt.")
+            await stream_run(agent, Command(resume=[{"type": "respond", "args": "No tool call found in interrupt"}]), config)
+            state = await agent.aget_state(config)
+            continue
+
+        # Let the approval policy settle routine sends; only the rest wait for the user
+        auto = apply_approval_policy(items, config["configurable"]["thread_id"])
+        review = [item for index, item in enumerate(items) if index not in auto]
+        reviewed = await decide_batch(review, valid_tools) if review else []
+        if reviewed is None:
+            return False
+        reviewed = iter(reviewed)
+        decisions = [auto[index] if index in auto else next(reviewed) for index in range(len(items))]
+
+        resume_values = []
+        for item, decision in zip(items, decisions):
+            resume_value = build_resume_value(decision, item["config"])
+            if resume_value is None:
+                print(f"Invalid or disallowed action: {decision['type']}")
+                resume_value = [{"type": "respond", "args": f"Invalid or disallowed action: {decision['type']}"}]
+            resume_values.append(resume_value[0])
+
+        # Resume execution once for the whole batch and refresh state
+        await stream_run(agent, build_batch_command(items, resume_values), config)
+        state = await agent.aget_state(config)
+    return True
+
+def thread_config(thread_id: str) -> Dict[str, Any]:
+    """Run config for a thread; attaches the tracing callbacks when tracing is enabled."""
+    config: Dict[str, Any] = {"configurable": {"thread_id": thread_id}}
+    if tracer.enabled:
+        config["callbacks"] = [TracingCallbackHandler(tracer)]
+    return config
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Blaqie HR assistant")
+    parser.add_argument("--thread-id", default=None, help="Resume an existing conversation thread")
+    parser.add_argument("--checkpointer", choices=["memory", "sqlite"], default=os.getenv("CHECKPOINTER", "memory"), help="Checkpoint storage backend")
+    parser.add_argument("--checkpoint-db", default=os.getenv("CHECKPOINT_DB", "blaqie_checkpoints.db"), help="SQLite checkpoint database path")
+    parser.add_argument("--keep-checkpoints", type=int, default=int(os.getenv("CHECKPOINT_KEEP_LAST", "20")), help="Checkpoints kept per thread (0 keeps all)")
+    return parser.parse_args()
+
+async def main(args: argparse.Namespace):
+    # Per-turn latency spans go to TRACE_FILE (and wandb when TRACE_WANDB_PROJECT is set)
+    configure_from_env()
+    # Keep one warm session per MCP server instead of spawning a process per tool call
+    mcp_pool = MCPSessionPool(
+        mcp_client,
+        max_concurrency=int(os.getenv("MCP_MAX_CONCURRENCY", "4")),
+        schema_cache_path=MCP_SCHEMA_CACHE,
+        idempotent_tools=IDEMPOTENT_TOOLS,
+    )
+    exit_stack = AsyncExitStack()
+    startup = None
+    audio_queue = build_audio_queue(mcp_pool, on_rendered=lambda session, outcome: print(f"\n[audio] {outcome}"))
+    try:
+        # Start up in the background so the first prompt is shown immediately
+        startup = asyncio.create_task(initialize(args, mcp_pool, exit_stack))
+
+        # Resume the requested thread or generate a unique thread ID
+        if args.thread_id:
+            thread_id = args.thread_id
+            print(f"Resuming thread_id: {thread_id}")
+        else:
+            thread_id = str(uuid.uuid4())
+            print(f"Generated thread_id: {thread_id}")
+
+        # Keep the thread's history under a token budget between turns
+        compactor = build_compactor()
 
         # Main interaction loop
         while True:
             # Get user input with timestamp
-            current_time = datetime.datetime.now(NIGERIA_TZ).strftime("%I:%M %p WAT on %A, %B %d, %Y")
+            current_time = current_time_str()
             try:
-                user_input = input(f"\n[{current_time}] Enter your query (or 'exit' to stop): ").strip()
-            except KeyboardInterrupt:
+                user_input = (await ainput(f"\n[{current_time}] Enter your query (or 'exit' to stop): ")).strip()
+            except (KeyboardInterrupt, EOFError, asyncio.CancelledError):
                 print("\nInput interrupted. Exiting...")
                 break
 
@@ -266,99 +637,70 @@ async def main():
                 break
 
             # Process the query
-            config = {"configurable": {"thread_id": thread_id}}
-            print(f"Processing query: {user_input}")
-            input_data = {"messages": [HumanMessage(content=user_input)], "current_time": current_time}
-
-            # Stream the initial execution
-            async for chunk in agent.astream(input_data, config=config, stream_mode="values"):
-                if "messages" in chunk:
-                    chunk["messages"][-1].pretty_print()
-
-            # Check for interrupts
-            state = agent.get_state(config)
-            while state.interrupts:
-                intr = state.interrupts[0]
-                print("\nInterrupt detected (via state):")
-
-                # Extract action/args
-                action_request = getattr(intr.value, "action_request", None) if hasattr(intr.value, "action_request") else None
-                if action_request:
-                    action = action_request["action"]
-                    args = action_request["args"]
-                    description = getattr(intr.value, "description", f"Proposed: {action} with {args}")
-                    config_options = getattr(intr.value, "config", {"allow_accept": True, "allow_edit": True, "allow_respond": True})
-                else:
-                    messages = state.values["messages"]
-                    last_msg = messages[-1]
-                    if isinstance(last_msg, AIMessage) and last_msg.tool_calls:
-                        tc = last_msg.tool_calls[0]
-                        action = tc["name"]
-                        args = tc["args"]
-                        description = f"Proposed tool call: {action} with args {args}"
-                        config_options = {"allow_accept": True, "allow_edit": True, "allow_respond": True}
-                    else:
-                        print("No tool call found in interrupt.")
-                        resume_value = [{"type": "respond", "args": "No tool call found in interrupt"}]
-                        command = Command(resume=resume_value)
-                        async for resume_chunk in agent.astream(command, config=config, stream_mode="values"):
-                            if "messages" in resume_chunk:
-                                resume_chunk["messages"][-1].pretty_print()
-                        state = agent.get_state(config)
+            agent, valid_tools = await startup
+            with tracer.span("turn", "turn", thread_id=thread_id):
+                config = thread_config(thread_id)
+                with tracer.span("compaction", "compaction"):
+                    compaction_stats = await compact_thread(agent, config, compactor)
+                if compaction_stats:
+                    print(f"Compacted history: {compaction_stats['tokens_before']} -> {compaction_stats['tokens_after']} tokens (saved {compaction_stats['tokens_saved']})")
+                print(f"Processing query: {user_input}")
+
+                # Fan independent parts out to their subagents concurrently
+                if PARALLEL_DISPATCH and looks_multi_part(user_input):
+                    with tracer.span("llm.plan", "llm"):
+                        tasks = await plan_request(get_llm("planner"), user_input, subagents)
+                    if len(tasks) > 1:
+                        print(f"Running {len(tasks)} independent sub-tasks concurrently...")
+                        dispatcher = ParallelDispatcher(agent, max_concurrency=SUBAGENT_MAX_CONCURRENCY, callbacks=config.get("callbacks"))
+                        branches = await dispatcher.run(config, tasks, current_time)
+                        try:
+                            for branch in branches:
+                                if not await resolve_interrupts(agent, branch["config"], valid_tools):
+                                    return
+                            merged = await dispatcher.merge(config, user_input, branches)
+                        finally:
+                            await dispatcher.discard(branches)
+                        print(merged)
+                        if audio_queue:
+                            audio_queue.enqueue(thread_id, merged)
                         continue
 
-                print(description)
-                print("\nDo you want to proceed with this, make changes, or cancel? (or 'exit' to stop)")
-                try:
-                    user_response = input("Your response: ").strip()
-                except KeyboardInterrupt:
-                    print("\nInterrupt response interrupted. Canceling action.")
-                    resume_value = [{"type": "response", "args": "Action canceled due to interruption"}]
-                    command = Command(resume=resume_value)
-                    async for resume_chunk in agent.astream(command, config=config, stream_mode="values"):
-                        if "messages" in resume_chunk:
-                            resume_chunk["messages"][-1].pretty_print()
-                    state = agent.get_state(config)
-                    continue
-
-                if user_response.lower() == "exit":
-                    print("Exiting...")
+                input_data = {"messages": [HumanMessage(content=user_input)], "current_time": current_time}
+
+                # Stream the initial execution
+                await stream_run(agent, input_data, config)
+
+                # Check for interrupts
+                if not await resolve_interrupts(agent, config, valid_tools):
                     return
 
-                # Parse user response
-                parsed_response = await parse_user_response(action, args, config_options, user_response, valid_tools)
-                command_type = parsed_response["type"]
-                command_args = parsed_response["args"]
-
-                # Build resume value (aligned with LangGraph HITL)
-                if command_type == "accept" and config_options.get("allow_accept"):
-                    resume_value = [{"type": "accept"}]  # Empty args for accept
-                elif command_type == "edit" and config_options.get("allow_edit"):
-                    resume_value = [{"type": "edit", "args": command_args}]  # Nested action/args
-                elif command_type == "respond" and config_options.get("allow_respond"):
-                    resume_value = [{"type": "response", "args": command_args}]  # String feedback
-                else:
-                    print(f"Invalid or disallowed action: {command_type}")
-                    resume_value = [{"type": "respond", "args": f"Invalid or disallowed action: {command_type}"}]
-                    command = Command(resume=resume_value)
-                    async for resume_chunk in agent.astream(command, config=config, stream_mode="values"):
-                        if "messages" in resume_chunk:
-                            resume_chunk["messages"][-1].pretty_print()
-                    state = agent.get_state(config)
-                    continue
-
-                # Resume execution
-                command = Command(resume=resume_value)
-                async for resume_chunk in agent.astream(command, config=config, stream_mode="values"):
-                    if "messages" in resume_chunk:
-                        resume_chunk["messages"][-1].pretty_print()
-
-                # Refresh state
-                state = agent.get_state(config)
+                # Speak the reply after it has been shown
+                if audio_queue:
+                    audio_queue.enqueue(thread_id, last_reply(await agent.aget_state(config)))
 
     except Exception as e:
         print(f"An error occurred: {str(e)}")
         traceback.print_exc()
+    finally:
+        print(hitl_parser.format_stats())
+        print(model_tiers.format_usage())
+        print(research_cache.format_stats())
+        print(approval_policy.format_stats())
+        if STREAM_OUTPUT == "tokens":
+            print(stream_renderer.summary())
+        tracer.close()
+        if startup is not None and not startup.done():
+            startup.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await startup
+        if audio_queue:
+            await audio_queue.close()
+        await exit_stack.aclose()
+        await mcp_pool.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    try:
+        asyncio.run(main(parse_args()))
+    except KeyboardInterrupt:
+        pass
\ No newline at end of file
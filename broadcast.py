@@ -0,0 +1,169 @@
+# one-approval broadcasts fanned out over the channel MCP servers
+import os
+import re
+import json
+import asyncio
+from collections import Counter
+from typing import Any, Dict, List, Literal, Optional
+
+from langchain_core.tools import BaseTool, StructuredTool
+from mcp.types import TextContent
+from pydantic import BaseModel, Field
+
+from mcp_pool import MCPSessionPool
+
+# Channel -> (MCP server, tool, recipient argument)
+CHANNEL_TOOLS = {
+    "whatsapp": ("send_whatsapp_message", "send_whatsapp_message", "phone_number"),
+    "slack": ("send_slack_message", "send_slack_message", "recipient"),
+    "email": ("send_email", "send_emails_bulk", "recipient_email"),
+}
+FAILURE_RE = re.compile(r"^(?:error|failed|unexpected error)\b", re.IGNORECASE)
+JOB_ID_RE = re.compile(r"job ID: (\w+)")
+PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+
+class BroadcastRecipient(BaseModel):
+    name: str = Field(description="Recipient's name, available to the template as {name}")
+    channel: Literal["whatsapp", "slack", "email"] = Field(description="Preferred channel for this recipient")
+    address: str = Field(description="Phone number (international format), Slack user/channel ID or email address, matching the channel")
+    fields: Dict[str, str] = Field(default_factory=dict, description="Extra template values for this recipient, e.g. {'date': 'Friday'}")
+
+
+class BroadcastInput(BaseModel):
+    message: str = Field(description="Message template; placeholders like {name} or any key in a recipient's fields are filled per recipient")
+    recipients: List[BroadcastRecipient] = Field(description="Everyone who should receive the announcement")
+    subject: str = Field(default="Announcement", description="Email subject (email recipients only)")
+
+
+def render(template: str, values: Dict[str, str]) -> str:
+    """Fills {placeholders}, leaving unknown ones untouched."""
+    return PLACEHOLDER_RE.sub(lambda m: str(values.get(m.group(1), m.group(0))), template)
+
+
+def _result_payloads(result) -> List[Any]:
+    payloads = []
+    for content in result.content:
+        if not isinstance(content, TextContent):
+            continue
+        try:
+            payload = json.loads(content.text)
+        except ValueError:
+            payload = content.text
+        payloads.extend(payload if isinstance(payload, list) else [payload])
+    return payloads
+
+
+class Broadcaster:
+    """Delivers one message to many recipients after a single approval.
+
+    Sends are grouped by channel: emails go through one send_emails_bulk call
+    per chunk, WhatsApp and Slack sends run with a per-channel concurrency limit.
+    """
+
+    def __init__(self, mcp_pool: MCPSessionPool, concurrency: Optional[Dict[str, int]] = None, email_chunk_size: int = 50):
+        self.mcp_pool = mcp_pool
+        self.concurrency = {"whatsapp": 4, "slack": 4, "email": 2, **(concurrency or {})}
+        self.email_chunk_size = email_chunk_size
+
+    async def _send_single(self, channel: str, entries: List[Dict[str, Any]], semaphore: asyncio.Semaphore):
+        server, tool, recipient_arg = CHANNEL_TOOLS[channel]
+
+        async def send(entry: Dict[str, Any]):
+            async with semaphore:
+                try:
+                    result = await self.mcp_pool.call_tool(server, tool, {recipient_arg: entry["address"], "message": entry["text"]})
+                    payloads = _result_payloads(result)
+                    error = next((p for p in payloads if isinstance(p, dict) and p.get("status") == "error"), None)
+                    detail = " ".join(str(p) for p in payloads)
+                    if error is not None:
+                        entry.update(status="failed", code=error.get("code"), detail=error.get("detail", detail))
+                    elif result.isError or FAILURE_RE.match(detail):
+                        entry.update(status="failed", detail=detail)
+                    elif channel == "whatsapp" and JOB_ID_RE.search(detail):
+                        entry.update(status="queued", job_id=JOB_ID_RE.search(detail).group(1))
+                    else:
+                        entry.update(status="sent")
+                except Exception as e:
+                    entry.update(status="failed", detail=str(e))
+
+        await asyncio.gather(*(send(entry) for entry in entries))
+
+    async def _send_emails(self, entries: List[Dict[str, Any]], subject: str, semaphore: asyncio.Semaphore):
+        server, tool, _ = CHANNEL_TOOLS["email"]
+
+        async def send_chunk(chunk: List[Dict[str, Any]]):
+            async with semaphore:
+                messages = [{"recipient_email": e["address"], "subject": render(subject, e["values"]), "body": e["text"]} for e in chunk]
+                try:
+                    result = await self.mcp_pool.call_tool(server, tool, {"messages": messages})
+                    outcomes = [p for p in _result_payloads(result) if isinstance(p, dict)]
+                except Exception as e:
+                    outcomes = []
+                    for entry in chunk:
+                        entry.update(status="failed", detail=str(e))
+                    return
+                by_address = {o.get("recipient_email"): o for o in outcomes}
+                for entry in chunk:
+                    outcome = by_address.get(entry["address"])
+                    if outcome is None:
+                        entry.update(status="failed", detail="No result returned for this recipient")
+                    elif outcome.get("status") == "sent":
+                        entry.update(status="sent")
+                    else:
+                        entry.update(status="failed", code=outcome.get("code"), detail=outcome.get("detail", "Unknown error"))
+
+        chunks = [entries[i:i + self.email_chunk_size] for i in range(0, len(entries), self.email_chunk_size)]
+        await asyncio.gather(*(send_chunk(chunk) for chunk in chunks))
+
+    async def broadcast(self, message: str, recipients: List[Dict[str, Any]], subject: str = "Announcement") -> Dict[str, Any]:
+        entries = []
+        for recipient in recipients:
+            values = {**recipient.get("fields", {}), "name": recipient["name"]}
+            entries.append({
+                "name": recipient["name"],
+                "channel": recipient["channel"],
+                "address": recipient["address"],
+                "values": values,
+                "text": render(message, values),
+                "status": "pending",
+            })
+        by_channel: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            by_channel.setdefault(entry["channel"], []).append(entry)
+        jobs = []
+        for channel, channel_entries in by_channel.items():
+            semaphore = asyncio.Semaphore(max(1, self.concurrency.get(channel, 1)))
+            if channel == "email":
+                jobs.append(self._send_emails(channel_entries, subject, semaphore))
+            else:
+                jobs.append(self._send_single(channel, channel_entries, semaphore))
+        await asyncio.gather(*jobs)
+
+        report = [{key: value for key, value in entry.items() if key not in ("values", "text")} for entry in entries]
+        counts = Counter(entry["status"] for entry in entries)
+        per_channel = {channel: dict(Counter(e["status"] for e in channel_entries)) for channel, channel_entries in by_channel.items()}
+        return {"total": len(entries), "summary": dict(counts), "per_channel": per_channel, "deliveries": report}
+
+
+def make_broadcast_tool(mcp_pool: MCPSessionPool) -> BaseTool:
+    broadcaster = Broadcaster(
+        mcp_pool,
+        concurrency={
+            "whatsapp": int(os.getenv("BROADCAST_CONCURRENCY_WHATSAPP", "4")),
+            "slack": int(os.getenv("BROADCAST_CONCURRENCY_SLACK", "4")),
+            "email": int(os.getenv("BROADCAST_CONCURRENCY_EMAIL", "2")),
+        },
+        email_chunk_size=int(os.getenv("BROADCAST_EMAIL_CHUNK_SIZE", "50")),
+    )
+
+    async def broadcast_message(message: str, recipients: List[Dict[str, Any]], subject: str = "Announcement") -> Dict[str, Any]:
+        recipients = [r.model_dump() if isinstance(r, BaseModel) else r for r in recipients]
+        return await broadcaster.broadcast(message, recipients, subject)
+
+    return StructuredTool.from_function(
+        coroutine=broadcast_message,
+        name="broadcast_message",
+        description="Sends one announcement to many recipients, each on their preferred channel (WhatsApp, Slack or email), in a single call. Returns a per-recipient delivery report.",
+        args_schema=BroadcastInput,
+    )
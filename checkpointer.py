@@ -0,0 +1,137 @@
+# checkpointer backends with bounded per-thread history
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+
+class BoundedInMemorySaver(InMemorySaver):
+    """InMemorySaver that keeps only the last `keep_last` checkpoints per thread."""
+
+    def __init__(self, keep_last: int = 20, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.keep_last = keep_last
+
+    def put(self, config: RunnableConfig, checkpoint, metadata, new_versions) -> RunnableConfig:
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if self.keep_last > 0 and len(checkpoints) > self.keep_last:
+            # Checkpoint IDs are time-ordered (uuid6), so lexical order is creation order
+            for checkpoint_id in sorted(checkpoints)[:-self.keep_last]:
+                del checkpoints[checkpoint_id]
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            self._prune_blobs(thread_id, checkpoint_ns)
+        return next_config
+
+    def _prune_blobs(self, thread_id: str, checkpoint_ns: str):
+        # Channel values are stored once per version; drop versions no remaining checkpoint points to
+        referenced = set()
+        for serialized, _, _ in self.storage[thread_id][checkpoint_ns].values():
+            checkpoint = self.serde.loads_typed(serialized)
+            referenced.update(checkpoint["channel_versions"].items())
+        for key in [k for k in self.blobs if k[0] == thread_id and k[1] == checkpoint_ns]:
+            if (key[2], key[3]) not in referenced:
+                del self.blobs[key]
+
+
+class BatchedCommitConnection:
+    """Wraps an aiosqlite connection so commits are coalesced into periodic flushes.
+
+    The saver still reads its own uncommitted writes on the same connection;
+    only durability is deferred, by at most `flush_interval` seconds or
+    `max_pending` commits, whichever comes first.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, flush_interval: float = 0.5, max_pending: int = 50):
+        self._conn = conn
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = 0
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
+
+    async def commit(self):
+        self._pending += 1
+        if self._pending >= self.max_pending:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        if self._pending:
+            self._pending = 0
+            await self._conn.commit()
+
+    async def close(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+        await self._conn.close()
+
+
+class PruningAsyncSqliteSaver(AsyncSqliteSaver):
+    """AsyncSqliteSaver that deletes all but the last `keep_last` checkpoints of a thread."""
+
+    def __init__(self, conn, keep_last: int = 20, prune_every: int = 10, **kwargs: Any):
+        super().__init__(conn, **kwargs)
+        self.keep_last = keep_last
+        self.prune_every = prune_every
+        self._puts_since_prune = {}
+
+    async def aput(self, config: RunnableConfig, checkpoint, metadata, new_versions) -> RunnableConfig:
+        next_config = await super().aput(config, checkpoint, metadata, new_versions)
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        key = (thread_id, checkpoint_ns)
+        self._puts_since_prune[key] = self._puts_since_prune.get(key, 0) + 1
+        if self.keep_last > 0 and self._puts_since_prune[key] >= self.prune_every:
+            self._puts_since_prune[key] = 0
+            await self.aprune(thread_id, checkpoint_ns)
+        return next_config
+
+    async def aprune(self, thread_id: str, checkpoint_ns: str = ""):
+        keep = (
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT ?"
+        )
+        params = (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last)
+        async with self.lock:
+            await self.conn.execute(
+                f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ({keep})", params
+            )
+            await self.conn.execute(
+                f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ({keep})", params
+            )
+            await self.conn.commit()
+
+
+@asynccontextmanager
+async def open_checkpointer(backend: str = "memory", db_path: str = "blaqie_checkpoints.db", keep_last: int = 20):
+    """Yields the configured checkpointer ("memory" or "sqlite") and closes it on exit."""
+    if backend == "memory":
+        yield BoundedInMemorySaver(keep_last=keep_last)
+        return
+    if backend != "sqlite":
+        raise ValueError(f"Unknown checkpointer backend: {backend}")
+    conn = await aiosqlite.connect(db_path)
+    batched = BatchedCommitConnection(conn)
+    try:
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        saver = PruningAsyncSqliteSaver(batched, keep_last=keep_last)
+        await saver.setup()
+        yield saver
+    finally:
+        await batched.close()
@@ -0,0 +1,117 @@
+# conversation history compaction for long-running threads
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AnyMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+from prompts import HISTORY_SUMMARY_PROMPT
+
+SUMMARY_NAME = "conversation_summary"
+
+
+def _split_turns(messages: List[AnyMessage]) -> List[List[AnyMessage]]:
+    """Groups messages into turns, each starting at a HumanMessage, so tool calls stay with their results."""
+    turns: List[List[AnyMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def digest_tool_result(content: Any, max_tokens: int) -> str:
+    """Replaces a large tool result with a short digest (titles and URLs for search payloads)."""
+    text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, default=str)
+    try:
+        payload = json.loads(text)
+    except (TypeError, ValueError):
+        payload = None
+    if isinstance(payload, dict) and isinstance(payload.get("results"), list):
+        lines = [f"- {r.get('title', '')} ({r.get('url', '')})" for r in payload["results"] if isinstance(r, dict)]
+        stored = f", full results via get_search_result('{payload['result_id']}')" if payload.get("result_id") else ""
+        digest = f"[Digest of {len(lines)} search results for '{payload.get('query', '')}'{stored}]\n" + "\n".join(lines)
+    else:
+        digest = text
+    max_chars = max_tokens * 4
+    if len(digest) > max_chars:
+        digest = digest[:max_chars] + f"... [truncated {len(text) - max_chars} chars]"
+    return digest
+
+
+class HistoryCompactor:
+    """Keeps a thread's message history under a token budget.
+
+    Large tool results outside the latest turn are replaced with digests first;
+    if the history is still over budget, everything but the last few turns is
+    folded into a single summary message (via the LLM when a factory is given,
+    otherwise by keeping only the user requests).
+    """
+
+    def __init__(self, llm_factory: Optional[Callable[[], Any]] = None, max_tokens: int = 8000, keep_last_turns: int = 4, tool_result_max_tokens: int = 300, summary_max_words: int = 200):
+        self.llm_factory = llm_factory
+        self.max_tokens = max_tokens
+        self.keep_last_turns = keep_last_turns
+        self.tool_result_max_tokens = tool_result_max_tokens
+        self.summary_max_words = summary_max_words
+        self.totals = {"compactions": 0, "tokens_saved": 0}
+
+    def _digest_tool_results(self, turns: List[List[AnyMessage]]) -> List[List[AnyMessage]]:
+        compacted = []
+        for turn in turns[:-1]:
+            new_turn = []
+            for message in turn:
+                if isinstance(message, ToolMessage) and count_tokens_approximately([message]) > self.tool_result_max_tokens:
+                    message = message.model_copy(update={"content": digest_tool_result(message.content, self.tool_result_max_tokens), "artifact": None})
+                new_turn.append(message)
+            compacted.append(new_turn)
+        return compacted + turns[-1:]
+
+    async def _summarize(self, messages: List[AnyMessage]) -> str:
+        if self.llm_factory is None:
+            requests = [str(m.content) for m in messages if isinstance(m, (HumanMessage, SystemMessage))]
+            return "Earlier in this conversation: " + " | ".join(requests)
+        conversation = "\n".join(f"{m.type}: {m.content}" for m in messages if m.content)
+        response = await self.llm_factory().ainvoke(HISTORY_SUMMARY_PROMPT.format(max_words=self.summary_max_words, conversation=conversation))
+        return str(response.content)
+
+    async def compact(self, messages: List[AnyMessage]) -> Optional[Tuple[List[AnyMessage], Dict[str, int]]]:
+        """Returns the compacted message list and token stats, or None if the history is within budget."""
+        tokens_before = count_tokens_approximately(messages)
+        if tokens_before <= self.max_tokens:
+            return None
+        turns = self._digest_tool_results(_split_turns(messages))
+        compacted = [m for turn in turns for m in turn]
+        if count_tokens_approximately(compacted) > self.max_tokens and len(turns) > self.keep_last_turns:
+            old = [m for turn in turns[:-self.keep_last_turns] for m in turn]
+            recent = [m for turn in turns[-self.keep_last_turns:] for m in turn]
+            summary = SystemMessage(content=f"Summary of the earlier conversation:\n{await self._summarize(old)}", name=SUMMARY_NAME)
+            compacted = [summary] + recent
+        tokens_after = count_tokens_approximately(compacted)
+        if tokens_after >= tokens_before:
+            return None
+        self.totals["compactions"] += 1
+        self.totals["tokens_saved"] += tokens_before - tokens_after
+        return compacted, {"tokens_before": tokens_before, "tokens_after": tokens_after, "tokens_saved": tokens_before - tokens_after}
+
+
+async def compact_thread(agent, config: Dict[str, Any], compactor: HistoryCompactor) -> Optional[Dict[str, int]]:
+    """Compacts a thread's stored history between turns. Skips threads with a pending run or interrupt.
+
+    Compaction is an optimization, so a failure (e.g. the summarizer LLM is
+    down) is logged and the turn goes ahead with the full history.
+    """
+    try:
+        state = await agent.aget_state(config)
+        if state.next or state.interrupts:
+            return None
+        result = await compactor.compact(state.values.get("messages", []))
+        if result is None:
+            return None
+        messages, stats = result
+        await agent.aupdate_state(config, {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *messages]})
+        return stats
+    except Exception as e:
+        print(f"WARNING: History compaction failed, skipping it this turn: {str(e)}")
+        return None
@@ -0,0 +1,124 @@
+# planner/executor that runs independent parts of a request concurrently
+import re
+import json
+import uuid
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from prompts import PLANNER_PROMPT
+from tracing import tracer
+
+# Node that produces the agent's replies: "agent" in langgraph's prebuilt ReAct graph, "model" in newer builders
+MODEL_NODES = ("agent", "model")
+
+# Recent main-thread messages shown to each branch, so references like "send it to him too" still resolve
+BRANCH_CONTEXT_MESSAGES = 6
+
+# A request that mentions two or more of these is worth planning
+CHANNEL_HINTS = (
+    re.compile(r"\bwhats\s?app\b", re.IGNORECASE),
+    re.compile(r"\b(?:e-?mail|gmail|mail)\b", re.IGNORECASE),
+    re.compile(r"\b(?:slack|dm)\b", re.IGNORECASE),
+    re.compile(r"\b(?:research|search|look up|find out)\b", re.IGNORECASE),
+)
+
+
+def looks_multi_part(user_input: str) -> bool:
+    """Cheap check that avoids a planner call for single-channel requests."""
+    return sum(1 for hint in CHANNEL_HINTS if hint.search(user_input)) >= 2
+
+
+async def plan_request(llm, user_input: str, subagents: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Asks the LLM for independent sub-tasks. Returns [] if the plan can't be used."""
+    names = {s["name"] for s in subagents}
+    listing = "\n".join(f"- {s['name']}: {s['description']}" for s in subagents)
+    try:
+        response = await llm.ainvoke(PLANNER_PROMPT.format(subagents=listing, request=user_input))
+        tasks = json.loads(response.content)["tasks"]
+    except Exception as e:
+        print(f"WARNING: Planner failed, falling back to a single run: {str(e)}")
+        return []
+    if not isinstance(tasks, list) or not all(isinstance(t, dict) and t.get("subagent") in names and t.get("task") for t in tasks):
+        print(f"WARNING: Planner returned an unusable plan: {tasks}")
+        return []
+    return tasks
+
+
+class ParallelDispatcher:
+    """Runs each planned sub-task as its own agent run on a branch thread, a few at a time.
+
+    Branches use the same agent (and therefore the same interrupt config), so
+    every send still pauses for approval; the caller resolves those interrupts
+    per branch and then merges the outcomes back into the main thread.
+    """
+
+    def __init__(self, agent, max_concurrency: int = 3, callbacks: Optional[list] = None):
+        self.agent = agent
+        self.max_concurrency = max_concurrency
+        self.callbacks = callbacks
+
+    async def _context(self, config: Dict[str, Any]) -> str:
+        state = await self.agent.aget_state(config)
+        messages = [m for m in state.values.get("messages", []) if isinstance(m, (HumanMessage, AIMessage)) and isinstance(m.content, str) and m.content]
+        lines = [f"{'User' if isinstance(m, HumanMessage) else 'Assistant'}: {m.content}" for m in messages[-BRANCH_CONTEXT_MESSAGES:]]
+        return "\n".join(lines)
+
+    async def run(self, config: Dict[str, Any], tasks: List[Dict[str, str]], current_time: str) -> List[Dict[str, Any]]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        thread_id = config["configurable"]["thread_id"]
+        branch_id = uuid.uuid4().hex[:8]
+        context = await self._context(config)
+
+        async def run_branch(index: int, task: Dict[str, str]) -> Dict[str, Any]:
+            label = f"branch {index + 1}: {task['subagent']}"
+            config = {"configurable": {"thread_id": f"{thread_id}:{branch_id}:{index}"}}
+            if self.callbacks:
+                config["callbacks"] = self.callbacks
+            instruction = f"Use the '{task['subagent']}' subagent to do the following: {task['task']}"
+            if context:
+                instruction = f"Conversation so far:\n{context}\n\n{instruction}"
+            input_data = {"messages": [HumanMessage(content=instruction)], "current_time": current_time}
+            # Branches run side by side, so each one's output is buffered and printed in one piece when it finishes
+            output: List[str] = []
+            async with semaphore:
+                try:
+                    with tracer.span(f"subagent.{task['subagent']}", "subagent", branch=index):
+                        async for chunk in self.agent.astream(input_data, config=config, stream_mode="values"):
+                            if "messages" in chunk:
+                                output.append(chunk["messages"][-1].pretty_repr())
+                finally:
+                    if output:
+                        print(f"\n[{label}]\n" + "\n".join(output))
+            return {"label": label, "task": task, "config": config}
+
+        return list(await asyncio.gather(*(run_branch(i, task) for i, task in enumerate(tasks))))
+
+    def _model_node(self) -> str:
+        nodes = getattr(self.agent, "nodes", {}) or {}
+        return next((name for name in MODEL_NODES if name in nodes), MODEL_NODES[0])
+
+    async def merge(self, config: Dict[str, Any], user_input: str, branches: List[Dict[str, Any]]) -> str:
+        """Records the request and the combined branch outcomes on the main thread."""
+        lines = []
+        for branch in branches:
+            state = await self.agent.aget_state(branch["config"])
+            replies = [m for m in state.values.get("messages", []) if isinstance(m, AIMessage) and m.content]
+            outcome = replies[-1].content if replies else "No response."
+            lines.append(f"- {branch['task']['subagent']}: {outcome}")
+        merged = "Completed these parts in parallel:\n" + "\n".join(lines)
+        # Without as_node LangGraph has to guess the writer, which fails or leaves `next` pending on a fresh thread
+        await self.agent.aupdate_state(config, {"messages": [HumanMessage(content=user_input), AIMessage(content=merged)]}, as_node=self._model_node())
+        return merged
+
+    async def discard(self, branches: List[Dict[str, Any]]):
+        """Deletes the branch threads once their outcomes are merged (or abandoned), so they don't pile up in the checkpointer."""
+        checkpointer = getattr(self.agent, "checkpointer", None)
+        if not checkpointer:
+            return
+        for branch in branches:
+            try:
+                await checkpointer.adelete_thread(branch["config"]["configurable"]["thread_id"])
+            except Exception as e:
+                print(f"WARNING: Could not delete branch thread {branch['config']['configurable']['thread_id']}: {str(e)}")
@@ -0,0 +1,152 @@
+# local employee directory with prefix and fuzzy name lookup
+import os
+import re
+import csv
+import time
+import bisect
+import difflib
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Accepted column names for each contact field
+COLUMN_ALIASES = {
+    "name": ("name", "full_name", "employee", "employee_name"),
+    "phone_number": ("phone_number", "phone", "whatsapp", "mobile"),
+    "email": ("email", "email_address", "mail"),
+    "slack_id": ("slack_id", "slack", "slack_member_id", "member_id"),
+    "department": ("department", "dept", "team"),
+    "title": ("title", "role", "job_title"),
+}
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+
+
+def _pick(row: Dict[str, Any], field: str) -> str:
+    lowered = {re.sub(r"[\s-]+", "_", str(k).strip().lower()): v for k, v in row.items() if k is not None}
+    for alias in COLUMN_ALIASES[field]:
+        value = lowered.get(alias)
+        if value not in (None, ""):
+            return str(value).strip()
+    return ""
+
+
+class EmployeeDirectory:
+    """In-memory index over a CSV or SQLite employee list.
+
+    Names are indexed by full name and by token (sorted, for prefix search);
+    fuzzy matching falls back to difflib. The source file is re-read when its
+    modification time changes, checked at most every `reload_interval` seconds.
+    """
+
+    def __init__(self, path: str, table: str = "employees", reload_interval: float = 2.0):
+        self.path = path
+        self.table = table
+        self.reload_interval = reload_interval
+        self.records: List[Dict[str, str]] = []
+        self._by_name: Dict[str, List[int]] = {}
+        self._tokens: List[Tuple[str, int]] = []
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def _read_rows(self) -> List[Dict[str, Any]]:
+        if self.path.endswith((".db", ".sqlite", ".sqlite3")):
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            try:
+                conn.row_factory = sqlite3.Row
+                return [dict(row) for row in conn.execute(f'SELECT * FROM "{self.table}"')]
+            finally:
+                conn.close()
+        with open(self.path, "r", encoding="utf-8-sig", newline="") as f:
+            return list(csv.DictReader(f))
+
+    def reload(self) -> int:
+        """Re-reads the source file and rebuilds the index. Returns the number of employees."""
+        try:
+            mtime = os.path.getmtime(self.path)
+            rows = self._read_rows()
+        except (OSError, sqlite3.Error, csv.Error) as e:
+            print(f"WARNING: Failed to load employee directory '{self.path}': {str(e)}")
+            return len(self.records)
+        records = []
+        for row in rows:
+            record = {field: _pick(row, field) for field in COLUMN_ALIASES}
+            if record["name"]:
+                records.append(record)
+        by_name: Dict[str, List[int]] = {}
+        tokens = []
+        for index, record in enumerate(records):
+            normalized = _normalize(record["name"])
+            by_name.setdefault(normalized, []).append(index)
+            tokens.extend((token, index) for token in normalized.split())
+        tokens.sort()
+        with self._lock:
+            self.records, self._by_name, self._tokens, self._mtime = records, by_name, tokens, mtime
+        return len(records)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            changed = os.path.getmtime(self.path) != self._mtime
+        except OSError:
+            return
+        if changed:
+            self.reload()
+
+    def _prefix(self, tokens: List[Tuple[str, int]], prefix: str) -> set:
+        start = bisect.bisect_left(tokens, (prefix, -1))
+        matches = set()
+        for token, index in tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matches.add(index)
+        return matches
+
+    def lookup(self, query: str, limit: int = 5) -> List[Dict[str, str]]:
+        """Returns matching employees, best first: exact name, then every word a name prefix; fuzzy only if neither matched."""
+        self._maybe_reload()
+        normalized = _normalize(query)
+        if not normalized:
+            return []
+        with self._lock:
+            records, by_name, tokens = self.records, self._by_name, self._tokens
+        results: List[Dict[str, str]] = []
+        seen = set()
+
+        def add(indices, match: str):
+            for index in sorted(indices):
+                if index not in seen and len(results) < limit:
+                    seen.add(index)
+                    results.append({**records[index], "match": match})
+
+        add(by_name.get(normalized, []), "exact")
+        words = normalized.split()
+        candidates = self._prefix(tokens, words[0])
+        for word in words[1:]:
+            candidates &= self._prefix(tokens, word)
+        add(candidates, "prefix")
+        if not results:
+            for name in difflib.get_close_matches(normalized, list(by_name), n=limit, cutoff=0.75):
+                add(by_name[name], "fuzzy")
+            for token in difflib.get_close_matches(normalized, sorted({t for t, _ in tokens}), n=limit, cutoff=0.8):
+                add(self._prefix(tokens, token), "fuzzy")
+        return results
+
+    def resolve(self, query: str) -> Optional[Dict[str, str]]:
+        """Returns the single employee a name refers to, or None if it is unknown or ambiguous."""
+        matches = self.lookup(query, limit=2)
+        if not matches:
+            return None
+        if len(matches) == 1:
+            return matches[0]
+        # An exact full-name match wins over looser ones
+        if matches[0]["match"] == "exact" and matches[1]["match"] != "exact":
+            return matches[0]
+        return None
@@ -0,0 +1,241 @@
+# rule-based fast path for Human-in-the-Loop responses
+import re
+import json
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+PHONE_RE = re.compile(r"\+\d[\d\s-]{7,16}\d")
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+SLACK_ID_RE = re.compile(r"\b[UWC][A-Z0-9]{8,}\b")
+QUOTED_RE = re.compile(r"\"([^\"]+)\"|“([^”]+)”|‘([^’]+)’|(?:^|\s)'([^']+)'(?=\s|$|[.,!?])")
+
+ACCEPT_PHRASES = {
+    "ok", "okay", "k", "yes", "y", "yep", "yeah", "yup", "sure", "send", "send it", "go", "go ahead",
+    "proceed", "approve", "approved", "confirm", "confirmed", "do it", "fine", "looks good", "looks fine",
+    "lgtm", "perfect", "great", "good", "correct", "all good", "ship it", "that's fine", "thats fine",
+}
+# A short reply is an approval only if it has at least one approval word and nothing but approval and courtesy words
+ACCEPT_WORDS = {"ok", "okay", "yes", "yeah", "yep", "sure", "send", "go", "proceed", "good", "fine", "great", "perfect",
+                "approve", "approved", "confirm", "confirmed", "lgtm"}
+ACCEPT_FILLER_WORDS = {"it", "ahead", "please", "looks", "sounds", "thanks"}
+CANCEL_PHRASES = {
+    "no", "n", "nope", "cancel", "cancel it", "stop", "abort", "don't send", "dont send", "do not send",
+    "don't send it", "dont send it", "never mind", "nevermind", "forget it", "skip", "skip it",
+}
+
+# Channel keywords -> (tool, recipient arg, identifier pattern)
+CHANNELS = {
+    "send_whatsapp_message": (re.compile(r"\bwhats\s?app\b"), "phone_number", PHONE_RE),
+    "send_email": (re.compile(r"\b(?:e-?mail|gmail|mail)\b"), "recipient_email", EMAIL_RE),
+    "send_slack_message": (re.compile(r"\b(?:slack|dm)\b"), "recipient", SLACK_ID_RE),
+}
+# Words that may surround a new recipient without changing what the message should say
+EDIT_FILLER_WORDS = {
+    "send", "it", "to", "him", "her", "them", "his", "their", "on", "via", "by", "instead", "please", "the",
+    "a", "an", "number", "phone", "message", "dm", "slack", "whatsapp", "whats", "app", "email", "e-mail", "mail",
+    "gmail", "address", "use", "id", "at", "this", "that", "now", "rather", "same", "and", "with", "then", "change",
+    "recipient", "user", "member", "channel", "say", "saying", "text", "tell", "new",
+}
+MESSAGE_ARGS = ("message", "body")
+# Directory field holding each channel's recipient identifier
+CONTACT_FIELDS = {"send_whatsapp_message": "phone_number", "send_email": "email", "send_slack_message": "slack_id"}
+# Optional EmployeeDirectory; when set, edits may name the new recipient instead of giving an identifier
+directory = None
+
+CACHE_SIZE = 256
+_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+stats = Counter()
+
+
+def _normalize(text: str) -> str:
+    text = re.sub(r"[\s]+", " ", text.strip().lower())
+    return text.strip(" .!?,;:")
+
+
+def _quoted(text: str) -> Optional[str]:
+    match = QUOTED_RE.search(text)
+    if not match:
+        return None
+    return next(group for group in match.groups() if group)
+
+
+def _classify_accept_or_cancel(normalized: str) -> Optional[Dict[str, Any]]:
+    if normalized in ACCEPT_PHRASES:
+        return {"type": "accept", "args": {}}
+    if normalized in CANCEL_PHRASES:
+        return {"type": "respond", "args": "The user cancelled this action. Do not send it."}
+    words = re.findall(r"[a-z']+", normalized)
+    if words and len(words) <= 5 and all(w in ACCEPT_WORDS or w in ACCEPT_FILLER_WORDS for w in words) and any(w in ACCEPT_WORDS for w in words):
+        return {"type": "accept", "args": {}}
+    return None
+
+
+def _build_edit(action: str, args: Dict[str, Any], user_response: str, valid_tools: List[str]) -> Optional[Dict[str, Any]]:
+    lowered = user_response.lower()
+    mentioned = [tool for tool, (keywords, _, _) in CHANNELS.items() if keywords.search(lowered)]
+    if len(mentioned) > 1:
+        return None
+    target = mentioned[0] if mentioned else action
+    if target not in CHANNELS or target not in valid_tools:
+        return None
+    _, recipient_arg, pattern = CHANNELS[target]
+    quoted = _quoted(user_response)
+    unquoted = QUOTED_RE.sub(" ", user_response) if quoted else user_response
+    identifiers = pattern.findall(user_response)
+    name_words: set = set()
+    if not identifiers and directory is not None:
+        # "send it to Nonso on Slack": look the name up instead of asking the LLM
+        words = [w for w in re.findall(r"[A-Za-z][A-Za-z'-]*", unquoted) if w.lower() not in EDIT_FILLER_WORDS]
+        employee = directory.resolve(" ".join(words)) if words else None
+        # Fuzzy matches could silently pick the wrong person, so only exact or prefix matches are used
+        if employee and employee["match"] != "fuzzy" and employee.get(CONTACT_FIELDS[target]):
+            identifiers = [employee[CONTACT_FIELDS[target]]]
+            name_words = {w.lower() for w in words}
+    if len(identifiers) != 1:
+        return None
+    recipient = re.sub(r"[\s-]", "", identifiers[0]) if pattern is PHONE_RE else identifiers[0]
+
+    # Anything beyond the recipient, channel and filler may be new instructions; let the LLM handle those
+    remainder = pattern.sub(" ", unquoted)
+    if any(word not in EDIT_FILLER_WORDS and word not in name_words for word in re.findall(r"[a-z][a-z'-]*", remainder.lower())):
+        return None
+    message = quoted or next((args[k] for k in MESSAGE_ARGS if args.get(k)), None)
+    if not message:
+        return None
+    if target == action:
+        new_args = {**args, recipient_arg: recipient}
+        if quoted:
+            new_args["body" if target == "send_email" else "message"] = message
+    elif target == "send_email":
+        new_args = {"recipient_email": recipient, "subject": args.get("subject", "Message"), "body": message}
+    else:
+        new_args = {recipient_arg: recipient, "message": message}
+    if name_words:
+        stats["directory_resolved"] += 1
+    return {"type": "edit", "args": {"action": target, "args": new_args}}
+
+
+def classify_response(action: str, args: Dict[str, Any], user_response: str, valid_tools: List[str]) -> Optional[Dict[str, Any]]:
+    """Resolves clear HITL replies locally. Returns None when the LLM should decide."""
+    normalized = _normalize(user_response)
+    result = _classify_accept_or_cancel(normalized)
+    if result is not None:
+        stats["fast_accept" if result["type"] == "accept" else "fast_cancel"] += 1
+        return result
+    result = _build_edit(action, args, user_response, valid_tools)
+    if result is not None:
+        stats["fast_edit"] += 1
+    return result
+
+
+# Batch replies such as "approve all", "approve 1-3, edit 4 to say ..." or "cancel 2 and 5".
+# Bare "send"/"ok"/"yes" are left out: "send 1 to Ada instead" is a redirect, not an approval.
+BATCH_VERBS = {
+    "approve": "accept", "accept": "accept",
+    "reject": "cancel", "cancel": "cancel", "skip": "cancel", "drop": "cancel", "no": "cancel",
+    "edit": "text", "change": "text", "respond": "text", "reply": "text",
+}
+_INDEX = r"#?\d+"
+_RANGE_SPEC = rf"{_INDEX}(?:\s*(?:-|–|to)\s*{_INDEX})?"
+# After edit verbs "to" starts the new text ("change 2 to 10 people"), so it is not a range separator
+_EDIT_RANGE_SPEC = rf"{_INDEX}(?:\s*(?:-|–)\s*{_INDEX})?"
+
+
+def _clause_pattern(kinds: tuple, spec: str) -> str:
+    verbs = "|".join(verb for verb, kind in BATCH_VERBS.items() if kind in kinds)
+    return rf"\b({verbs})\s+(all|everything|{spec}(?:\s*(?:,|and|&)\s*{spec})*)\b"
+
+
+BATCH_CLAUSE_RE = re.compile(f"{_clause_pattern(('accept', 'cancel'), _RANGE_SPEC)}|{_clause_pattern(('text',), _EDIT_RANGE_SPEC)}", re.IGNORECASE)
+# Connectors and courtesy words that may follow a clause without adding instructions
+CLAUSE_FILLER_RE = re.compile(r"^(?:[\s,;.:&!]|\b(?:and|then|please|thanks)\b)*$", re.IGNORECASE)
+CANCELLED = {"type": "respond", "args": "The user cancelled this action. Do not send it."}
+# Negations and exceptions ("approve all except 3", "don't send 2") change which items a clause covers
+NEGATION_RE = re.compile(r"\b(?:don['’]?t|do not|not|never|except|but|without|other than|excluding)\b", re.IGNORECASE)
+
+
+def _expand_indices(spec: str, count: int) -> List[int]:
+    if spec.lower() in ("all", "everything"):
+        return list(range(1, count + 1))
+    indices = []
+    for part in re.split(r"\s*(?:,|and|&)\s*", spec):
+        bounds = [int(n) for n in re.findall(r"\d+", part)]
+        if len(bounds) == 2:
+            indices.extend(range(bounds[0], bounds[1] + 1))
+        elif bounds:
+            indices.append(bounds[0])
+    return [i for i in indices if 1 <= i <= count]
+
+
+def parse_batch_reply(user_response: str, count: int) -> Optional[Dict[int, Any]]:
+    """Maps 1-based item numbers to decisions for a reply covering several pending actions.
+
+    Values are a decision dict, or a string of free-text instructions (for
+    "edit"/"respond" clauses) that still needs per-item parsing. Returns None
+    if the reply doesn't use the batch form and isn't a plain accept/cancel.
+    Replies with negations or exceptions are left to the LLM, except a plain
+    blanket cancel such as "don't send".
+    """
+    negated = NEGATION_RE.search(user_response) is not None
+    clauses = list(BATCH_CLAUSE_RE.finditer(user_response))
+    if not clauses or negated:
+        blanket = _classify_accept_or_cancel(_normalize(user_response))
+        if blanket is None or (negated and blanket["type"] == "accept"):
+            return None
+        stats["fast_batch"] += 1
+        return {i: blanket for i in range(1, count + 1)}
+    decisions: Dict[int, Any] = {}
+    for position, clause in enumerate(clauses):
+        verb, spec = (clause.group(1), clause.group(2)) if clause.group(1) else (clause.group(3), clause.group(4))
+        kind = BATCH_VERBS[verb.lower()]
+        end = clauses[position + 1].start() if position + 1 < len(clauses) else len(user_response)
+        text = user_response[clause.end():end]
+        if kind == "accept" and not CLAUSE_FILLER_RE.match(text):
+            # "approve 1 to Ada instead" asks for a change; only the LLM can tell what
+            return None
+        text = text.strip(" ,;.:")
+        for index in _expand_indices(spec, count):
+            current = decisions.get(index)
+            if kind == "accept":
+                # An approval never overrides an explicit cancel or edit ("cancel 2, approve all")
+                decisions.setdefault(index, {"type": "accept", "args": {}})
+            elif kind == "cancel":
+                if isinstance(current, str):
+                    return None  # both edited and cancelled: ambiguous
+                decisions[index] = CANCELLED
+            else:
+                if current is CANCELLED:
+                    return None
+                decisions[index] = text or "Please revise this action."
+    stats["fast_batch"] += 1
+    return decisions
+
+
+def _cache_key(action: str, args: Dict[str, Any], user_response: str) -> str:
+    return json.dumps([action, args, _normalize(user_response)], sort_keys=True, ensure_ascii=False, default=str)
+
+
+def get_cached(action: str, args: Dict[str, Any], user_response: str) -> Optional[Dict[str, Any]]:
+    key = _cache_key(action, args, user_response)
+    result = _cache.get(key)
+    if result is not None:
+        _cache.move_to_end(key)
+        stats["cache_hit"] += 1
+    return result
+
+
+def put_cached(action: str, args: Dict[str, Any], user_response: str, result: Dict[str, Any]):
+    _cache[_cache_key(action, args, user_response)] = result
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def format_stats() -> str:
+    paths = {name: count for name, count in stats.items() if name != "directory_resolved"}
+    total = sum(paths.values())
+    if not total:
+        return "HITL parser: no responses parsed"
+    parts = ", ".join(f"{name}={count} ({count / total:.0%})" for name, count in sorted(paths.items()))
+    if stats["directory_resolved"]:
+        parts += f"; recipients resolved from the employee directory: {stats['directory_resolved']}"
+    return f"HITL parser paths: {parts}"
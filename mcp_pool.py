@@ -0,0 +1,275 @@
+# persistent MCP session pool
+import os
+import json
+import time
+import asyncio
+from contextlib import suppress
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import anyio
+from langchain_core.tools import BaseTool, StructuredTool, ToolException
+from langchain_mcp_adapters.client import MultiServerMCPClient
+from mcp import ClientSession
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, CallToolResult, TextContent, Tool
+
+from tracing import tracer
+
+# Errors raised when a server process or its stdio pipes have gone away
+CONNECTION_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+    EOFError,
+)
+
+
+# Stdio transport cost barely changes, so while tracing it is re-measured with a ping at most this often per server
+TRANSPORT_SAMPLE_INTERVAL = float(os.getenv("TRACE_TRANSPORT_SAMPLE_INTERVAL", "60"))
+
+
+# Raised while writing the request, so the server never saw the call and it is safe to send again
+UNSENT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError)
+
+
+def _is_connection_error(error: BaseException) -> bool:
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    return isinstance(error, McpError) and error.error.code == CONNECTION_CLOSED
+
+
+def _convert_call_tool_result(result: CallToolResult):
+    """Converts an MCP tool result into LangChain (content, artifact) form."""
+    text_contents = [c.text for c in result.content if isinstance(c, TextContent)]
+    non_text_contents = [c for c in result.content if not isinstance(c, TextContent)]
+    content = text_contents[0] if len(text_contents) == 1 else text_contents
+    if result.isError:
+        raise ToolException(content)
+    return content, (non_text_contents or None)
+
+
+class MCPSessionPool:
+    """Keeps one warm stdio session per MCP server for the life of the agent.
+
+    Each session is held open by a background task so the server process is
+    spawned once instead of on every tool call. Calls on the same server are
+    multiplexed over its session (up to `max_concurrency` at once), and a
+    session whose process died is restarted. A call cut off by a dead
+    session is only re-sent if its request never went out or the tool is in
+    `idempotent_tools`; otherwise it may already have run (e.g. a message was
+    sent), so an error result says so instead of risking a duplicate.
+    """
+
+    def __init__(self, client: MultiServerMCPClient, max_concurrency: int = 4, call_timeout: Optional[float] = None, schema_cache_path: Optional[str] = None, idempotent_tools: Iterable[str] = ()):
+        self.client = client
+        self.idempotent_tools = frozenset(idempotent_tools)
+        self.server_names = list(client.connections)
+        self.max_concurrency = max_concurrency
+        self.call_timeout = call_timeout
+        self.schema_cache_path = schema_cache_path
+        self._warm_up_task: Optional[asyncio.Task] = None
+        self.restarts = {name: 0 for name in self.server_names}
+        self._sessions: Dict[str, ClientSession] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stops: Dict[str, asyncio.Event] = {}
+        self._locks = {name: asyncio.Lock() for name in self.server_names}
+        self._semaphores = {name: asyncio.Semaphore(max_concurrency) for name in self.server_names}
+        self._transport_samples: Dict[str, Tuple[float, float]] = {}  # server -> (measured_at, transport_ms)
+
+    async def _hold_session(self, name: str, ready: asyncio.Future, stop: asyncio.Event):
+        # The session must be entered and exited in the same task (anyio cancel scopes)
+        session = None
+        try:
+            async with self.client.session(name) as session:
+                self._sessions[name] = session
+                ready.set_result(session)
+                await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                print(f"WARNING: MCP server '{name}' session ended: {str(e)}")
+        finally:
+            if session is not None and self._sessions.get(name) is session:
+                del self._sessions[name]
+
+    async def _connect(self, name: str) -> ClientSession:
+        ready = asyncio.get_running_loop().create_future()
+        stop = asyncio.Event()
+        self._stops[name] = stop
+        with tracer.span(f"mcp.spawn.{name}", "mcp.spawn", server=name):
+            self._tasks[name] = asyncio.create_task(self._hold_session(name, ready, stop))
+            session = await ready
+        return session
+
+    async def _disconnect(self, name: str):
+        stop = self._stops.pop(name, None)
+        task = self._tasks.pop(name, None)
+        if stop:
+            stop.set()
+        if task:
+            with suppress(Exception, asyncio.CancelledError):
+                await asyncio.wait_for(task, timeout=5)
+
+    async def _get_session(self, name: str) -> ClientSession:
+        session = self._sessions.get(name)
+        if session is not None:
+            return session
+        async with self._locks[name]:
+            return self._sessions.get(name) or await self._connect(name)
+
+    async def _reconnect(self, name: str, stale: ClientSession) -> ClientSession:
+        async with self._locks[name]:
+            current = self._sessions.get(name)
+            if current is not None and current is not stale:
+                return current  # another caller already reconnected
+            self.restarts[name] += 1
+            await self._disconnect(name)
+            return await self._connect(name)
+
+    async def start(self):
+        """Spawns every configured server and waits until all sessions are initialized."""
+        await asyncio.gather(*(self._get_session(name) for name in self.server_names))
+
+    def warm_up(self):
+        """Spawns all servers in the background so the first tool call finds a warm session."""
+        async def _warm_up():
+            results = await asyncio.gather(*(self._get_session(name) for name in self.server_names), return_exceptions=True)
+            for name, result in zip(self.server_names, results):
+                if isinstance(result, Exception):
+                    print(f"WARNING: Failed to start MCP server '{name}': {str(result)}")
+
+        self._warm_up_task = asyncio.create_task(_warm_up())
+
+    async def close(self):
+        if self._warm_up_task is not None and not self._warm_up_task.done():
+            self._warm_up_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._warm_up_task
+        await asyncio.gather(*(self._disconnect(name) for name in list(self._tasks)))
+
+    async def _transport_ms(self, server: str, session: ClientSession) -> Optional[float]:
+        sample = self._transport_samples.get(server)
+        if sample is not None and time.monotonic() - sample[0] < TRANSPORT_SAMPLE_INTERVAL:
+            return sample[1]
+        with suppress(Exception), tracer.span(f"mcp.transport.{server}", "mcp.transport", server=server):
+            started = time.perf_counter()
+            await asyncio.wait_for(session.send_ping(), timeout=self.call_timeout)
+            self._transport_samples[server] = (time.monotonic(), (time.perf_counter() - started) * 1000)
+        sample = self._transport_samples.get(server)
+        return sample[1] if sample else None
+
+    async def _timed_call(self, server: str, session: ClientSession, tool: str, arguments: Dict[str, Any], **attrs) -> CallToolResult:
+        """Runs one tool call, splitting its time into transport and execution when tracing.
+
+        Transport cost comes from a ping round trip sampled at most once per
+        TRANSPORT_SAMPLE_INTERVAL per server, not per call; the call span
+        records it as `transport_ms` and the rest of the call time as
+        `execution_ms`.
+        """
+        transport_ms = await self._transport_ms(server, session) if tracer.enabled else None
+        with tracer.span(f"mcp.call.{tool}", "mcp.call", server=server, tool=tool, **attrs) as span:
+            started = time.perf_counter()
+            try:
+                return await asyncio.wait_for(session.call_tool(tool, arguments), timeout=self.call_timeout)
+            finally:
+                if span is not None and transport_ms is not None:
+                    span.attrs["transport_ms"] = round(transport_ms, 3)
+                    span.attrs["execution_ms"] = round(max(0.0, (time.perf_counter() - started) * 1000 - transport_ms), 3)
+
+    async def call_tool(self, server: str, tool: str, arguments: Dict[str, Any]) -> CallToolResult:
+        with tracer.span(f"mcp.{server}.{tool}", "mcp.total", server=server, tool=tool):
+            with tracer.span(f"mcp.queue.{server}", "mcp.queue", server=server):
+                await self._semaphores[server].acquire()
+            try:
+                session = await self._get_session(server)
+                try:
+                    return await self._timed_call(server, session, tool, arguments)
+                except Exception as e:
+                    if not _is_connection_error(e):
+                        raise
+                    print(f"WARNING: MCP server '{server}' connection lost ({e!r}), reconnecting...")
+                    session = await self._reconnect(server, session)
+                    if not isinstance(e, UNSENT_ERRORS) and tool not in self.idempotent_tools:
+                        return CallToolResult(
+                            content=[TextContent(type="text", text=f"The connection to the '{server}' server was lost while '{tool}' was running, so it may or may not have completed. It was not retried; check before calling it again.")],
+                            isError=True,
+                        )
+                    return await self._timed_call(server, session, tool, arguments, retried=True)
+            finally:
+                self._semaphores[server].release()
+
+    def _make_tool(self, server: str, tool: Tool) -> BaseTool:
+        async def call_tool(**arguments: Any):
+            result = await self.call_tool(server, tool.name, arguments)
+            return _convert_call_tool_result(result)
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description or "",
+            args_schema=tool.inputSchema,
+            coroutine=call_tool,
+            response_format="content_and_artifact",
+            metadata={"mcp_server": server},
+        )
+
+    def _fingerprint(self, name: str) -> List[Any]:
+        """Identifies a server's code so cached schemas are dropped when a server script changes."""
+        connection = self.client.connections[name]
+        fingerprint: List[Any] = [connection.get("command"), connection.get("args")]
+        for arg in connection.get("args") or []:
+            if not os.path.isfile(arg):
+                continue
+            # Servers may import sibling helper modules, so fingerprint the whole directory
+            directory = os.path.dirname(os.path.abspath(arg))
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith(".py"):
+                    stat = os.stat(os.path.join(directory, filename))
+                    fingerprint.append([filename, stat.st_mtime_ns, stat.st_size])
+        return fingerprint
+
+    def _load_schema_cache(self) -> Dict[str, Any]:
+        if not self.schema_cache_path:
+            return {}
+        try:
+            with open(self.schema_cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_schema_cache(self, cache: Dict[str, Any]):
+        directory = os.path.dirname(self.schema_cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.schema_cache_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, self.schema_cache_path)
+
+    async def _list_tools(self, name: str) -> List[Tool]:
+        session = await self._get_session(name)
+        return (await session.list_tools()).tools
+
+    async def get_tools(self) -> List[BaseTool]:
+        """Returns LangChain tools that route every call through the pooled sessions.
+
+        Schemas come from the on-disk cache when the server script is unchanged,
+        so no server has to be spawned before its tool is first used.
+        """
+        cache = self._load_schema_cache()
+        fingerprints = {name: self._fingerprint(name) for name in self.server_names}
+        stale = [name for name in self.server_names if cache.get(name, {}).get("fingerprint") != fingerprints[name]]
+        if stale:
+            listed = await asyncio.gather(*(self._list_tools(name) for name in stale))
+            for name, tools in zip(stale, listed):
+                cache[name] = {"fingerprint": fingerprints[name], "tools": [tool.model_dump(mode="json", exclude_none=True) for tool in tools]}
+            if self.schema_cache_path:
+                try:
+                    self._save_schema_cache(cache)
+                except OSError as e:
+                    print(f"WARNING: Failed to save MCP tool schema cache: {str(e)}")
+        tools = []
+        for name in self.server_names:
+            tools.extend(self._make_tool(name, Tool.model_validate(tool)) for tool in cache[name]["tools"])
+        return tools
@@ -0,0 +1,148 @@
+# per-role model tiers with latency and token usage accounting
+import os
+import json
+import time
+import threading
+import functools
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from tracing import percentile
+
+# Tier -> model. MODEL stays the large composition model; MODEL_FAST defaults to it until set.
+TIERS = {
+    "large": os.getenv("MODEL", "moonshotai/kimi-k2-instruct-0905"),
+    "fast": os.getenv("MODEL_FAST", "") or os.getenv("MODEL", "moonshotai/kimi-k2-instruct-0905"),
+}
+# Classification and routing roles default to the fast tier; every other role (each subagent) to the large one
+DEFAULT_ROLE_TIERS = {
+    "hitl_parse": "fast",
+    "routing": "fast",
+    "planner": "fast",
+    "compaction": "fast",
+}
+MODEL_USAGE_LOG = os.getenv("MODEL_USAGE_LOG", "")
+
+
+def model_for(role: str) -> str:
+    """Resolves a role to a model name. MODEL_<ROLE> may name a tier ('fast'/'large') or a model."""
+    choice = os.getenv(f"MODEL_{role.upper()}", "") or DEFAULT_ROLE_TIERS.get(role, "large")
+    return TIERS.get(choice, choice)
+
+
+class ModelUsageHandler(BaseCallbackHandler):
+    """Records latency and token usage of every call made with a role's model."""
+
+    run_inline = True
+
+    def __init__(self, role: str, model: str):
+        self.role = role
+        self.model = model
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if not usage and response.generations and response.generations[0]:
+            metadata = getattr(getattr(response.generations[0][0], "message", None), "usage_metadata", None) or {}
+            usage = {"prompt_tokens": metadata.get("input_tokens"), "completion_tokens": metadata.get("output_tokens")}
+        usage_tracker.record(self.role, self.model, (time.perf_counter() - started) * 1000, usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            usage_tracker.record(self.role, self.model, (time.perf_counter() - started) * 1000, 0, 0, error=repr(error))
+
+
+class UsageTracker:
+    """Per-role call counts, latencies and token totals, optionally appended to a JSONL log."""
+
+    def __init__(self, log_path: str = ""):
+        self.roles: Dict[str, Dict[str, Any]] = {}
+        self.log_path = log_path
+        self._lock = threading.Lock()
+
+    def record(self, role: str, model: str, latency_ms: float, prompt_tokens: int, completion_tokens: int, error: Optional[str] = None):
+        with self._lock:
+            entry = self.roles.setdefault(role, {"model": model, "calls": 0, "errors": 0, "latencies_ms": [], "prompt_tokens": 0, "completion_tokens": 0})
+            entry["calls"] += 1
+            entry["errors"] += 1 if error else 0
+            entry["latencies_ms"].append(latency_ms)
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            if not self.log_path:
+                return
+            record = {"ts": round(time.time(), 3), "role": role, "model": model, "latency_ms": round(latency_ms, 1), "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+            if error:
+                record["error"] = error
+            try:
+                directory = os.path.dirname(self.log_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                print(f"WARNING: Failed to write model usage log: {str(e)}")
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            summary = {}
+            for role, entry in self.roles.items():
+                latencies: List[float] = sorted(entry["latencies_ms"])
+                summary[role] = {
+                    "model": entry["model"],
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "p50_ms": round(percentile(latencies, 50), 1),
+                    "p95_ms": round(percentile(latencies, 95), 1),
+                    "prompt_tokens": entry["prompt_tokens"],
+                    "completion_tokens": entry["completion_tokens"],
+                }
+            return summary
+
+
+usage_tracker = UsageTracker(MODEL_USAGE_LOG)
+
+
+@functools.lru_cache(maxsize=None)
+def get_model(role: str):
+    """Returns the chat model for a role, importing and constructing it on first use."""
+    from langchain_groq import ChatGroq
+
+    model = model_for(role)
+    return ChatGroq(model=model, callbacks=[ModelUsageHandler(role, model)])
+
+
+def subagent_specs(specs: List[Dict[str, Any]], model_factory=get_model) -> List[Dict[str, Any]]:
+    """Attaches each subagent's role model to its deepagents spec.
+
+    Newer deepagents releases read `model`; older ones only honour
+    `model_settings`, which is added when the role uses a different model
+    from the routing agent (otherwise the subagent inherits it anyway).
+    """
+    configured = []
+    for spec in specs:
+        role = spec["name"]
+        spec = {**spec, "model": model_factory(role)}
+        model = model_for(role)
+        if model != model_for("routing"):
+            spec["model_settings"] = {"model": model, "model_provider": "groq", "callbacks": [ModelUsageHandler(role, model)]}
+        configured.append(spec)
+    return configured
+
+
+def format_usage() -> str:
+    summary = usage_tracker.summary()
+    if not summary:
+        return "Model usage: no LLM calls"
+    lines = [f"{'role':<20} {'model':<36} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'prompt tok':>11} {'compl tok':>10}"]
+    for role, row in sorted(summary.items()):
+        lines.append(f"{role:<20} {row['model']:<36} {row['calls']:>6} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['prompt_tokens']:>11} {row['completion_tokens']:>10}")
+    return "Model usage by role:\n" + "\n".join(lines)
@@ -0,0 +1,249 @@
+# cache of finished research summaries, matched by character n-gram similarity
+import os
+import re
+import json
+import math
+import time
+import difflib
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain_core.tools import BaseTool, StructuredTool
+from mcp.types import TextContent
+from pydantic import BaseModel, Field
+
+from mcp_pool import MCPSessionPool
+from prompts import RESEARCH_SUMMARY_PROMPT
+from tracing import tracer
+
+# Filler words that don't change what is being asked
+STOPWORDS = {
+    "a", "an", "the", "what", "whats", "what's", "is", "are", "was", "were", "please", "can", "could", "you", "tell", "me",
+    "find", "look", "up", "out", "research", "search", "about", "for", "of", "on", "in", "give", "i", "we", "need", "to", "know",
+    "current", "currently", "latest", "now", "some", "info", "information", "do", "does", "kindly", "quick", "quickly",
+}
+TOPIC_PATTERNS = (
+    ("finance", re.compile(r"\b(?:rates?|yields?|bonds?|treasury|stocks?|shares?|prices?|exchange|naira|dollars?|inflation|interest|markets?|forex|fx|cbn)\b", re.IGNORECASE)),
+    ("news", re.compile(r"\b(?:news|today|tonight|yesterday|breaking|this week|headlines?|update|updates)\b", re.IGNORECASE)),
+)
+NGRAM = 3
+
+
+def normalize_question(question: str) -> str:
+    """Lowercases, drops punctuation and filler words, so rewordings of the same question compare equal."""
+    words = re.findall(r"[a-z0-9']+", question.lower())
+    return " ".join(w for w in words if w not in STOPWORDS)
+
+
+def detect_topic(question: str) -> str:
+    for topic, pattern in TOPIC_PATTERNS:
+        if pattern.search(question):
+            return topic
+    return "general"
+
+
+def ngrams(normalized: str) -> Counter:
+    """Character n-grams of each padded word, so word order doesn't matter."""
+    grams: Counter = Counter()
+    for word in normalized.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + NGRAM] for i in range(max(1, len(padded) - NGRAM + 1)))
+    return grams
+
+
+def _numbers(normalized: str) -> Tuple[str, ...]:
+    # Years, amounts and dates must match exactly even when the wording is close
+    return tuple(sorted(re.findall(r"\d+", normalized)))
+
+
+def words_covered(a: str, b: str, cutoff: float = 0.75) -> bool:
+    """True when every word of each question has a close spelling in the other (e.g. labor/labour, rate/rates).
+
+    Checking both directions keeps extra qualifiers ("Ghana inflation rate"
+    vs "inflation rate") from matching the broader question.
+    """
+    words_a, words_b = a.split(), b.split()
+    return all(
+        word.isdigit() or difflib.get_close_matches(word, other, n=1, cutoff=cutoff)
+        for words, other in ((words_a, words_b), (words_b, words_a))
+        for word in words
+    )
+
+
+def cosine(a: Counter, b: Counter, norm_a: float, norm_b: float) -> float:
+    if not norm_a or not norm_b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(count * b.get(gram, 0) for gram, count in a.items()) / (norm_a * norm_b)
+
+
+class _Entry:
+    __slots__ = ("question", "normalized", "topic", "summary", "stored_at", "grams", "norm", "numbers")
+
+    def __init__(self, question: str, normalized: str, topic: str, summary: str, stored_at: float):
+        self.question = question
+        self.normalized = normalized
+        self.topic = topic
+        self.summary = summary
+        self.stored_at = stored_at
+        self.grams = ngrams(normalized)
+        self.norm = math.sqrt(sum(c * c for c in self.grams.values()))
+        self.numbers = _numbers(normalized)
+
+
+class ResearchCache:
+    """Finished research summaries keyed by question, with per-topic freshness.
+
+    A question matches a cached one when their normalized text is equal or
+    their character n-gram cosine similarity reaches `threshold` and every
+    word of each has a close counterpart in the other (numbers
+    must match exactly, and so must the topic). Entries are kept in LRU order
+    and persisted to a JSON file when `path` is set.
+    """
+
+    def __init__(self, ttl: Dict[str, float], threshold: float = 0.7, max_size: int = 256, path: str = ""):
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_size = max_size
+        self.path = path
+        self.stats = {"hits": 0, "similar_hits": 0, "misses": 0, "refreshes": 0, "expired": 0}
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _ttl(self, topic: str) -> float:
+        return self.ttl.get(topic, self.ttl["general"])
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                rows = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for row in rows:
+            if now - row["stored_at"] < self._ttl(row["topic"]):
+                self._entries[row["normalized"]] = _Entry(row["question"], row["normalized"], row["topic"], row["summary"], row["stored_at"])
+
+    def _save(self):
+        if not self.path:
+            return
+        rows = [{"question": e.question, "normalized": e.normalized, "topic": e.topic, "summary": e.summary, "stored_at": e.stored_at} for e in self._entries.values()]
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(rows, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"WARNING: Failed to persist research cache: {str(e)}")
+
+    def get(self, question: str, topic: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Returns the freshest matching summary with its age and similarity, or None."""
+        normalized = normalize_question(question)
+        topic = topic or detect_topic(question)
+        if not normalized:
+            return None
+        now = time.time()
+        with self._lock:
+            best, score = self._entries.get(normalized), 1.0
+            if best is None or best.topic != topic:
+                best, score = None, 0.0
+                grams = ngrams(normalized)
+                norm = math.sqrt(sum(c * c for c in grams.values()))
+                numbers = _numbers(normalized)
+                for entry in self._entries.values():
+                    if entry.topic != topic or entry.numbers != numbers:
+                        continue
+                    similarity = cosine(grams, entry.grams, norm, entry.norm)
+                    if similarity >= self.threshold and similarity > score and words_covered(normalized, entry.normalized):
+                        best, score = entry, similarity
+            if best is not None and now - best.stored_at >= self._ttl(best.topic):
+                del self._entries[best.normalized]
+                self.stats["expired"] += 1
+                best = None
+            if best is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(best.normalized)
+            self.stats["hits"] += 1
+            if score < 1.0:
+                self.stats["similar_hits"] += 1
+            return {"question": best.question, "topic": best.topic, "summary": best.summary, "age_s": round(now - best.stored_at), "similarity": round(score, 3)}
+
+    def put(self, question: str, summary: str, topic: Optional[str] = None):
+        normalized = normalize_question(question)
+        if not normalized:
+            return
+        with self._lock:
+            self._entries[normalized] = _Entry(question, normalized, topic or detect_topic(question), summary, time.time())
+            self._entries.move_to_end(normalized)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def format_stats(self) -> str:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        if not lookups and not self.stats["refreshes"]:
+            return "Research cache: no lookups"
+        rate = self.stats["hits"] / lookups if lookups else 0.0
+        return f"Research cache: {self.stats['hits']}/{lookups} hits ({rate:.0%}, {self.stats['similar_hits']} by similarity), {self.stats['refreshes']} forced refreshes, {self.stats['expired']} expired"
+
+
+def research_cache_from_env() -> ResearchCache:
+    return ResearchCache(
+        ttl={
+            "general": float(os.getenv("RESEARCH_CACHE_TTL_GENERAL", str(24 * 3600))),
+            "news": float(os.getenv("RESEARCH_CACHE_TTL_NEWS", "3600")),
+            "finance": float(os.getenv("RESEARCH_CACHE_TTL_FINANCE", "3600")),
+        },
+        threshold=float(os.getenv("RESEARCH_CACHE_SIMILARITY", "0.7")),
+        max_size=int(os.getenv("RESEARCH_CACHE_SIZE", "256")),
+        path=os.getenv("RESEARCH_CACHE_PATH", os.path.join(".cache", "research_cache.json")),
+    )
+
+
+class ResearchInput(BaseModel):
+    question: str = Field(description="The research question, self-contained (e.g. 'Nigerian 10-year bond yield')")
+    force_refresh: bool = Field(default=False, description="Ignore any cached answer and research again (when the user asks for fresh or updated figures)")
+
+
+def _search_text(result) -> str:
+    return "\n".join(c.text for c in result.content if isinstance(c, TextContent))
+
+
+def make_research_tool(mcp_pool: MCPSessionPool, llm_factory: Callable[[], Any], cache: ResearchCache) -> BaseTool:
+    async def research(question: str, force_refresh: bool = False) -> Dict[str, Any]:
+        topic = detect_topic(question)
+        if force_refresh:
+            cache.stats["refreshes"] += 1
+        else:
+            cached = cache.get(question, topic)
+            if cached is not None:
+                return {"summary": cached["summary"], "cached": True, "age_s": cached["age_s"], "topic": topic}
+        result = await mcp_pool.call_tool("internet_search", "internet_search", {"query": question, "max_results": 5, "topic": topic})
+        results = _search_text(result)
+        try:
+            payload = json.loads(results)
+        except ValueError:
+            payload = None
+        if result.isError or (isinstance(payload, dict) and payload.get("status") == "error"):
+            return {"error": payload if isinstance(payload, dict) else results, "cached": False}
+        with tracer.span("llm.research_summary", "llm", topic=topic):
+            response = await llm_factory().ainvoke(RESEARCH_SUMMARY_PROMPT.format(question=question, results=results))
+        summary = response.content if isinstance(response.content, str) else str(response.content)
+        cache.put(question, summary, topic)
+        return {"summary": summary, "cached": False, "age_s": 0, "topic": topic}
+
+    return StructuredTool.from_function(
+        coroutine=research,
+        name="research",
+        description="Answers a research question with a finished, sourced summary of a web search. Repeated or reworded questions are answered instantly from recent results; set force_refresh for fresh figures.",
+        args_schema=ResearchInput,
+    )
@@ -0,0 +1,378 @@
+# multi-session HTTP/WebSocket front end for Blaqie
+import os
+import hmac
+import json
+import uuid
+import asyncio
+import ipaddress
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Union
+
+from fastapi import Depends, FastAPI, HTTPException, WebSocket, WebSocketDisconnect, WebSocketException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from starlette.requests import HTTPConnection
+from langchain_core.messages import AIMessageChunk, BaseMessage, HumanMessage
+from langgraph.types import Command
+
+import blaqie_mcp
+import hitl_parser
+import model_tiers
+from checkpointer import open_checkpointer
+from compaction import compact_thread
+from mcp_pool import MCPSessionPool
+from tracing import TracingCallbackHandler, configure_from_env, tracer
+
+# Backpressure: at most this many agent runs at once across all sessions
+MAX_CONCURRENT_RUNS = int(os.getenv("SERVER_MAX_CONCURRENT_RUNS", "8"))
+# How long a request waits for a free run slot before being rejected with 429
+RUN_QUEUE_TIMEOUT = float(os.getenv("SERVER_RUN_QUEUE_TIMEOUT", "30"))
+# Anyone who can reach the server can send messages and approve them, so it listens on loopback unless a token is set
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_API_TOKEN = os.getenv("SERVER_API_TOKEN", "")
+
+
+class MessageRequest(BaseModel):
+    message: str
+
+
+class EditRequest(BaseModel):
+    action: str
+    args: Dict[str, Any]
+
+
+class RunSlot:
+    """A held session lock plus a global run slot; release() is idempotent."""
+
+    def __init__(self, session_lock: asyncio.Lock, run_slots: asyncio.Semaphore):
+        self._session_lock = session_lock
+        self._run_slots = run_slots
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._run_slots.release()
+            self._session_lock.release()
+
+
+def serialize_message(message: BaseMessage) -> Dict[str, Any]:
+    return {
+        "id": message.id,
+        "type": message.type,
+        "name": getattr(message, "name", None),
+        "content": message.content,
+        "tool_calls": getattr(message, "tool_calls", []),
+    }
+
+
+class AgentRuntime:
+    """One compiled agent, MCP pool and checkpointer shared by every session."""
+
+    def __init__(self):
+        self.agent = None
+        self.valid_tools: List[str] = []
+        self.compactor = blaqie_mcp.build_compactor()
+        self.mcp_pool = MCPSessionPool(
+            blaqie_mcp.mcp_client,
+            max_concurrency=int(os.getenv("MCP_MAX_CONCURRENCY", "4")),
+            schema_cache_path=blaqie_mcp.MCP_SCHEMA_CACHE,
+            idempotent_tools=blaqie_mcp.IDEMPOTENT_TOOLS,
+        )
+        self.run_slots = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+        self.audio_queue = None
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        # Approval-policy decisions for actions still pending alongside ones that need a human, by thread
+        self._auto_decisions: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._exit_stack = AsyncExitStack()
+
+    async def start(self):
+        configure_from_env()
+        tools = blaqie_mcp.add_agent_tools(await self.mcp_pool.get_tools(), self.mcp_pool)
+        self.mcp_pool.warm_up()
+        self.valid_tools = [tool.name for tool in tools]
+        checkpointer = await self._exit_stack.enter_async_context(
+            open_checkpointer(
+                os.getenv("CHECKPOINTER", "memory"),
+                os.getenv("CHECKPOINT_DB", "blaqie_checkpoints.db"),
+                int(os.getenv("CHECKPOINT_KEEP_LAST", "20")),
+            )
+        )
+        self.agent = blaqie_mcp.build_agent(tools, checkpointer)
+        self.audio_queue = blaqie_mcp.build_audio_queue(self.mcp_pool)
+        print(f"Server ready with {len(tools)} tools, max {MAX_CONCURRENT_RUNS} concurrent runs")
+
+    async def close(self):
+        if self.audio_queue:
+            await self.audio_queue.close()
+        await self._exit_stack.aclose()
+        await self.mcp_pool.close()
+        tracer.close()
+        print(model_tiers.format_usage())
+        print(blaqie_mcp.research_cache.format_stats())
+        print(blaqie_mcp.approval_policy.format_stats())
+
+    @staticmethod
+    def config(thread_id: str) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": thread_id}}
+
+    async def acquire(self, thread_id: str) -> RunSlot:
+        """Reserves the session and a run slot, or raises 409 (session busy) / 429 (server busy)."""
+        session_lock = self._session_locks.setdefault(thread_id, asyncio.Lock())
+        if session_lock.locked():
+            raise HTTPException(status_code=409, detail="A run is already in progress for this session")
+        await session_lock.acquire()
+        try:
+            await asyncio.wait_for(self.run_slots.acquire(), timeout=RUN_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            session_lock.release()
+            raise HTTPException(status_code=429, detail="Server is busy, try again shortly")
+        return RunSlot(session_lock, self.run_slots)
+
+    async def pending_actions(self, thread_id: str) -> List[Dict[str, Any]]:
+        """Pending actions that still need a human decision."""
+        state = await self.agent.aget_state(self.config(thread_id))
+        if not state.interrupts:
+            return []
+        auto = self._auto_decisions.get(thread_id, {})
+        return [item for index, item in enumerate(blaqie_mcp.extract_interrupts(state)) if index not in auto]
+
+    async def resume_command(self, thread_id: str, decision: Dict[str, Any]) -> Command:
+        """Turns an approve/edit/respond/reply decision into one Command covering every pending action."""
+        state = await self.agent.aget_state(self.config(thread_id))
+        all_items = blaqie_mcp.extract_interrupts(state) if state.interrupts else []
+        auto = self._auto_decisions.get(thread_id, {})
+        if any(index >= len(all_items) for index in auto):
+            auto = {}
+        items = [item for index, item in enumerate(all_items) if index not in auto]
+        if not items:
+            raise HTTPException(status_code=404, detail="No pending approval for this session")
+        if decision["type"] == "accept":
+            decisions = [decision] * len(items)
+        elif decision["type"] == "reply" and len(items) > 1:
+            parsed = hitl_parser.parse_batch_reply(decision["args"], len(items))
+            if parsed is None:
+                parsed = await blaqie_mcp.parse_batch_with_llm(items, decision["args"], self.valid_tools) or {}
+            decisions = []
+            for index, item in enumerate(items, 1):
+                choice = parsed.get(index, {"type": "respond", "args": "No decision given for this action, please ask the user again."})
+                if isinstance(choice, str):
+                    choice = await blaqie_mcp.parse_user_response(item["action"], item["args"], item["config"], choice, self.valid_tools)
+                decisions.append(choice)
+        elif len(items) > 1:
+            raise HTTPException(status_code=400, detail="Several actions are pending; use /approve or /reply to decide them together")
+        elif decision["type"] == "reply":
+            item = items[0]
+            decisions = [await blaqie_mcp.parse_user_response(item["action"], item["args"], item["config"], decision["args"], self.valid_tools)]
+        else:
+            decisions = [decision]
+        reviewed = iter(decisions)
+        decisions = [auto[index] if index in auto else next(reviewed) for index in range(len(all_items))]
+        resume_values = []
+        for item, choice in zip(all_items, decisions):
+            resume_value = blaqie_mcp.build_resume_value(choice, item["config"])
+            if resume_value is None:
+                raise HTTPException(status_code=400, detail=f"Invalid or disallowed action: {choice['type']}")
+            resume_values.append(resume_value[0])
+        self._auto_decisions.pop(thread_id, None)
+        return blaqie_mcp.build_batch_command(all_items, resume_values)
+
+    async def run(self, thread_id: str, payload: Union[str, Command], slot: RunSlot) -> AsyncIterator[Dict[str, Any]]:
+        """Runs a new message or a resume command and yields message, interrupt and done events."""
+        config = self.config(thread_id)
+        # Started without becoming current: the context of an async generator isn't stable across yields
+        turn = tracer.start_span("turn", "turn", thread_id=thread_id, resume=isinstance(payload, Command))
+        if turn is not None:
+            config["callbacks"] = [TracingCallbackHandler(tracer, parent=turn)]
+        status, error = "ok", None
+        try:
+            if isinstance(payload, str):
+                await compact_thread(self.agent, config, self.compactor)
+                payload = {"messages": [HumanMessage(content=payload)], "current_time": blaqie_mcp.current_time_str()}
+            state = await self.agent.aget_state(config)
+            seen = {m.id for m in state.values.get("messages", [])}
+            while True:
+                async for mode, chunk in self.agent.astream(payload, config=config, stream_mode=["messages", "values"]):
+                    if mode == "messages":
+                        # Token deltas for live rendering; complete messages follow as "message" events
+                        message, metadata = chunk
+                        if isinstance(message, AIMessageChunk) and isinstance(message.content, str) and message.content:
+                            yield {"event": "token", "data": {"id": message.id, "node": metadata.get("langgraph_node"), "content": message.content}}
+                        continue
+                    for message in chunk.get("messages", []):
+                        if message.id not in seen:
+                            seen.add(message.id)
+                            yield {"event": "message", "data": serialize_message(message)}
+                state = await self.agent.aget_state(config)
+                items = blaqie_mcp.extract_interrupts(state) if state.interrupts else []
+                auto = blaqie_mcp.apply_approval_policy(items, thread_id)
+                if not items or len(auto) < len(items):
+                    break
+                # The policy settled every pending send, so resume without waiting for a human
+                yield {"event": "auto_decision", "data": {"actions": [{**item, "decision": auto[i]} for i, item in enumerate(items)]}}
+                payload = blaqie_mcp.build_batch_command(items, [blaqie_mcp.build_resume_value(auto[i], item["config"])[0] for i, item in enumerate(items)])
+            self._auto_decisions.pop(thread_id, None)
+            if state.interrupts:
+                self._auto_decisions[thread_id] = auto
+                auto_decided = [{**item, "decision": auto[i]} for i, item in enumerate(items) if i in auto]
+                yield {"event": "interrupt", "data": {"actions": [item for i, item in enumerate(items) if i not in auto], "auto_decided": auto_decided}}
+            elif self.audio_queue:
+                self.audio_queue.enqueue(thread_id, blaqie_mcp.last_reply(state))
+            yield {"event": "done", "data": {"thread_id": thread_id, "awaiting_approval": bool(state.interrupts)}}
+        except Exception as e:
+            status, error = "error", repr(e)
+            yield {"event": "error", "data": {"detail": str(e)}}
+        finally:
+            tracer.end_span(turn, status, error)
+            slot.release()
+
+
+runtime = AgentRuntime()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await runtime.start()
+    try:
+        yield
+    finally:
+        await runtime.close()
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+async def require_token(connection: HTTPConnection):
+    """Checks `Authorization: Bearer <SERVER_API_TOKEN>` (or `?token=` for WebSockets) when a token is configured."""
+    if not SERVER_API_TOKEN:
+        return
+    header = connection.headers.get("authorization", "")
+    supplied = header[len("Bearer "):] if header.startswith("Bearer ") else connection.query_params.get("token", "")
+    if hmac.compare_digest(supplied.encode(), SERVER_API_TOKEN.encode()):
+        return
+    if connection.scope["type"] == "websocket":
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+    raise HTTPException(status_code=401, detail="Missing or invalid API token")
+
+
+app = FastAPI(title="Blaqie", lifespan=lifespan, dependencies=[Depends(require_token)])
+
+
+async def _sse(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for event in events:
+        yield f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False, default=str)}\n\n"
+
+
+async def _stream(thread_id: str, payload: Union[str, Command], slot: RunSlot) -> StreamingResponse:
+    return StreamingResponse(
+        _sse(runtime.run(thread_id, payload, slot)),
+        media_type="text/event-stream",
+        background=BackgroundTask(slot.release),  # in case the client goes away before streaming starts
+    )
+
+
+async def _resume(thread_id: str, decision: Dict[str, Any]) -> StreamingResponse:
+    slot = await runtime.acquire(thread_id)
+    try:
+        command = await runtime.resume_command(thread_id, decision)
+    except BaseException:
+        slot.release()
+        raise
+    return await _stream(thread_id, command, slot)
+
+
+@app.post("/sessions")
+async def create_session() -> Dict[str, str]:
+    return {"thread_id": str(uuid.uuid4())}
+
+
+@app.post("/sessions/{thread_id}/messages")
+async def send_message(thread_id: str, request: MessageRequest) -> StreamingResponse:
+    slot = await runtime.acquire(thread_id)
+    return await _stream(thread_id, request.message, slot)
+
+
+@app.get("/sessions/{thread_id}/interrupt")
+async def get_interrupt(thread_id: str) -> Dict[str, Any]:
+    actions = await runtime.pending_actions(thread_id)
+    if not actions:
+        raise HTTPException(status_code=404, detail="No pending approval for this session")
+    return {"actions": actions}
+
+
+@app.post("/sessions/{thread_id}/approve")
+async def approve(thread_id: str) -> StreamingResponse:
+    return await _resume(thread_id, {"type": "accept", "args": {}})
+
+
+@app.post("/sessions/{thread_id}/edit")
+async def edit(thread_id: str, request: EditRequest) -> StreamingResponse:
+    return await _resume(thread_id, {"type": "edit", "args": {"action": request.action, "args": request.args}})
+
+
+@app.post("/sessions/{thread_id}/respond")
+async def respond(thread_id: str, request: MessageRequest) -> StreamingResponse:
+    return await _resume(thread_id, {"type": "respond", "args": request.message})
+
+
+@app.post("/sessions/{thread_id}/reply")
+async def reply(thread_id: str, request: MessageRequest) -> StreamingResponse:
+    """Natural-language approval reply, interpreted like the CLI does."""
+    return await _resume(thread_id, {"type": "reply", "args": request.message})
+
+
+@app.websocket("/sessions/{thread_id}/ws")
+async def session_socket(websocket: WebSocket, thread_id: str):
+    """Accepts {"type": "message"|"approve"|"edit"|"respond"|"reply", ...} frames and streams events back."""
+    await websocket.accept()
+    try:
+        while True:
+            frame = await websocket.receive_json()
+            frame_type = frame.get("type")
+            try:
+                slot = await runtime.acquire(thread_id)
+                try:
+                    if frame_type == "message":
+                        payload: Union[str, Command] = frame["message"]
+                    elif frame_type == "approve":
+                        payload = await runtime.resume_command(thread_id, {"type": "accept", "args": {}})
+                    elif frame_type == "edit":
+                        decision = {"type": "edit", "args": {"action": frame["action"], "args": frame.get("args", {})}}
+                        payload = await runtime.resume_command(thread_id, decision)
+                    elif frame_type in ("respond", "reply"):
+                        payload = await runtime.resume_command(thread_id, {"type": frame_type, "args": frame["message"]})
+                    else:
+                        raise HTTPException(status_code=400, detail=f"Unknown frame type: {frame_type}")
+                except BaseException:
+                    slot.release()
+                    raise
+            except (HTTPException, KeyError) as e:
+                detail = e.detail if isinstance(e, HTTPException) else f"Missing field: {e}"
+                await websocket.send_json({"event": "error", "data": {"detail": detail}})
+                continue
+            events = runtime.run(thread_id, payload, slot)
+            try:
+                async for event in events:
+                    await websocket.send_json(jsonable_encoder(event))
+            finally:
+                await events.aclose()
+                slot.release()
+    except WebSocketDisconnect:
+        pass
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    if not is_loopback(SERVER_HOST) and not SERVER_API_TOKEN:
+        raise SystemExit(f"ERROR: Refusing to listen on {SERVER_HOST} without SERVER_API_TOKEN; set a token or use SERVER_HOST=127.0.0.1")
+    # A single worker: the agent, MCP pool and run limits are shared in-process
+    uvicorn.run(app, host=SERVER_HOST, port=int(os.getenv("SERVER_PORT", "8000")))
@@ -0,0 +1,37 @@
+# employee directory mcp server
+import os
+import sys
+import asyncio
+
+from mcp.server.fastmcp import FastMCP
+from dotenv import load_dotenv
+
+# The directory index is shared with the agent process (used by the HITL fast path)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from employee_directory import EmployeeDirectory  # noqa: E402
+
+load_dotenv()
+
+mcp = FastMCP("employee_directory")
+
+EMPLOYEE_DIRECTORY = os.getenv("EMPLOYEE_DIRECTORY", "employees.csv")
+EMPLOYEE_DIRECTORY_TABLE = os.getenv("EMPLOYEE_DIRECTORY_TABLE", "employees")
+directory = EmployeeDirectory(EMPLOYEE_DIRECTORY, table=EMPLOYEE_DIRECTORY_TABLE)
+
+
+def _lookup_employee(name: str, limit: int) -> dict:
+    if not os.path.exists(EMPLOYEE_DIRECTORY):
+        return {"query": name, "matches": [], "error": f"Employee directory '{EMPLOYEE_DIRECTORY}' not found"}
+    matches = directory.lookup(name, limit=max(1, min(limit, 20)))
+    return {"query": name, "matches": matches, "ambiguous": len(matches) > 1 and directory.resolve(name) is None}
+
+
+@mcp.tool()
+async def lookup_employee(name: str, limit: int = 5) -> dict:
+    """Looks up employees by full name, name prefix or approximate spelling. Returns each match's phone number (WhatsApp), email and Slack member ID."""
+    # Directory reloads and lookups touch disk, so keep them off the event loop
+    return await asyncio.to_thread(_lookup_employee, name, limit)
+
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
@@ -1,31 +1,243 @@
-# internet search mcp server
+# generate audio mcp server
 import os
+import re
+import sys
+import json
 import time
+import uuid
+import wave
+import asyncio
+import hashlib
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from typing import Dict, List, Union
 from groq import Groq
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
+from outbound import OutboundError, classify_http, scheduler_from_env
 
 load_dotenv()
 
 mcp = FastMCP("generate_audio")
 
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Retries are handled by the shared scheduler (which honours Retry-After) rather than the SDK
+groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+groq_scheduler = scheduler_from_env("groq", classify_http, rate=2, burst=4)
 
 # Create recordings folder
 RECORDINGS_DIR = "recordings"
 os.makedirs(RECORDINGS_DIR, exist_ok=True)
 
-@mcp.tool()
-def generate_audio(text: str, voice: str = "Fritz-PlayAI", model: str = "playai-tts", response_format: str = "wav") -> str:
-    """Converts text to speech using the Groq API and saves the audio file locally."""
+# Retention policy for the recordings folder (0 disables a limit)
+RECORDINGS_MAX_BYTES = int(os.getenv("RECORDINGS_MAX_BYTES", str(500 * 1024 * 1024)))
+RECORDINGS_MAX_AGE_DAYS = float(os.getenv("RECORDINGS_MAX_AGE_DAYS", "30"))
+
+# Long texts are split at sentence boundaries and synthesized concurrently
+TTS_CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", "400"))
+TTS_MAX_WORKERS = int(os.getenv("TTS_MAX_WORKERS", "4"))
+# How long a returned first segment is kept safe from retention so the caller has time to play it
+TTS_SEGMENT_HOLD_SECONDS = float(os.getenv("TTS_SEGMENT_HOLD_SECONDS", "600"))
+_executor = ThreadPoolExecutor(max_workers=TTS_MAX_WORKERS, thread_name_prefix="tts")
+
+# Whole requests and chunk segments are counted separately so chunked requests don't skew the hit rate
+_stats = {"hits": 0, "misses": 0, "segment_hits": 0, "segment_misses": 0, "bytes_saved": 0, "evicted_files": 0, "evicted_bytes": 0}
+_stats_lock = threading.Lock()
+# Paths that retention must not delete yet (segments being joined, first segments handed to a caller)
+_in_use: Counter = Counter()
+
+
+def _release(paths: List[str]):
+    with _stats_lock:
+        _in_use.subtract(paths)
+        for path in set(paths):
+            if _in_use[path] <= 0:
+                del _in_use[path]
+
+
+def audio_cache_path(text: str, voice: str, model: str, response_format: str) -> str:
+    """Returns the content-addressed path for a synthesis request."""
+    key = json.dumps([text, voice, model, response_format], ensure_ascii=False)
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(RECORDINGS_DIR, f"audio_{digest}.{response_format}")
+
+
+def enforce_retention(keep: str = ""):
+    """Deletes recordings older than the max age, then least recently used ones until under the size limit."""
+    now = time.time()
+    files = []
+    with _stats_lock:
+        in_use = set(_in_use)
+    for entry in os.scandir(RECORDINGS_DIR):
+        if entry.is_file() and entry.name.startswith("audio_") and not entry.name.endswith(".tmp"):
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    evicted = []
+    if RECORDINGS_MAX_AGE_DAYS > 0:
+        cutoff = now - RECORDINGS_MAX_AGE_DAYS * 86400
+        evicted = [f for f in files if f[0] < cutoff and f[2] != keep and f[2] not in in_use]
+        files = [f for f in files if f not in evicted]
+    if RECORDINGS_MAX_BYTES > 0:
+        files.sort()  # oldest mtime (least recently used) first
+        total = sum(f[1] for f in files)
+        for f in files:
+            if total <= RECORDINGS_MAX_BYTES:
+                break
+            if f[2] != keep and f[2] not in in_use:
+                evicted.append(f)
+                total -= f[1]
+    for _, size, path in evicted:
+        with _stats_lock:
+            # Re-checked under the lock: a chunked request may have claimed the segment since the scan
+            if _in_use[path]:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            _stats["evicted_files"] += 1
+            _stats["evicted_bytes"] += size
+
+
+def split_sentences(text: str, max_chars: int) -> List[str]:
+    """Splits text at sentence boundaries into chunks of at most max_chars (a single long sentence stays whole)."""
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+|\n{2,}", text.strip()) if s.strip()]
+    chunks, current = [], ""
+    for sentence in sentences:
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def join_wav_segments(segment_paths: List[str], output_path: str):
+    """Concatenates WAV segments by copying their PCM frames (no re-encoding)."""
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
     try:
-        timestamp = time.strftime("%Y%m%d%H%M%S")
-        audio_file_path = os.path.join(RECORDINGS_DIR, f"audio_{timestamp}.wav")
-        response = groq_client.audio.speech.create(model=model, voice=voice, input=text, response_format=response_format)
-        response.write_to_file(audio_file_path)
+        with wave.open(tmp_path, "wb") as out:
+            params = None
+            for path in segment_paths:
+                with wave.open(path, "rb") as segment:
+                    if params is None:
+                        params = segment.getparams()
+                        out.setparams(params)
+                    elif segment.getparams()[:3] != params[:3]:
+                        raise ValueError(f"Segment {path} has a different audio format")
+                    out.writeframes(segment.readframes(segment.getnframes()))
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _cache_hit(audio_file_path: str, segment: bool = False) -> bool:
+    size = None
+    # Retention may delete the file between lookups; a file that vanished is a miss
+    with suppress(FileNotFoundError):
+        os.utime(audio_file_path)  # refresh for LRU retention
+        size = os.path.getsize(audio_file_path)
+    prefix = "segment_" if segment else ""
+    with _stats_lock:
+        if size is None:
+            _stats[f"{prefix}misses"] += 1
+            return False
+        _stats[f"{prefix}hits"] += 1
+        _stats["bytes_saved"] += size
+    return True
+
+
+def synthesize(text: str, voice: str, model: str, response_format: str, segment: bool = False) -> str:
+    """Synthesizes text (or reuses the cached file) and returns the audio path."""
+    audio_file_path = audio_cache_path(text, voice, model, response_format)
+    if _cache_hit(audio_file_path, segment):
+        return audio_file_path
+    # Write to a unique temp file and rename so concurrent calls never see partial audio
+    tmp_path = f"{audio_file_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        response = groq_scheduler.call(groq_client.audio.speech.create, model=model, voice=voice, input=text, response_format=response_format)
+        response.write_to_file(tmp_path)
+        os.replace(tmp_path, audio_file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    if not segment:
+        enforce_retention(keep=audio_file_path)
+    return audio_file_path
+
+
+def synthesize_chunked(text: str, chunks: List[str], voice: str, model: str, return_first_segment: bool) -> str:
+    audio_file_path = audio_cache_path(text, voice, model, "wav")
+    if _cache_hit(audio_file_path):
+        return f"Audio file saved successfully to {audio_file_path}"
+    # Other requests' retention must not delete these segments before they are joined
+    segment_paths = [audio_cache_path(chunk, voice, model, "wav") for chunk in chunks]
+    with _stats_lock:
+        _in_use.update(segment_paths)
+    futures = [_executor.submit(synthesize, chunk, voice, model, "wav", True) for chunk in chunks]
+
+    def finish():
+        try:
+            join_wav_segments([f.result() for f in futures], audio_file_path)
+        finally:
+            _release(segment_paths)
+        # Retention runs once per request, after the join
+        enforce_retention(keep=audio_file_path)
+
+    if not return_first_segment:
+        finish()
+        return f"Audio file saved successfully to {audio_file_path}"
+
+    # The caller plays the first segment after this returns, so it stays protected for a while after the join
+    with _stats_lock:
+        _in_use[segment_paths[0]] += 1
+    hold = threading.Timer(TTS_SEGMENT_HOLD_SECONDS, _release, args=([segment_paths[0]],))
+    hold.daemon = True
+    hold.start()
+
+    def finish_in_background():
+        try:
+            finish()
+        except Exception as e:
+            print(f"ERROR: Failed to assemble chunked audio {audio_file_path}: {str(e)}", file=sys.stderr)
+
+    # Started first so the segments are released even if the first one fails
+    threading.Thread(target=finish_in_background, daemon=True).start()
+    first_segment = futures[0].result()
+    return f"First audio segment ready at {first_segment}; full audio will be saved to {audio_file_path}"
+
+
+def _generate_audio(text: str, voice: str, model: str, response_format: str, chunked: bool, return_first_segment: bool) -> Union[str, Dict]:
+    try:
+        chunks = split_sentences(text, TTS_CHUNK_CHARS) if chunked and response_format == "wav" else []
+        if len(chunks) > 1:
+            return synthesize_chunked(text, chunks, voice, model, return_first_segment)
+        audio_file_path = synthesize(text, voice, model, response_format)
         return f"Audio file saved successfully to {audio_file_path}"
+    except OutboundError as e:
+        return e.to_dict()
     except Exception as e:
         return f"Failed to generate audio: {str(e)}"
 
+
+@mcp.tool()
+async def generate_audio(text: str, voice: str = "Fritz-PlayAI", model: str = "playai-tts", response_format: str = "wav", chunked: bool = False, return_first_segment: bool = False) -> Union[str, Dict]:
+    """Converts text to speech using the Groq API and saves the audio file locally. With chunked, long WAV texts are synthesized in parallel sentence chunks (faster, but each chunk is a separate API call and voice continuity across sentences may suffer); set return_first_segment as well to get the first chunk's path as soon as it is ready."""
+    # Synthesis and retry backoff block, so they run in a worker thread and concurrent requests overlap
+    return await asyncio.to_thread(_generate_audio, text, voice, model, response_format, chunked, return_first_segment)
+
+
+@mcp.tool()
+def generate_audio_stats() -> dict:
+    """Reports the audio cache hit rate and bytes saved, plus Groq rate-limit and retry counters."""
+    with _stats_lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {**_stats, "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0, "outbound": groq_scheduler.snapshot()}
+
+
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    mcp.run(transport="stdio")
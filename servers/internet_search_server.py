@@ -1,19 +1,287 @@
 # internet search mcp server
 import os
-from typing import Literal
+import re
+import json
+import time
+import hashlib
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Literal, Optional, Tuple, Union
 from tavily import TavilyClient
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
+from outbound import OutboundError, classify_http, scheduler_from_env
+from search_compaction import compact_results, estimate_tokens, normalize_url
 
 load_dotenv()
 
 mcp = FastMCP("internet_search")
 tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+# Point the client at another endpoint (e.g. the offline benchmark's fake Tavily)
+TAVILY_API_BASE_URL = os.getenv("TAVILY_API_BASE_URL", "")
+if TAVILY_API_BASE_URL:
+    tavily_client.base_url = TAVILY_API_BASE_URL.rstrip("/")
+tavily_scheduler = scheduler_from_env("tavily", classify_http, rate=5, burst=10)
+
+# Result freshness per topic, in seconds (news and finance go stale quickly)
+SEARCH_CACHE_TTL = {
+    "general": float(os.getenv("SEARCH_CACHE_TTL_GENERAL", str(24 * 3600))),
+    "news": float(os.getenv("SEARCH_CACHE_TTL_NEWS", "900")),
+    "finance": float(os.getenv("SEARCH_CACHE_TTL_FINANCE", "900")),
+}
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+# Optional on-disk tier shared across restarts; leave empty to keep the cache in memory only
+SEARCH_CACHE_DB = os.getenv("SEARCH_CACHE_DB", "")
+
+# "compact" returns ranked, de-duplicated snippets under a token cap; "full" returns the raw Tavily payload
+SEARCH_OUTPUT = os.getenv("SEARCH_OUTPUT", "compact").lower()
+SEARCH_COMPACT_MAX_TOKENS = int(os.getenv("SEARCH_COMPACT_MAX_TOKENS", "800"))
+# Full payloads behind compact results, fetched by ID with get_search_result
+SEARCH_PAYLOAD_DB = os.getenv("SEARCH_PAYLOAD_DB", os.path.join(".cache", "search_payloads.db"))
+SEARCH_PAYLOAD_MAX = int(os.getenv("SEARCH_PAYLOAD_MAX", "500"))
+
+CacheKey = Tuple[str, int, str, bool]
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases, collapses whitespace and drops trailing punctuation so trivially different queries share a cache entry."""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.strip(" ?!.,;:")
+
+
+class SearchCache:
+    """Size-bounded LRU of search results with per-topic TTL and an optional SQLite tier."""
+
+    def __init__(self, max_size: int, ttl: Dict[str, float], db_path: str = ""):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "disk_hits": 0, "shared_inflight": 0, "evictions": 0}
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # SQLite access has its own lock so memory lookups on the event loop never wait behind disk I/O
+        self._db_lock = threading.Lock()
+        self._db = None
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS search_cache (key TEXT PRIMARY KEY, topic TEXT, stored_at REAL, result TEXT)")
+            self._db.commit()
+
+    def _ttl(self, topic: str) -> float:
+        return self.ttl.get(topic, self.ttl["general"])
+
+    def _get_memory(self, key: CacheKey, now: float) -> Union[Any, None]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] < self._ttl(key[2]):
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+            if self._db is None:
+                self.stats["misses"] += 1
+            return None
+
+    def _get_disk(self, key: CacheKey, now: float) -> Union[Any, None]:
+        with self._db_lock:
+            row = self._db.execute("SELECT stored_at, result FROM search_cache WHERE key = ?", (json.dumps(key),)).fetchone()
+        with self._lock:
+            if row and now - row[0] < self._ttl(key[2]):
+                result = json.loads(row[1])
+                self._put_memory(key, row[0], result)
+                self.stats["hits"] += 1
+                self.stats["disk_hits"] += 1
+                return result
+            self.stats["misses"] += 1
+            return None
+
+    def get(self, key: CacheKey) -> Union[Any, None]:
+        now = time.time()
+        result = self._get_memory(key, now)
+        if result is None and self._db is not None:
+            result = self._get_disk(key, now)
+        return result
+
+    async def aget(self, key: CacheKey) -> Union[Any, None]:
+        """Like get, but the SQLite lookup runs in a worker thread so it never blocks the event loop."""
+        now = time.time()
+        result = self._get_memory(key, now)
+        if result is None and self._db is not None:
+            result = await asyncio.to_thread(self._get_disk, key, now)
+        return result
+
+    def _put_memory(self, key: CacheKey, stored_at: float, result: Any):
+        self._entries[key] = (stored_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _put_disk(self, key: CacheKey, stored_at: float, result: Any):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO search_cache (key, topic, stored_at, result) VALUES (?, ?, ?, ?)",
+                (json.dumps(key), key[2], stored_at, json.dumps(result)),
+            )
+            self._db.commit()
+
+    def put(self, key: CacheKey, result: Any):
+        now = time.time()
+        with self._lock:
+            self._put_memory(key, now, result)
+        if self._db is not None:
+            self._put_disk(key, now, result)
+
+    async def aput(self, key: CacheKey, result: Any):
+        """Like put, with the SQLite write in a worker thread."""
+        now = time.time()
+        with self._lock:
+            self._put_memory(key, now, result)
+        if self._db is not None:
+            await asyncio.to_thread(self._put_disk, key, now, result)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "disk_tier": self._db is not None,
+            }
+
+
+class PayloadStore:
+    """Content-addressed SQLite store of full search payloads, keeping roughly the most recent `max_entries`.
+
+    IDs already stored are remembered in memory, so a repeated payload (e.g. a
+    cache hit) costs no write; old rows are pruned every `prune_every` writes.
+    """
+
+    def __init__(self, path: str, max_entries: int, prune_every: int = 50):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._writes_since_prune = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS payloads (id TEXT PRIMARY KEY, query TEXT, stored_at REAL, payload TEXT)")
+        self._db.commit()
+        self._known = {row[0] for row in self._db.execute("SELECT id FROM payloads")}
+
+    def put(self, query: str, payload: Any) -> str:
+        text = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        payload_id = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            if payload_id in self._known:
+                return payload_id
+            self._db.execute("INSERT OR REPLACE INTO payloads (id, query, stored_at, payload) VALUES (?, ?, ?, ?)", (payload_id, query, time.time(), text))
+            self._known.add(payload_id)
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= self.prune_every:
+                self._writes_since_prune = 0
+                self._db.execute("DELETE FROM payloads WHERE id NOT IN (SELECT id FROM payloads ORDER BY stored_at DESC LIMIT ?)", (self.max_entries,))
+                self._known = {row[0] for row in self._db.execute("SELECT id FROM payloads")}
+            self._db.commit()
+        return payload_id
+
+    def get(self, payload_id: str) -> Optional[Any]:
+        with self._lock:
+            row = self._db.execute("SELECT payload FROM payloads WHERE id = ?", (payload_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+search_cache = SearchCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL, SEARCH_CACHE_DB)
+payload_store = PayloadStore(SEARCH_PAYLOAD_DB, SEARCH_PAYLOAD_MAX)
+_compact_stats = {"compacted": 0, "full_tokens": 0, "compact_tokens": 0}
+# Identical queries in flight at the same time share one upstream request
+_inflight: Dict[CacheKey, asyncio.Future] = {}
+
+
+async def _compact(query: str, result: Any) -> Any:
+    if not isinstance(result, dict) or result.get("status") == "error":
+        return result
+    compact = compact_results(query, result, SEARCH_COMPACT_MAX_TOKENS)
+    compact["result_id"] = await asyncio.to_thread(payload_store.put, query, result)
+    _compact_stats["compacted"] += 1
+    _compact_stats["full_tokens"] += estimate_tokens(json.dumps(result, ensure_ascii=False))
+    _compact_stats["compact_tokens"] += estimate_tokens(json.dumps(compact, ensure_ascii=False))
+    return compact
+
+
+async def _search(query: str, max_results: int, topic: str, include_raw_content: bool) -> dict:
+    key = (normalize_query(query), max_results, topic, include_raw_content)
+    cached = await search_cache.aget(key)
+    if cached is not None:
+        return cached
+    pending = _inflight.get(key)
+    if pending is not None:
+        search_cache.stats["shared_inflight"] += 1
+        return await asyncio.shield(pending)
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        try:
+            result = await asyncio.to_thread(tavily_scheduler.call, tavily_client.search, query, max_results=max_results, include_raw_content=include_raw_content, topic=topic)
+            await search_cache.aput(key, result)
+        except OutboundError as e:
+            # Shared with concurrent callers but never cached
+            result = e.to_dict()
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved so an unshared failure isn't logged as unhandled
+        raise
+    finally:
+        del _inflight[key]
+
+
+@mcp.tool()
+async def internet_search(query: str, max_results: int = 5, topic: Literal["general", "news", "finance"] = "general", include_raw_content: bool = False, output: Optional[Literal["compact", "full"]] = None) -> dict:
+    """Performs a web search using the Tavily API to retrieve relevant results. By default returns compact ranked snippets plus a result_id; pass it to get_search_result only if the full pages are really needed. Failures (already retried by the server, so do not repeat the call) are returned as an error object with a code (e.g. rate_limited, quota_exceeded)."""
+    result = await _search(query, max_results, topic, include_raw_content)
+    if (output or SEARCH_OUTPUT) == "full":
+        return result
+    return await _compact(query, result)
+
 
 @mcp.tool()
-def internet_search(query: str, max_results: int = 5, topic: Literal["general", "news", "finance"] = "general", include_raw_content: bool = False) -> dict:
-    """Performs a web search using the Tavily API to retrieve relevant results."""
-    return tavily_client.search(query, max_results=max_results, include_raw_content=include_raw_content, topic=topic)
+async def get_search_result(result_id: str, url: str = "") -> dict:
+    """Returns the full search payload behind a compact internet_search result_id, or only the result for one URL (including its raw page content when it was requested)."""
+    payload = await asyncio.to_thread(payload_store.get, result_id)
+    if payload is None:
+        return {"status": "error", "code": "not_found", "detail": f"No stored search result with ID '{result_id}'"}
+    if url:
+        wanted = normalize_url(url)
+        matches = [r for r in payload.get("results", []) if normalize_url(r.get("url", "")) == wanted]
+        if not matches:
+            return {"status": "error", "code": "not_found", "detail": f"URL '{url}' is not in search result '{result_id}'"}
+        return matches[0]
+    return payload
+
+
+@mcp.tool()
+def internet_search_stats() -> dict:
+    """Reports internet_search cache hit/miss counters and size, compact output savings, plus Tavily rate-limit and retry counters."""
+    compact = dict(_compact_stats)
+    if compact["full_tokens"]:
+        compact["saved_ratio"] = round(1 - compact["compact_tokens"] / compact["full_tokens"], 3)
+    return {**search_cache.snapshot(), "compact_output": compact, "outbound": tavily_scheduler.snapshot()}
+
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    mcp.run(transport="stdio")
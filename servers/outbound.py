@@ -0,0 +1,258 @@
+# shared outbound scheduler for the channel servers: token buckets, Retry-After and jittered backoff
+import os
+import sys
+import time
+import random
+import socket
+import smtplib
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Structured error codes returned to the agent instead of free-text failures
+RATE_LIMITED = "rate_limited"
+QUOTA_EXCEEDED = "quota_exceeded"
+AUTH_FAILED = "auth_failed"
+INVALID_REQUEST = "invalid_request"
+UNAVAILABLE = "unavailable"
+TIMEOUT = "timeout"
+UNKNOWN = "unknown"
+RETRYABLE = {RATE_LIMITED, UNAVAILABLE, TIMEOUT}
+
+
+class OutboundError(Exception):
+    def __init__(self, provider: str, code: str, detail: str, attempts: int = 1, retry_after: Optional[float] = None, retryable: Optional[bool] = None):
+        super().__init__(f"{provider} {code}: {detail}")
+        self.provider = provider
+        self.code = code
+        self.detail = detail
+        self.attempts = attempts
+        self.retry_after = retry_after
+        self.retryable = code in RETRYABLE if retryable is None else retryable
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": "error",
+            "code": self.code,
+            "provider": self.provider,
+            "retryable": self.retryable,
+            "retry_after": self.retry_after,
+            "attempts": self.attempts,
+            "detail": self.detail,
+        }
+
+
+class NotDelivered(Exception):
+    """Wraps a failure that happened before a send reached the provider (connect, auth), so retrying can't duplicate it."""
+
+    def __init__(self, cause: BaseException):
+        super().__init__(str(cause))
+        self.cause = cause
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float):
+        """Blocks every caller for `seconds` (used when the provider says to back off)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def parse_retry_after(value: Any) -> Optional[float]:
+    """Reads a Retry-After header value given in seconds or as an HTTP date."""
+    if value in (None, ""):
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _http_status_and_retry_after(error: BaseException) -> Tuple[Optional[int], Optional[float]]:
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = None
+    if hasattr(headers, "get"):
+        retry_after = parse_retry_after(headers.get("Retry-After") or headers.get("retry-after"))
+    return status, retry_after
+
+
+def _is_network_error(error: BaseException) -> bool:
+    # Only network failures are outages; other OSErrors (permissions, missing files) are local bugs
+    return isinstance(error, (ConnectionError, socket.gaierror))
+
+
+def classify_http(error: BaseException) -> Tuple[str, Optional[float]]:
+    """Maps HTTP client errors (Groq, Tavily, requests) to an error code and a Retry-After delay."""
+    reason = getattr(error, "reason", None)
+    if isinstance(reason, BaseException) and reason is not error:
+        # urllib (used by slack_sdk) wraps the socket error in URLError.reason
+        return classify_http(reason)
+    name = type(error).__name__
+    if isinstance(error, TimeoutError) or "Timeout" in name:
+        return TIMEOUT, None
+    if "UsageLimit" in name:
+        return QUOTA_EXCEEDED, None
+    if "InvalidAPIKey" in name or "Authentication" in name or "Forbidden" in name:
+        return AUTH_FAILED, None
+    status, retry_after = _http_status_and_retry_after(error)
+    if status == 429 or "RateLimit" in name:
+        return RATE_LIMITED, retry_after
+    if status in (432, 433):
+        return QUOTA_EXCEEDED, None
+    if status in (401, 403):
+        return AUTH_FAILED, None
+    if status is not None and 400 <= status < 500:
+        return INVALID_REQUEST, None
+    if (status is not None and status >= 500) or _is_network_error(error) or "Connection" in name:
+        return UNAVAILABLE, retry_after
+    return UNKNOWN, None
+
+
+def classify_slack(error: BaseException) -> Tuple[str, Optional[float]]:
+    response = getattr(error, "response", None)
+    if response is not None and hasattr(response, "get"):
+        slack_error = response.get("error")
+        if getattr(response, "status_code", None) == 429 or slack_error == "ratelimited":
+            return RATE_LIMITED, parse_retry_after(response.headers.get("Retry-After", 1))
+        if slack_error in ("invalid_auth", "not_authed", "token_revoked", "account_inactive", "missing_scope"):
+            return AUTH_FAILED, None
+        if slack_error in ("internal_error", "fatal_error", "service_unavailable", "request_timeout"):
+            return UNAVAILABLE, None
+        if slack_error:
+            return INVALID_REQUEST, None
+    return classify_http(error)
+
+
+def classify_smtp(error: BaseException) -> Tuple[str, Optional[float]]:
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return AUTH_FAILED, None
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return INVALID_REQUEST, None
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return UNAVAILABLE, None
+    if isinstance(error, smtplib.SMTPResponseException):
+        text = error.smtp_error.decode(errors="replace") if isinstance(error.smtp_error, bytes) else str(error.smtp_error)
+        # Gmail reports daily sending limits as 550 5.4.5 / 4.7.0 "limit exceeded"
+        if "5.4.5" in text or "limit exceeded" in text.lower():
+            return QUOTA_EXCEEDED, None
+        if error.smtp_code in (421, 450, 451, 452, 454):
+            return RATE_LIMITED if "4.7" in text else UNAVAILABLE, None
+        if error.smtp_code >= 500:
+            return INVALID_REQUEST, None
+    if isinstance(error, TimeoutError):
+        return TIMEOUT, None
+    if _is_network_error(error):
+        return UNAVAILABLE, None
+    return UNKNOWN, None
+
+
+class OutboundScheduler:
+    """Rate-limits and retries one provider's outbound calls inside the server.
+
+    Every call takes a token from the provider's bucket first. Rate limits,
+    timeouts and outages are retried with full-jitter exponential backoff
+    (at least the provider's Retry-After, which also pauses the bucket for
+    other callers); anything else, or running out of attempts or wait budget,
+    raises an OutboundError with a structured code.
+
+    `send` is for calls that deliver something (an email, a message). A
+    timeout or dropped connection there may come after delivery, so only
+    rate limits and failures wrapped in NotDelivered are retried, and other
+    failures are reported as not retryable.
+    """
+
+    def __init__(self, provider: str, classify: Callable[[BaseException], Tuple[str, Optional[float]]], rate: float, burst: int, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 30.0, max_wait: float = 60.0):
+        self.provider = provider
+        self.classify = classify
+        self.bucket = TokenBucket(rate, burst)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self.stats = {"calls": 0, "retries": 0, "errors": 0, "waited_s": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, amount: float = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs an idempotent call (a lookup, a search, a synthesis) with retries."""
+        return self._run(fn, args, kwargs, idempotent=True)
+
+    def send(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs a delivering call, retrying only failures that can't have delivered it."""
+        return self._run(fn, args, kwargs, idempotent=False)
+
+    def _run(self, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any], idempotent: bool) -> Any:
+        waited = 0.0
+        for attempt in range(1, self.max_attempts + 1):
+            self.bucket.acquire()
+            self._count("calls")
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                cause = e.cause if isinstance(e, NotDelivered) else e
+                code, retry_after = self.classify(cause)
+                safe = idempotent or isinstance(e, NotDelivered) or code == RATE_LIMITED
+                backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+                delay = max(retry_after or 0.0, backoff)
+                if code not in RETRYABLE or not safe or attempt == self.max_attempts or waited + delay > self.max_wait:
+                    self._count("errors")
+                    raise OutboundError(self.provider, code, str(cause), attempts=attempt, retry_after=retry_after, retryable=code in RETRYABLE and safe) from cause
+                if retry_after:
+                    self.bucket.pause(retry_after)
+                print(f"WARNING: {self.provider} {code} on attempt {attempt}, retrying in {delay:.2f}s", file=sys.stderr)
+                self._count("retries")
+                self._count("waited_s", delay)
+                waited += delay
+                time.sleep(delay)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {"provider": self.provider, **self.stats, "waited_s": round(self.stats["waited_s"], 3)}
+
+
+def scheduler_from_env(provider: str, classify: Callable[[BaseException], Tuple[str, Optional[float]]], rate: float, burst: int) -> OutboundScheduler:
+    """Builds a provider's scheduler; OUTBOUND_<PROVIDER>_RATE/_BURST and OUTBOUND_* settings override the defaults."""
+    prefix = f"OUTBOUND_{provider.upper()}"
+    return OutboundScheduler(
+        provider,
+        classify,
+        rate=float(os.getenv(f"{prefix}_RATE", str(rate))),
+        burst=int(os.getenv(f"{prefix}_BURST", str(burst))),
+        max_attempts=int(os.getenv("OUTBOUND_MAX_ATTEMPTS", "4")),
+        base_delay=float(os.getenv("OUTBOUND_BASE_DELAY", "0.5")),
+        max_delay=float(os.getenv("OUTBOUND_MAX_DELAY", "30")),
+        max_wait=float(os.getenv("OUTBOUND_MAX_WAIT", "60")),
+    )
@@ -0,0 +1,133 @@
+# compact search payloads: URL de-duplication, boilerplate stripping and extractive snippet ranking
+import re
+import math
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Lines that are page furniture rather than content
+BOILERPLATE_RE = re.compile(
+    r"cookie|subscribe|newsletter|sign (?:in|up)|log ?in|all rights reserved|privacy policy|terms of (?:use|service)|"
+    r"share (?:this|on)|follow us|advertisement|click here|read more|skip to (?:main )?content|accept all|"
+    r"enable javascript|download (?:the|our) app|related (?:posts|articles)|©",
+    re.IGNORECASE,
+)
+MARKDOWN_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+MARKDOWN_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+WORD_RE = re.compile(r"[a-z0-9]+")
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "ref", "mc_")
+STOPWORDS = {"a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "is", "are", "what", "how", "latest", "current", "about", "with", "by", "at"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def normalize_url(url: str) -> str:
+    """Drops scheme, www, fragments, trailing slashes and tracking parameters so mirrors of a page compare equal."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith(TRACKING_PARAMS)))
+    return f"{host}{parts.path.rstrip('/')}{'?' + query if query else ''}"
+
+
+def strip_boilerplate(text: str) -> List[str]:
+    """Returns the content lines of a page, without markdown links, images, menus, headings and banners."""
+    text = MARKDOWN_IMAGE_RE.sub("", text or "")
+    text = MARKDOWN_LINK_RE.sub(r"\1", text)
+    kept = []
+    for line in text.splitlines():
+        line = re.sub(r"\s+", " ", line.strip(" \t#*|>-"))
+        # Short lines are usually menus, headings or buttons; long ones are checked per sentence later
+        words = len(line.split())
+        if words < 4 or (words < 8 and not line.endswith((".", "!", "?"))) or (words < 25 and BOILERPLATE_RE.search(line)):
+            continue
+        kept.append(line)
+    return kept
+
+
+def _terms(text: str) -> List[str]:
+    return [w for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+
+
+def _rank_sentences(query: str, sentences: List[Tuple[int, int, str]]) -> List[Tuple[float, int, int, str]]:
+    """Scores (result, position, sentence) triples by query-term overlap weighted by rarity across sentences."""
+    query_terms = set(_terms(query))
+    if not sentences:
+        return []
+    document_frequency: Counter = Counter()
+    sentence_terms = []
+    for _, _, sentence in sentences:
+        terms = set(_terms(sentence))
+        sentence_terms.append(terms)
+        document_frequency.update(terms & query_terms)
+    total = len(sentences)
+    scored = []
+    for (result_index, position, sentence), terms in zip(sentences, sentence_terms):
+        matched = terms & query_terms
+        score = sum(math.log(1 + total / document_frequency[t]) for t in matched) / math.sqrt(max(len(terms), 1))
+        # Opening sentences tend to summarize the page
+        score += 0.05 / (1 + position)
+        scored.append((score, result_index, position, sentence))
+    return scored
+
+
+def compact_results(query: str, payload: Dict[str, Any], max_tokens: int, sentences_per_result: int = 3) -> Dict[str, Any]:
+    """Reduces a Tavily payload to de-duplicated, ranked snippets that fit in `max_tokens`."""
+    seen = set()
+    results = []
+    for result in payload.get("results", []):
+        key = normalize_url(result.get("url", ""))
+        if key in seen:
+            continue
+        seen.add(key)
+        results.append(result)
+
+    sentences: List[Tuple[int, int, str]] = []
+    seen_sentences = set()
+    for index, result in enumerate(results):
+        lines = strip_boilerplate(f"{result.get('content') or ''}\n{result.get('raw_content') or ''}")
+        for position, sentence in enumerate(s for line in lines for s in SENTENCE_RE.split(line)):
+            normalized = " ".join(WORD_RE.findall(sentence.lower()))
+            if len(normalized.split()) < 4 or normalized in seen_sentences or BOILERPLATE_RE.search(sentence):
+                continue
+            seen_sentences.add(normalized)
+            sentences.append((index, position, sentence.strip()))
+
+    by_result: Dict[int, List[Tuple[float, int, str]]] = {}
+    for score, index, position, sentence in _rank_sentences(query, sentences):
+        by_result.setdefault(index, []).append((score, position, sentence))
+    best = max((s for picks in by_result.values() for s, _, _ in picks), default=0.0) or 1.0
+    ranked = []
+    for index, result in enumerate(results):
+        picks = sorted(by_result.get(index, []), reverse=True)[:sentences_per_result]
+        relevance = picks[0][0] / best if picks else 0.0
+        snippet = " ".join(sentence for _, _, sentence in sorted(picks, key=lambda p: p[1]))
+        rank = 0.5 * float(result.get("score") or 0.0) + 0.5 * relevance
+        ranked.append((rank, {"title": result.get("title", ""), "url": result.get("url", ""), "snippet": snippet}))
+    ranked.sort(key=lambda item: -item[0])
+
+    compact: Dict[str, Any] = {"query": query}
+    if payload.get("answer"):
+        compact["answer"] = payload["answer"]
+    budget = max_tokens - estimate_tokens(str(compact)) - 40
+    kept = []
+    for rank, item in ranked:
+        cost = estimate_tokens(item["title"] + item["url"] + item["snippet"]) + 10
+        if cost > budget:
+            # Trim the snippet to what is left, at a word boundary, if that still says something
+            room = (budget - estimate_tokens(item["title"] + item["url"]) - 10) * 4
+            if room < 120:
+                break
+            item["snippet"] = item["snippet"][:room].rsplit(" ", 1)[0] + " ..."
+            cost = estimate_tokens(item["title"] + item["url"] + item["snippet"]) + 10
+        item["score"] = round(rank, 3)
+        kept.append(item)
+        budget -= cost
+    compact["results"] = kept
+    compact["omitted"] = len(payload.get("results", [])) - len(kept)
+    return compact
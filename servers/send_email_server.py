@@ -1,35 +1,197 @@
 # send email mcp server
 import os
+import ssl
+import time
+import asyncio
 import smtplib
-from typing import Union
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Union
 from mcp.server.fastmcp import FastMCP
 from email.mime.text import MIMEText
 from dotenv import load_dotenv
+from outbound import NotDelivered, OutboundError, classify_smtp, scheduler_from_env
 
 load_dotenv()
 
 mcp = FastMCP("send_email")
 
-@mcp.tool()
-def send_email(recipient_email: str, subject: str, body: str, sender_email: Union[str, None] = None, sender_password: Union[str, None] = None) -> str:
-    """Sends an email via Gmail's SMTP server to the specified recipient."""
-    sender_email = sender_email or os.getenv("GMAIL_USER")
-    sender_password = sender_password or os.getenv("GMAIL_PASSWORD")
-    if not sender_email or not sender_password:
-        return "Error: Gmail credentials not set in environment variables."
+# SMTP settings (point these at a local aiosmtpd stand-in for testing)
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "true").lower() in ("1", "true", "yes")
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "3"))
+# Gmail drops idle connections after a few minutes; don't reuse anything older than this
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", "240"))
+
+
+class SMTPConnectionPool:
+    """Keeps a few idle, logged-in SMTP connections per sender for reuse."""
+
+    def __init__(self, host: str, port: int, use_ssl: bool = True, max_idle: int = 3, idle_timeout: float = 240, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle = defaultdict(list)  # (sender, password) -> [(connection, last_used)]
+        self._lock = threading.Lock()
+
+    def _connect(self, sender_email: str, sender_password: str) -> smtplib.SMTP:
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if not self.use_ssl and server.has_extn("starttls"):
+                server.starttls(context=ssl.create_default_context())
+                server.ehlo()
+            # Sending without logging in would hand the message to an open relay (or fail later, less clearly)
+            if not server.has_extn("auth"):
+                raise smtplib.SMTPNotSupportedError(f"{self.host}:{self.port} does not offer AUTH, so the configured credentials can't be used")
+            server.login(sender_email, sender_password)
+        except BaseException:
+            server.close()
+            raise
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    @staticmethod
+    def _is_alive(server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _acquire(self, key) -> Union[smtplib.SMTP, None]:
+        while True:
+            with self._lock:
+                if not self._idle[key]:
+                    return None
+                server, last_used = self._idle[key].pop()
+            if time.monotonic() - last_used < self.idle_timeout and self._is_alive(server):
+                return server
+            self._close(server)
+
+    def _release(self, key, server: smtplib.SMTP):
+        with self._lock:
+            if len(self._idle[key]) < self.max_idle:
+                self._idle[key].append((server, time.monotonic()))
+                return
+        self._close(server)
+
+    @contextmanager
+    def connection(self, sender_email: str, sender_password: str):
+        key = (sender_email, sender_password)
+        try:
+            server = self._acquire(key) or self._connect(sender_email, sender_password)
+        except (smtplib.SMTPException, OSError) as e:
+            # Nothing has been sent yet, so the scheduler may safely retry
+            raise NotDelivered(e) from e
+        try:
+            yield server
+        except smtplib.SMTPServerDisconnected:
+            server.close()
+            raise
+        except smtplib.SMTPException:
+            # Per-message failures (e.g. rejected recipient) leave the connection usable.
+            # SMTPException subclasses OSError, so this must come before the OSError handler.
+            self._release(key, server)
+            raise
+        except OSError:
+            server.close()
+            raise
+        else:
+            self._release(key, server)
+
+    def send(self, sender_email: str, sender_password: str, msg: MIMEText):
+        # Retries belong to the scheduler alone: a failure after this point may come after delivery
+        with self.connection(sender_email, sender_password) as server:
+            server.send_message(msg)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, defaultdict(list)
+        for connections in idle.values():
+            for server, _ in connections:
+                self._close(server)
+
+
+smtp_pool = SMTPConnectionPool(SMTP_HOST, SMTP_PORT, use_ssl=SMTP_USE_SSL, max_idle=SMTP_POOL_SIZE, idle_timeout=SMTP_IDLE_TIMEOUT, timeout=SMTP_TIMEOUT)
+# Gmail throttles bursts well below its daily quota, so pace sends across both tools
+smtp_scheduler = scheduler_from_env("smtp", classify_smtp, rate=2, burst=5)
+
+
+def _build_message(sender_email: str, recipient_email: str, subject: str, body: str) -> MIMEText:
     msg = MIMEText(body)
     msg['Subject'] = subject
     msg['From'] = sender_email
     msg['To'] = recipient_email
+    return msg
+
+
+def _resolve_credentials(sender_email: Union[str, None], sender_password: Union[str, None]):
+    return sender_email or os.getenv("GMAIL_USER"), sender_password or os.getenv("GMAIL_PASSWORD")
+
+
+def _send_email(recipient_email: str, subject: str, body: str, sender_email: Union[str, None], sender_password: Union[str, None]) -> Union[str, Dict]:
+    sender_email, sender_password = _resolve_credentials(sender_email, sender_password)
+    if not sender_email or not sender_password:
+        return "Error: Gmail credentials not set in environment variables."
+    msg = _build_message(sender_email, recipient_email, subject, body)
     try:
-        server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
-        server.login(sender_email, sender_password)
-        server.send_message(msg)
-        server.quit()
+        smtp_scheduler.send(smtp_pool.send, sender_email, sender_password, msg)
         return f"Email sent successfully to {recipient_email}: '{subject}'"
-    except Exception as e:
-        return f"Failed to send email to {recipient_email}: {str(e)}"
+    except OutboundError as e:
+        return {**e.to_dict(), "recipient_email": recipient_email}
+
+
+def _send_emails_bulk(messages: List[Dict[str, str]], sender_email: Union[str, None], sender_password: Union[str, None]) -> List[Dict[str, str]]:
+    sender_email, sender_password = _resolve_credentials(sender_email, sender_password)
+    if not sender_email or not sender_password:
+        return [{"recipient_email": m.get("recipient_email", ""), "status": "error", "detail": "Gmail credentials not set in environment variables."} for m in messages]
+
+    def send_one(message: Dict[str, str]) -> Dict[str, str]:
+        recipient_email = message.get("recipient_email", "")
+        if not recipient_email:
+            return {"recipient_email": recipient_email, "status": "error", "detail": "Missing recipient_email"}
+        msg = _build_message(sender_email, recipient_email, message.get("subject", ""), message.get("body", ""))
+        try:
+            smtp_scheduler.send(smtp_pool.send, sender_email, sender_password, msg)
+            return {"recipient_email": recipient_email, "status": "sent"}
+        except OutboundError as e:
+            return {**e.to_dict(), "recipient_email": recipient_email}
+
+    with ThreadPoolExecutor(max_workers=max(1, SMTP_POOL_SIZE)) as executor:
+        return list(executor.map(send_one, messages))
+
+
+# SMTP I/O and retry backoff run in worker threads so concurrent calls (and pings) aren't serialized on the event loop
+@mcp.tool()
+async def send_email(recipient_email: str, subject: str, body: str, sender_email: Union[str, None] = None, sender_password: Union[str, None] = None) -> Union[str, Dict]:
+    """Sends an email via Gmail's SMTP server to the specified recipient. Failures (already retried by the server, so do not repeat the call) are returned as an error object with a code (e.g. rate_limited, quota_exceeded, auth_failed)."""
+    return await asyncio.to_thread(_send_email, recipient_email, subject, body, sender_email, sender_password)
+
+
+@mcp.tool()
+async def send_emails_bulk(messages: List[Dict[str, str]], sender_email: Union[str, None] = None, sender_password: Union[str, None] = None) -> List[Dict[str, str]]:
+    """Sends many emails over pooled SMTP connections. Each message needs 'recipient_email', 'subject' and 'body'. Returns a status per recipient."""
+    return await asyncio.to_thread(_send_emails_bulk, messages, sender_email, sender_password)
 
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    try:
+        mcp.run(transport="stdio")
+    finally:
+        smtp_pool.close_all()
@@ -1,35 +1,145 @@
 # send Slack message mcp server
 import os
-from typing import Union
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Dict, Union
 from mcp.server.fastmcp import FastMCP
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from dotenv import load_dotenv
+from outbound import OutboundError, classify_slack, scheduler_from_env
 
 load_dotenv()
 
 mcp = FastMCP("send_slack_message")
 
-@mcp.tool()
-def send_slack_message(recipient: str, message: str, token: Union[str, None] = None) -> str:
-    """Sends a message to a Slack channel or direct message (DM) using the Slack API."""
+# Slack API base URL (point this at a local HTTP stand-in for testing)
+SLACK_API_BASE_URL = os.getenv("SLACK_API_BASE_URL", WebClient.BASE_URL)
+# DM channel IDs for a user never change, so cache them on disk across restarts
+SLACK_DM_CACHE_PATH = os.getenv("SLACK_DM_CACHE_PATH", os.path.join(".cache", "slack_dm_channels.json"))
+SLACK_DM_CACHE_TTL = float(os.getenv("SLACK_DM_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Slack allows roughly one chat.postMessage per second per channel, with short bursts
+slack_scheduler = scheduler_from_env("slack", classify_slack, rate=1, burst=3)
+
+_clients: Dict[str, WebClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(token: str) -> WebClient:
+    """Returns a cached WebClient for the token so connections are reused across calls."""
+    with _clients_lock:
+        client = _clients.get(token)
+        if client is None:
+            client = _clients[token] = WebClient(token=token, base_url=SLACK_API_BASE_URL)
+        return client
+
+
+class DMChannelCache:
+    """Persistent user ID -> DM channel ID map with TTL-based eviction."""
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self) -> Dict[str, list]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        now = time.time()
+        return {k: v for k, v in entries.items() if now - v[1] < self.ttl}
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _key(token: str, user_id: str) -> str:
+        # DM channels are per bot, so scope entries by a fingerprint of the token
+        return f"{hashlib.sha256(token.encode()).hexdigest()[:12]}:{user_id}"
+
+    def get(self, token: str, user_id: str) -> Union[str, None]:
+        key = self._key(token, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[1] >= self.ttl:
+                del self._entries[key]
+                return None
+            return entry[0]
+
+    def set(self, token: str, user_id: str, channel_id: str):
+        with self._lock:
+            self._entries[self._key(token, user_id)] = [channel_id, time.time()]
+            try:
+                self._save()
+            except OSError as e:
+                print(f"WARNING: Failed to persist Slack DM cache: {str(e)}", file=sys.stderr)
+
+    def evict(self, token: str, user_id: str):
+        with self._lock:
+            if self._entries.pop(self._key(token, user_id), None) is not None:
+                try:
+                    self._save()
+                except OSError:
+                    pass
+
+
+dm_cache = DMChannelCache(SLACK_DM_CACHE_PATH, SLACK_DM_CACHE_TTL)
+
+
+def resolve_dm_channel(client: WebClient, token: str, user_id: str) -> str:
+    channel_id = dm_cache.get(token, user_id)
+    if channel_id is None:
+        response = slack_scheduler.call(client.conversations_open, users=user_id)
+        channel_id = response['channel']['id']
+        dm_cache.set(token, user_id, channel_id)
+    return channel_id
+
+
+def _send_slack_message(recipient: str, message: str, token: Union[str, None]) -> Union[str, Dict]:
     token = token or os.getenv("SLACK_BOT_TOKEN")
     if not token:
         return "Error: Slack Bot Token not set in environment variables."
-    client = WebClient(token=token)
+    client = get_client(token)
     try:
-        if recipient.startswith(('U', 'W')):
-            response = client.conversations_open(users=recipient)
-            channel_id = response['channel']['id']
-        else:
-            channel_id = recipient
-        response = client.chat_postMessage(channel=channel_id, text=message)
+        is_user = recipient.startswith(('U', 'W'))
+        channel_id = resolve_dm_channel(client, token, recipient) if is_user else recipient
+        try:
+            response = slack_scheduler.send(client.chat_postMessage, channel=channel_id, text=message)
+        except OutboundError as e:
+            cause = e.__cause__
+            if not is_user or not isinstance(cause, SlackApiError) or cause.response['error'] not in ("channel_not_found", "is_archived"):
+                raise
+            # Cached DM channel went stale; drop it and open a fresh one
+            dm_cache.evict(token, recipient)
+            channel_id = resolve_dm_channel(client, token, recipient)
+            response = slack_scheduler.send(client.chat_postMessage, channel=channel_id, text=message)
         return f"Slack message sent successfully to {recipient} (TS: {response['ts']}): '{message}'"
-    except SlackApiError as e:
-        return f"Failed to send Slack message to {recipient}: {e.response['error']}"
-    except Exception as e:
-        return f"Unexpected error sending Slack message to {recipient}: {str(e)}"
+    except OutboundError as e:
+        return {**e.to_dict(), "recipient": recipient}
+
+
+@mcp.tool()
+async def send_slack_message(recipient: str, message: str, token: Union[str, None] = None) -> Union[str, Dict]:
+    """Sends a message to a Slack channel or direct message (DM) using the Slack API. Failures (already retried by the server, so do not repeat the call) are returned as an error object with a code (e.g. rate_limited, auth_failed, invalid_request)."""
+    # Slack calls and retry backoff block, so they run in a worker thread instead of on the event loop
+    return await asyncio.to_thread(_send_slack_message, recipient, message, token)
 
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    mcp.run(transport="stdio")
@@ -1,17 +1,283 @@
 # send whatsapp message mcp server
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import uuid
+import queue
+import logging
+import importlib
+import importlib.util
+import threading
+from collections import OrderedDict
+from contextlib import suppress
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Union
+from urllib.parse import quote
+
 from mcp.server.fastmcp import FastMCP
-import pywhatkit
+from dotenv import load_dotenv
+
+load_dotenv()
 
 mcp = FastMCP("send_whatsapp_message")
 
+# "web" keeps one logged-in WhatsApp Web session (needs selenium), "pywhatkit" opens a tab per message,
+# "stub" only logs sends; "auto" picks "web" when selenium is installed. "module:Class" loads a custom backend.
+WHATSAPP_BACKEND = os.getenv("WHATSAPP_BACKEND", "auto")
+WHATSAPP_PROFILE_DIR = os.getenv("WHATSAPP_PROFILE_DIR", os.path.join(".cache", "whatsapp_profile"))
+WHATSAPP_WAIT_TIME = int(os.getenv("WHATSAPP_WAIT_TIME", "20"))
+WHATSAPP_MAX_ATTEMPTS = int(os.getenv("WHATSAPP_MAX_ATTEMPTS", "2"))
+WHATSAPP_JOB_HISTORY = int(os.getenv("WHATSAPP_JOB_HISTORY", "500"))
+WHATSAPP_STUB_LATENCY = float(os.getenv("WHATSAPP_STUB_LATENCY", "0"))
+# Rotating send log (replaces pywhatkit's unbounded PyWhatKit_DB.txt)
+WHATSAPP_SEND_LOG = os.getenv("WHATSAPP_SEND_LOG", "whatsapp_send.log")
+WHATSAPP_SEND_LOG_MAX_BYTES = int(os.getenv("WHATSAPP_SEND_LOG_MAX_BYTES", str(1024 * 1024)))
+WHATSAPP_SEND_LOG_BACKUPS = int(os.getenv("WHATSAPP_SEND_LOG_BACKUPS", "3"))
+
+send_log = logging.getLogger("whatsapp_send")
+send_log.setLevel(logging.INFO)
+send_log.propagate = False
+if WHATSAPP_SEND_LOG:
+    _handler = RotatingFileHandler(WHATSAPP_SEND_LOG, maxBytes=WHATSAPP_SEND_LOG_MAX_BYTES, backupCount=WHATSAPP_SEND_LOG_BACKUPS, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    send_log.addHandler(_handler)
+
+
+class WebSessionBackend:
+    """Sends through one long-lived WhatsApp Web browser session.
+
+    The Chrome profile is kept in `profile_dir`, so the QR code only has to be
+    scanned once; the browser is started on the first send and reused after.
+    """
+
+    def __init__(self, profile_dir: str = WHATSAPP_PROFILE_DIR, wait_time: int = WHATSAPP_WAIT_TIME):
+        if importlib.util.find_spec("selenium") is None:
+            raise ImportError("selenium is not installed")  # fail fast so "auto" can fall back
+
+        self.profile_dir = os.path.abspath(profile_dir)
+        self.wait_time = wait_time
+        self._driver = None
+
+    def _get_driver(self):
+        if self._driver is None:
+            from selenium import webdriver
+
+            options = webdriver.ChromeOptions()
+            options.add_argument(f"--user-data-dir={self.profile_dir}")
+            self._driver = webdriver.Chrome(options=options)
+        return self._driver
+
+    def send(self, phone_number: str, message: str):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.common.keys import Keys
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver = self._get_driver()
+        digits = re.sub(r"\D", "", phone_number)
+        try:
+            driver.get(f"https://web.whatsapp.com/send?phone={digits}&text={quote(message)}")
+            box = WebDriverWait(driver, self.wait_time).until(
+                EC.element_to_be_clickable((By.XPATH, '//footer//div[@contenteditable="true"]'))
+            )
+            box.send_keys(Keys.ENTER)
+            # Wait until the message has left the outgoing "pending" state
+            WebDriverWait(driver, self.wait_time).until_not(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'span[data-icon="msg-time"]'))
+            )
+        except Exception:
+            # A broken page or browser is restarted on the next send
+            self.close()
+            raise
+
+    def close(self):
+        if self._driver is not None:
+            with suppress(Exception):
+                self._driver.quit()
+            self._driver = None
+
+
+class PyWhatKitBackend:
+    """Legacy backend: one new WhatsApp Web tab per message via pywhatkit."""
+
+    def __init__(self, wait_time: int = WHATSAPP_WAIT_TIME):
+        import pywhatkit
+
+        self._pywhatkit = pywhatkit
+        self.wait_time = wait_time
+        # Sends are logged to the rotating send log instead of pywhatkit's ever-growing PyWhatKit_DB.txt
+        with suppress(Exception):
+            from pywhatkit.core import log as pywhatkit_log
+
+            pywhatkit_log.log_message = lambda *args, **kwargs: None
+
+    def send(self, phone_number: str, message: str):
+        self._pywhatkit.sendwhatmsg_instantly(phone_number, message, wait_time=self.wait_time, tab_close=True)
+
+    def close(self):
+        pass
+
+
+class StubBackend:
+    """Local stand-in for tests and benchmarks: records the send without contacting WhatsApp."""
+
+    def __init__(self, latency: float = WHATSAPP_STUB_LATENCY):
+        self.latency = latency
+
+    def send(self, phone_number: str, message: str):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def close(self):
+        pass
+
+
+BACKENDS = {"web": WebSessionBackend, "pywhatkit": PyWhatKitBackend, "stub": StubBackend}
+
+
+def create_backend(name: str):
+    if ":" in name:
+        module_name, class_name = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), class_name)()
+    if name == "auto":
+        try:
+            return WebSessionBackend()
+        except ImportError:
+            print("WARNING: selenium is not installed, falling back to the pywhatkit WhatsApp backend", file=sys.stderr)
+            return PyWhatKitBackend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown WhatsApp backend: {name}")
+    return BACKENDS[name]()
+
+
+class SendQueue:
+    """Serializes sends through one worker thread so the MCP server never blocks on the browser.
+
+    Jobs are tracked in memory (the most recent `history` of them) so their
+    status can be looked up by ID.
+    """
+
+    def __init__(self, backend_name: str, max_attempts: int = 2, history: int = 500):
+        self.backend_name = backend_name
+        self.max_attempts = max_attempts
+        self.history = history
+        self.backend = None
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="whatsapp-sender", daemon=True)
+        self._worker.start()
+
+    def submit(self, phone_number: str, message: str) -> Dict[str, Any]:
+        job = {
+            "job_id": uuid.uuid4().hex[:12],
+            "phone_number": phone_number,
+            "status": "queued",
+            "attempts": 0,
+            "queued_at": time.time(),
+            "sent_at": None,
+            "error": None,
+            "_message": message,
+        }
+        with self._lock:
+            self.jobs[job["job_id"]] = job
+            self._trim()
+            # Count the job being sent too; it has already left the queue
+            position = sum(1 for j in self.jobs.values() if j["status"] in ("queued", "sending"))
+        self._queue.put(job["job_id"])
+        return {**self.public(job), "queue_position": position}
+
+    def _trim(self):
+        # Drop the oldest finished jobs beyond the history limit; queued ones are always kept
+        excess = len(self.jobs) - self.history
+        for job_id in [j for j, job in self.jobs.items() if job["status"] in ("sent", "failed")][:max(0, excess)]:
+            del self.jobs[job_id]
+
+    @staticmethod
+    def public(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in job.items() if not key.startswith("_")}
+
+    def status(self, job_id: str) -> Union[Dict[str, Any], None]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return self.public(job) if job else None
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            recent = [self.public(job) for job in list(self.jobs.values())[-10:]]
+        return {"backend": self.backend_name, "pending": self._queue.qsize(), "counts": counts, "recent": recent}
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            self._send(job)
+
+    def _update(self, job: Dict[str, Any], **changes):
+        with self._lock:
+            job.update(changes)
+
+    def _send(self, job: Dict[str, Any]):
+        self._update(job, status="sending")
+        while job["attempts"] < self.max_attempts:
+            self._update(job, attempts=job["attempts"] + 1)
+            try:
+                if self.backend is None:
+                    self.backend = create_backend(self.backend_name)
+                self.backend.send(job["phone_number"], job["_message"])
+                self._update(job, status="sent", sent_at=time.time(), error=None)
+                break
+            except Exception as e:
+                self._update(job, error=str(e))
+        else:
+            self._update(job, status="failed")
+        send_log.info(json.dumps({
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "job_id": job["job_id"],
+            "phone_number": job["phone_number"],
+            "status": job["status"],
+            "attempts": job["attempts"],
+            "error": job["error"],
+            "message": job["_message"],
+        }, ensure_ascii=False))
+        job.pop("_message", None)
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
+
+
+send_queue = SendQueue(WHATSAPP_BACKEND, WHATSAPP_MAX_ATTEMPTS, WHATSAPP_JOB_HISTORY)
+atexit.register(send_queue.close)
+
+
+@mcp.tool()
+async def send_whatsapp_message(phone_number: str, message: str) -> str:
+    """Queues a WhatsApp message to the specified phone number and returns a job ID right away. Use 'whatsapp_message_status' to check delivery."""
+    # Only enqueues (the worker thread does the send), so it is safe to run on the event loop
+    job = send_queue.submit(phone_number, message)
+    return f"WhatsApp message to {phone_number} queued (job ID: {job['job_id']}, position {job['queue_position']}): '{message}'"
+
+
 @mcp.tool()
-def send_whatsapp_message(phone_number: str, message: str) -> str:
-    """Sends a WhatsApp message to the specified phone number using WhatsApp Web automation."""
-    try:
-        pywhatkit.sendwhatmsg_instantly(phone_number, message)
-        return f"WhatsApp message sent successfully to {phone_number}: '{message}'"
-    except Exception as e:
-        return f"Failed to send WhatsApp message to {phone_number}: {str(e)}"
+def whatsapp_message_status(job_id: str = "") -> dict:
+    """Returns the status of a queued WhatsApp message (queued, sending, sent or failed), or a summary of recent sends when no job ID is given."""
+    if not job_id:
+        return send_queue.summary()
+    job = send_queue.status(job_id)
+    if job is None:
+        return {"job_id": job_id, "status": "unknown", "error": "No such job (it may have expired from the job history)"}
+    return job
+
 
 if __name__ == "__main__":
     mcp.run(transport="stdio")
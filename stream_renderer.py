@@ -0,0 +1,73 @@
+# incremental token streaming for the CLI
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from langchain_core.messages import AIMessageChunk, ToolMessage
+
+
+class StreamRenderer:
+    """Prints model tokens as they arrive and tool-call progress inline.
+
+    Consumes `astream(..., stream_mode=["messages", "updates"])`: message
+    chunks carry the tokens and tool results, update events mark interrupts.
+    Time-to-first-token is measured per run.
+    """
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self.ttft_history = []
+
+    def _write(self, text: str):
+        self.out.write(text)
+        self.out.flush()
+
+    async def run(self, agent, payload, config: Dict[str, Any]) -> Dict[str, Optional[float]]:
+        start = time.perf_counter()
+        first_token: Optional[float] = None
+        chunks = 0
+        at_line_start = True
+        announced_calls = set()
+        async for mode, chunk in agent.astream(payload, config=config, stream_mode=["messages", "updates"]):
+            if mode == "updates":
+                if isinstance(chunk, dict) and "__interrupt__" in chunk:
+                    self._write("\n[waiting for approval]\n")
+                    at_line_start = True
+                continue
+            message, metadata = chunk
+            if isinstance(message, AIMessageChunk):
+                for call in message.tool_call_chunks or []:
+                    # The name only arrives on the first chunk of each tool call
+                    key = (message.id, call.get("index"), call.get("id"))
+                    if call.get("name") and key not in announced_calls:
+                        announced_calls.add(key)
+                        self._write(f"{'' if at_line_start else chr(10)}[calling {call['name']}...]\n")
+                        at_line_start = True
+                text = message.content if isinstance(message.content, str) else "".join(
+                    part.get("text", "") for part in message.content if isinstance(part, dict)
+                )
+                if text:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    chunks += 1
+                    self._write(text)
+                    at_line_start = text.endswith("\n")
+            elif isinstance(message, ToolMessage):
+                status = "failed" if getattr(message, "status", "success") == "error" else "done"
+                self._write(f"{'' if at_line_start else chr(10)}[{message.name or 'tool'} {status}]\n")
+                at_line_start = True
+        if not at_line_start:
+            self._write("\n")
+        total = time.perf_counter() - start
+        if first_token is not None:
+            self.ttft_history.append(first_token)
+        ttft = f"{first_token:.2f}s" if first_token is not None else "n/a"
+        self._write(f"[time to first token: {ttft}, total: {total:.2f}s]\n")
+        return {"ttft": first_token, "total": total, "chunks": chunks}
+
+    def summary(self) -> str:
+        if not self.ttft_history:
+            return "Time to first token: no streamed turns"
+        ordered = sorted(self.ttft_history)
+        median = ordered[len(ordered) // 2]
+        return f"Time to first token over {len(ordered)} runs: median {median:.2f}s, max {ordered[-1]:.2f}s"
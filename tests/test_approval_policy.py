@@ -0,0 +1,56 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from approval_policy import ACCEPT, REJECT, REVIEW, ApprovalPolicy  # noqa: E402
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "approval_policy.example.json")
+
+
+def _policy(tmp_path, rules, default=REVIEW):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps({"default": default, "rules": rules}))
+    return ApprovalPolicy(str(path), str(tmp_path / "audit.jsonl"))
+
+
+def _bulk(count):
+    return {"messages": [{"recipient_email": f"user{i}@example.com", "subject": "s", "body": "hi"} for i in range(count)]}
+
+
+def test_rate_limit_counts_recipients_not_calls(tmp_path):
+    policy = _policy(tmp_path, [{"tools": ["send_emails_bulk"], "recipient_domains": ["example.com"], "rate_limit": {"count": 5, "seconds": 3600}, "decision": ACCEPT}])
+    assert policy.decide("send_emails_bulk", _bulk(3))[0] == ACCEPT
+    assert policy.decide("send_emails_bulk", _bulk(3))[0] == REVIEW
+    assert policy.decide("send_emails_bulk", _bulk(2))[0] == ACCEPT
+
+
+def test_bulk_send_larger_than_the_limit_is_never_auto_accepted(tmp_path):
+    policy = _policy(tmp_path, [{"tools": ["send_emails_bulk"], "recipient_domains": ["example.com"], "rate_limit": {"count": 50, "seconds": 3600}, "decision": ACCEPT}])
+    assert policy.decide("send_emails_bulk", _bulk(500))[0] == REVIEW
+
+
+def test_example_policy_reviews_bulk_company_email():
+    policy = ApprovalPolicy(EXAMPLE)
+    assert policy.decide("send_emails_bulk", _bulk(500))[0] == REVIEW
+    assert policy.decide("send_email", {"recipient_email": "ada@example.com", "subject": "s", "body": "hi"})[0] == ACCEPT
+
+
+def test_every_recipient_must_match(tmp_path):
+    policy = _policy(tmp_path, [{"recipient_domains": ["example.com"], "decision": ACCEPT}])
+    args = {"messages": [{"recipient_email": "a@example.com"}, {"recipient_email": "b@gmail.com"}]}
+    assert policy.decide("send_emails_bulk", args)[0] == REVIEW
+
+
+def test_reject_rule_is_audited(tmp_path):
+    policy = _policy(tmp_path, [{"tools": ["send_whatsapp_message"], "min_length": 10, "decision": REJECT, "reason": "too long"}])
+    assert policy.decide("send_whatsapp_message", {"phone_number": "+234", "message": "x" * 20}, "t1") == (REJECT, "too long")
+    assert policy.decide("send_whatsapp_message", {"phone_number": "+234", "message": "short"})[0] == REVIEW
+    records = [json.loads(line) for line in (tmp_path / "audit.jsonl").read_text().splitlines()]
+    assert [(r["decision"], r["thread_id"]) for r in records] == [(REJECT, "t1")]
+
+
+def test_missing_policy_file_reviews_everything(tmp_path):
+    policy = ApprovalPolicy(str(tmp_path / "missing.json"))
+    assert policy.decide("send_email", {"recipient_email": "a@example.com"})[0] == REVIEW
@@ -0,0 +1,54 @@
+import os
+import sys
+import json
+import smtplib
+import urllib.request
+from email.mime.text import MIMEText
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import HumanMessage, ToolMessage  # noqa: E402
+
+from fakes import FakeServices, ScriptedChatModel, SMTPSink  # noqa: E402
+
+
+def test_smtp_sink_accepts_logged_in_sends():
+    sink = SMTPSink().start()
+    try:
+        with smtplib.SMTP("127.0.0.1", sink.port, timeout=5) as server:
+            server.ehlo()
+            server.login("blaqie@example.com", "offline-benchmark")
+            msg = MIMEText("hi")
+            msg["From"], msg["To"], msg["Subject"] = "blaqie@example.com", "ada@example.com", "s"
+            server.send_message(msg)
+        assert sink.delivered == 1
+    finally:
+        sink.close()
+
+
+def test_fake_services_answer_tavily_and_slack():
+    services = FakeServices().start()
+    try:
+        def post(path, body):
+            request = urllib.request.Request(f"{services.url}{path}", data=json.dumps(body).encode(), method="POST")
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return json.loads(response.read())
+
+        assert len(post("/tavily/search", {"query": "labour law"})["results"]) == 5
+        assert post("/slack/chat.postMessage", {"channel": "U1", "text": "hi"})["ok"]
+        assert services.requests["/tavily/search"] == 1
+    finally:
+        services.close()
+
+
+def test_scripted_model_calls_the_matching_tool_then_answers():
+    model = ScriptedChatModel()
+    call = model.invoke([HumanMessage(content="Email Ada that her leave is approved")])
+    assert call.tool_calls[0]["name"] == "send_email"
+    answer = model.invoke([HumanMessage(content="Email Ada"), call, ToolMessage(content="Email sent", tool_call_id=call.tool_calls[0]["id"])])
+    assert answer.content.startswith("Done.")
+    assert model.invoke([HumanMessage(content='Plan this: {"tasks": []}')]).content == '{"tasks": []}'
@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("mcp")
+pytest.importorskip("langchain_core")
+
+from mcp.types import CallToolResult, TextContent  # noqa: E402
+
+from broadcast import Broadcaster, render  # noqa: E402
+
+
+def _text(payload):
+    return CallToolResult(content=[TextContent(type="text", text=payload if isinstance(payload, str) else json.dumps(payload))], isError=False)
+
+
+class FakePool:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, server, tool, arguments):
+        self.calls.append((tool, arguments))
+        if tool == "send_emails_bulk":
+            return _text([
+                {"recipient_email": m["recipient_email"], "status": "error", "code": "invalid_request", "detail": "rejected"}
+                if m["recipient_email"].startswith("bad") else {"recipient_email": m["recipient_email"], "status": "sent"}
+                for m in arguments["messages"]
+            ])
+        if tool == "send_whatsapp_message":
+            return _text("Message queued for delivery (job ID: abc123)")
+        if arguments["recipient"] == "UFAIL":
+            return _text({"status": "error", "code": "rate_limited", "detail": "slow down"})
+        return _text("Message sent")
+
+
+def test_render_leaves_unknown_placeholders():
+    assert render("Hi {name}, see you {date} {unknown}", {"name": "Ada", "date": "Friday"}) == "Hi Ada, see you Friday {unknown}"
+
+
+def test_broadcast_groups_by_channel_and_reports_each_recipient():
+    pool = FakePool()
+    recipients = [
+        {"name": "Ada", "channel": "email", "address": "ada@example.com"},
+        {"name": "Bola", "channel": "email", "address": "bad@example.com"},
+        {"name": "Chidi", "channel": "email", "address": "chidi@example.com"},
+        {"name": "Dayo", "channel": "whatsapp", "address": "+2348011111111", "fields": {"date": "Friday"}},
+        {"name": "Emeka", "channel": "slack", "address": "U001"},
+        {"name": "Femi", "channel": "slack", "address": "UFAIL"},
+    ]
+    report = asyncio.run(Broadcaster(pool, email_chunk_size=2).broadcast("Hi {name}, payday is {date}", recipients, subject="Payday for {name}"))
+
+    statuses = {d["name"]: d["status"] for d in report["deliveries"]}
+    assert statuses == {"Ada": "sent", "Bola": "failed", "Chidi": "sent", "Dayo": "queued", "Emeka": "sent", "Femi": "failed"}
+    assert report["per_channel"]["email"] == {"sent": 2, "failed": 1}
+    assert report["summary"] == {"sent": 3, "failed": 2, "queued": 1}
+
+    bulk = [args for tool, args in pool.calls if tool == "send_emails_bulk"]
+    assert [len(args["messages"]) for args in bulk] == [2, 1]
+    assert bulk[0]["messages"][0]["subject"] == "Payday for Ada"
+    whatsapp = next(args for tool, args in pool.calls if tool == "send_whatsapp_message")
+    assert whatsapp["message"] == "Hi Dayo, payday is Friday"
+    femi = next(d for d in report["deliveries"] if d["name"] == "Femi")
+    assert femi["code"] == "rate_limited"
@@ -0,0 +1,81 @@
+import os
+import sys
+import asyncio
+import sqlite3
+from typing import TypedDict
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("langgraph.checkpoint.sqlite")
+
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+from langgraph.graph import END, START, StateGraph  # noqa: E402
+
+from checkpointer import BoundedInMemorySaver, open_checkpointer  # noqa: E402
+
+
+class State(TypedDict):
+    count: int
+
+
+def _graph(checkpointer):
+    builder = StateGraph(State)
+    builder.add_node("step", lambda state: {"count": state["count"] + 1})
+    builder.add_edge(START, "step")
+    builder.add_edge("step", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def _config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def test_memory_saver_keeps_last_checkpoints_per_thread():
+    saver = BoundedInMemorySaver(keep_last=3)
+    graph = _graph(saver)
+    for _ in range(5):
+        graph.invoke({"count": 0}, _config("a"))
+    graph.invoke({"count": 0}, _config("b"))
+    assert len(list(saver.list(_config("a")))) == 3
+    assert len(list(saver.list(_config("b")))) == 3
+    assert graph.get_state(_config("a")).values["count"] == 1
+
+
+def test_memory_saver_drops_unreferenced_blobs():
+    bounded, unbounded = BoundedInMemorySaver(keep_last=3), InMemorySaver()
+    for saver in (bounded, unbounded):
+        graph = _graph(saver)
+        for _ in range(5):
+            graph.invoke({"count": 0}, _config("a"))
+    assert len(bounded.blobs) < len(unbounded.blobs)
+
+
+def test_sqlite_saver_prunes_and_flushes_on_close(tmp_path):
+    db_path = str(tmp_path / "checkpoints.db")
+
+    async def scenario():
+        async with open_checkpointer("sqlite", db_path, keep_last=4) as saver:
+            graph = _graph(saver)
+            for _ in range(10):
+                await graph.ainvoke({"count": 0}, _config("a"))
+            await saver.aprune("a")
+            return len([c async for c in saver.alist(_config("a"))])
+
+    assert asyncio.run(scenario()) == 4
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM checkpoints WHERE thread_id = 'a'").fetchone()[0] == 4
+    finally:
+        conn.close()
+
+
+def test_unknown_backend_is_rejected():
+    async def scenario():
+        async with open_checkpointer("redis"):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
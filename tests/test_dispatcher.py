@@ -0,0 +1,69 @@
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+from dispatcher import ParallelDispatcher, looks_multi_part  # noqa: E402
+
+
+class FakeCheckpointer:
+    def __init__(self):
+        self.deleted = []
+
+    async def adelete_thread(self, thread_id):
+        self.deleted.append(thread_id)
+
+
+class FakeAgent:
+    def __init__(self, history):
+        self.history = history
+        self.inputs = {}
+        self.checkpointer = FakeCheckpointer()
+        self.nodes = {"model": None}
+
+    async def aget_state(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        if thread_id in self.inputs:
+            return SimpleNamespace(values={"messages": [AIMessage(content=f"done {thread_id}")]})
+        return SimpleNamespace(values={"messages": self.history})
+
+    async def astream(self, input_data, config, stream_mode):
+        self.inputs[config["configurable"]["thread_id"]] = input_data["messages"][0].content
+        yield {"messages": [AIMessage(content="ok")]}
+
+    async def aupdate_state(self, config, values, as_node):
+        self.merged = (values, as_node)
+
+
+def test_looks_multi_part_needs_two_channels():
+    assert looks_multi_part("email Ada and post it on slack")
+    assert not looks_multi_part("email Ada the report")
+
+
+def test_branches_see_recent_history_and_are_deleted_after_merge():
+    agent = FakeAgent([HumanMessage(content="Email Ada the Q3 report"), AIMessage(content="Sent to ada@example.com")])
+    dispatcher = ParallelDispatcher(agent)
+    config = {"configurable": {"thread_id": "main"}}
+    tasks = [{"subagent": "email", "task": "send it to him too"}, {"subagent": "slack", "task": "tell him on slack"}]
+
+    async def scenario():
+        branches = await dispatcher.run(config, tasks, "now")
+        await dispatcher.merge(config, "send it to him too and tell him on slack", branches)
+        await dispatcher.discard(branches)
+        return branches
+
+    branches = asyncio.run(scenario())
+    for instruction in agent.inputs.values():
+        assert "User: Email Ada the Q3 report" in instruction
+        assert "Assistant: Sent to ada@example.com" in instruction
+    assert agent.checkpointer.deleted == [b["config"]["configurable"]["thread_id"] for b in branches]
+    assert "main" not in agent.checkpointer.deleted
+    assert agent.merged[1] == "model"
@@ -0,0 +1,65 @@
+import os
+import sys
+import sqlite3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from employee_directory import EmployeeDirectory  # noqa: E402
+
+CSV = """Full Name,Phone,Email Address,Slack ID,Dept
+Ada Obi,+2348011111111,ada@example.com,U001,Finance
+Ada Okafor,+2348022222222,ada.okafor@example.com,U002,HR
+Tunde Bakare,+2348033333333,tunde@example.com,U003,Engineering
+"""
+
+
+def _directory(tmp_path, text=CSV):
+    path = tmp_path / "employees.csv"
+    path.write_text(text)
+    return EmployeeDirectory(str(path), reload_interval=0)
+
+
+def test_column_aliases_are_mapped(tmp_path):
+    record = _directory(tmp_path).resolve("Tunde Bakare")
+    assert record["phone_number"] == "+2348033333333"
+    assert record["email"] == "tunde@example.com"
+    assert record["slack_id"] == "U003"
+    assert record["department"] == "Engineering"
+
+
+def test_shared_first_name_is_ambiguous(tmp_path):
+    directory = _directory(tmp_path)
+    assert directory.resolve("Ada") is None
+    assert [r["name"] for r in directory.lookup("Ada")] == ["Ada Obi", "Ada Okafor"]
+
+
+def test_prefix_of_every_word_resolves(tmp_path):
+    assert _directory(tmp_path).resolve("ada oka")["email"] == "ada.okafor@example.com"
+
+
+def test_exact_name_beats_prefix_matches(tmp_path):
+    directory = _directory(tmp_path, CSV + "Ada Obi-Nwosu,+2348044444444,ada.nwosu@example.com,U004,Sales\n")
+    assert directory.resolve("Ada Obi")["slack_id"] == "U001"
+
+
+def test_fuzzy_match_only_when_nothing_else_matches(tmp_path):
+    matches = _directory(tmp_path).lookup("Tunde Bakre")
+    assert [(r["name"], r["match"]) for r in matches] == [("Tunde Bakare", "fuzzy")]
+
+
+def test_reloads_when_the_file_changes(tmp_path):
+    directory = _directory(tmp_path)
+    path = tmp_path / "employees.csv"
+    path.write_text(CSV + "Ngozi Eze,+2348055555555,ngozi@example.com,U005,Legal\n")
+    os.utime(path, (os.path.getmtime(path) + 10, os.path.getmtime(path) + 10))
+    assert directory.resolve("Ngozi")["slack_id"] == "U005"
+
+
+def test_reads_sqlite_tables(tmp_path):
+    path = str(tmp_path / "employees.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE employees (name TEXT, email TEXT)")
+    conn.execute("INSERT INTO employees VALUES ('Chidi Nwosu', 'chidi@example.com')")
+    conn.commit()
+    conn.close()
+    assert EmployeeDirectory(path).resolve("chidi")["email"] == "chidi@example.com"
@@ -0,0 +1,70 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hitl_parser
+
+
+def test_batch_reply_with_exception_goes_to_llm():
+    assert hitl_parser.parse_batch_reply("approve all except 3", 5) is None
+
+
+def test_batch_reply_with_but_goes_to_llm():
+    assert hitl_parser.parse_batch_reply("send all but 2", 5) is None
+
+
+def test_batch_reply_with_negated_clause_goes_to_llm():
+    assert hitl_parser.parse_batch_reply("don't send 2, approve 1 and 3", 3) is None
+
+
+def test_batch_reply_without_negation_is_parsed():
+    decisions = hitl_parser.parse_batch_reply("approve 1-2, cancel 3", 3)
+    assert decisions[1]["type"] == "accept" and decisions[2]["type"] == "accept"
+    assert decisions[3] == hitl_parser.CANCELLED
+
+
+def test_blanket_cancel_still_resolves_locally():
+    assert hitl_parser.parse_batch_reply("don't send", 2) == {1: hitl_parser.CANCELLED, 2: hitl_parser.CANCELLED}
+
+
+def test_redirect_with_send_is_not_an_approval():
+    assert hitl_parser.parse_batch_reply("send 1 to Ada instead", 3) is None
+    assert hitl_parser.parse_batch_reply("send all to Ada instead", 3) is None
+
+
+def test_accept_clause_followed_by_instructions_goes_to_llm():
+    assert hitl_parser.parse_batch_reply("approve 1 to Ada instead", 3) is None
+
+
+def test_approval_never_overrides_cancel():
+    decisions = hitl_parser.parse_batch_reply("cancel 2, approve all", 3)
+    assert decisions[2] == hitl_parser.CANCELLED
+    assert decisions[1]["type"] == "accept" and decisions[3]["type"] == "accept"
+
+
+def test_to_after_edit_verb_is_text_not_a_range():
+    assert hitl_parser.parse_batch_reply("change 2 to 10 people", 3) == {2: "to 10 people"}
+
+
+def test_to_is_a_range_for_approvals():
+    decisions = hitl_parser.parse_batch_reply("approve 1 to 3", 4)
+    assert sorted(decisions) == [1, 2, 3]
+
+
+def test_edited_and_cancelled_item_goes_to_llm():
+    assert hitl_parser.parse_batch_reply("edit 2 to say hi, cancel 2", 3) is None
+
+
+def test_single_reply_approvals_are_resolved_locally():
+    for reply in ("ok", "yes please", "send it", "looks good, thanks", "go ahead"):
+        assert hitl_parser.classify_response("send_email", {}, reply, ["send_email"]) == {"type": "accept", "args": {}}, reply
+
+
+def test_single_reply_without_approval_word_goes_to_llm():
+    for reply in ("it", "do you", "thank you", "please", "thanks"):
+        assert hitl_parser.classify_response("send_email", {}, reply, ["send_email"]) is None, reply
+
+
+def test_single_reply_cancel_is_resolved_locally():
+    assert hitl_parser.classify_response("send_email", {}, "don't send it", ["send_email"])["type"] == "respond"
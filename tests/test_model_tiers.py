@@ -0,0 +1,55 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+model_tiers = pytest.importorskip("model_tiers", exc_type=ImportError)
+
+
+@pytest.fixture
+def tiers(monkeypatch):
+    monkeypatch.setitem(model_tiers.TIERS, "large", "big-model")
+    monkeypatch.setitem(model_tiers.TIERS, "fast", "small-model")
+    for role in ("routing", "planner", "email_assistant"):
+        monkeypatch.delenv(f"MODEL_{role.upper()}", raising=False)
+    return monkeypatch
+
+
+def test_classification_roles_use_the_fast_tier(tiers):
+    assert model_tiers.model_for("routing") == "small-model"
+    assert model_tiers.model_for("planner") == "small-model"
+    assert model_tiers.model_for("email_assistant") == "big-model"
+
+
+def test_role_override_names_a_tier_or_a_model(tiers):
+    tiers.setenv("MODEL_PLANNER", "large")
+    tiers.setenv("MODEL_EMAIL_ASSISTANT", "custom/model")
+    assert model_tiers.model_for("planner") == "big-model"
+    assert model_tiers.model_for("email_assistant") == "custom/model"
+
+
+def test_subagent_specs_only_add_model_settings_when_the_model_differs(tiers):
+    tiers.setenv("MODEL_SEARCH_ASSISTANT", "fast")
+    specs = model_tiers.subagent_specs([{"name": "email_assistant"}, {"name": "search_assistant"}], model_factory=lambda role: f"model:{role}")
+    email, search = specs
+    assert email["model"] == "model:email_assistant"
+    assert email["model_settings"]["model"] == "big-model"
+    assert search["model"] == "model:search_assistant"
+    assert "model_settings" not in search
+
+
+def test_usage_tracker_summarizes_and_logs(tmp_path):
+    log = tmp_path / "usage.jsonl"
+    tracker = model_tiers.UsageTracker(str(log))
+    tracker.record("planner", "small-model", 100, 50, 10)
+    tracker.record("planner", "small-model", 300, 70, 20, error="boom")
+    summary = tracker.summary()["planner"]
+    assert summary["calls"] == 2
+    assert summary["errors"] == 1
+    assert summary["prompt_tokens"] == 120
+    assert summary["completion_tokens"] == 30
+    lines = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [line.get("error") for line in lines] == [None, "boom"]
@@ -0,0 +1,99 @@
+import os
+import sys
+import smtplib
+import urllib.error
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "servers"))
+
+import outbound  # noqa: E402
+from outbound import NotDelivered, OutboundError, OutboundScheduler  # noqa: E402
+
+
+class _Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class _HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = _Response(status_code, headers)
+
+
+def _flaky(errors, result="ok"):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return fn, calls
+
+
+def _scheduler(classify=outbound.classify_http):
+    return OutboundScheduler("test", classify, rate=1000, burst=1000, max_attempts=3, base_delay=0, max_delay=0)
+
+
+def test_classify_http_rate_limit_reads_retry_after():
+    assert outbound.classify_http(_HTTPError(429, {"Retry-After": "5"})) == (outbound.RATE_LIMITED, 5.0)
+
+
+def test_classify_http_statuses():
+    assert outbound.classify_http(_HTTPError(401))[0] == outbound.AUTH_FAILED
+    assert outbound.classify_http(_HTTPError(400))[0] == outbound.INVALID_REQUEST
+    assert outbound.classify_http(_HTTPError(503))[0] == outbound.UNAVAILABLE
+
+
+def test_classify_http_only_treats_network_errors_as_outages():
+    assert outbound.classify_http(ConnectionResetError())[0] == outbound.UNAVAILABLE
+    assert outbound.classify_http(PermissionError())[0] == outbound.UNKNOWN
+    assert outbound.classify_http(urllib.error.URLError(ConnectionRefusedError()))[0] == outbound.UNAVAILABLE
+    assert outbound.classify_http(TimeoutError())[0] == outbound.TIMEOUT
+
+
+def test_classify_smtp():
+    assert outbound.classify_smtp(smtplib.SMTPAuthenticationError(535, b"bad"))[0] == outbound.AUTH_FAILED
+    assert outbound.classify_smtp(smtplib.SMTPDataError(421, b"4.7.0 Try again later"))[0] == outbound.RATE_LIMITED
+    assert outbound.classify_smtp(smtplib.SMTPDataError(550, b"5.4.5 Daily user sending limit exceeded"))[0] == outbound.QUOTA_EXCEEDED
+    assert outbound.classify_smtp(smtplib.SMTPServerDisconnected())[0] == outbound.UNAVAILABLE
+    assert outbound.classify_smtp(PermissionError())[0] == outbound.UNKNOWN
+
+
+def test_call_retries_transient_errors():
+    fn, calls = _flaky([TimeoutError(), ConnectionResetError()])
+    assert _scheduler().call(fn) == "ok"
+    assert len(calls) == 3
+
+
+def test_call_does_not_retry_local_errors():
+    fn, calls = _flaky([PermissionError("denied")])
+    with pytest.raises(OutboundError) as raised:
+        _scheduler().call(fn)
+    assert len(calls) == 1 and raised.value.code == outbound.UNKNOWN
+
+
+def test_send_does_not_retry_possible_deliveries():
+    fn, calls = _flaky([TimeoutError()])
+    with pytest.raises(OutboundError) as raised:
+        _scheduler().send(fn)
+    assert len(calls) == 1
+    assert raised.value.code == outbound.TIMEOUT and raised.value.to_dict()["retryable"] is False
+
+
+def test_send_retries_failures_before_delivery_and_rate_limits():
+    fn, calls = _flaky([NotDelivered(ConnectionRefusedError()), _HTTPError(429)])
+    assert _scheduler().send(fn) == "ok"
+    assert len(calls) == 3
+
+
+def test_send_reports_the_original_error_for_not_delivered():
+    fn, _ = _flaky([NotDelivered(smtplib.SMTPAuthenticationError(535, b"bad"))] * 3)
+    with pytest.raises(OutboundError) as raised:
+        _scheduler(outbound.classify_smtp).send(fn)
+    assert raised.value.code == outbound.AUTH_FAILED
+    assert isinstance(raised.value.__cause__, smtplib.SMTPAuthenticationError)
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("mcp")
+pytest.importorskip("langchain_core")
+
+from research_cache import ResearchCache, normalize_question, words_covered  # noqa: E402
+
+TTL = {"general": 3600, "news": 3600, "finance": 3600}
+
+
+def test_normalize_drops_filler_words():
+    assert normalize_question("What is the current inflation rate in Nigeria?") == "inflation rate nigeria"
+
+
+def test_reworded_question_hits_by_similarity():
+    cache = ResearchCache(TTL)
+    cache.put("What is the inflation rate in Nigeria?", "About 30%.")
+    hit = cache.get("nigerian inflation rates")
+    assert hit["summary"] == "About 30%."
+    assert hit["similarity"] < 1.0
+    assert cache.stats["similar_hits"] == 1
+
+
+def test_extra_qualifier_does_not_match_the_broader_question():
+    assert not words_covered("ghana inflation rate", "inflation rate")
+    cache = ResearchCache(TTL)
+    cache.put("inflation rate", "Broad answer.")
+    assert cache.get("Ghana inflation rate") is None
+
+
+def test_numbers_and_topic_must_match():
+    cache = ResearchCache(TTL)
+    cache.put("Nigeria inflation rate 2023", "2023 answer.")
+    assert cache.get("Nigeria inflation rate 2024") is None
+    cache.put("labour law changes", "Law answer.", topic="general")
+    assert cache.get("labour law changes", topic="news") is None
+
+
+def test_expired_entries_are_dropped():
+    cache = ResearchCache({"general": 0, "finance": 0})
+    cache.put("labour law changes", "Old answer.")
+    assert cache.get("labour law changes") is None
+    assert cache.stats["expired"] == 1
+
+
+def test_entries_persist_and_are_bounded(tmp_path):
+    path = str(tmp_path / "research.json")
+    cache = ResearchCache(TTL, max_size=2, path=path)
+    for question in ("labour law changes", "pension reform", "tax brackets"):
+        cache.put(question, f"Answer on {question}.")
+    reloaded = ResearchCache(TTL, max_size=2, path=path)
+    assert reloaded.get("labour law changes") is None
+    assert reloaded.get("tax brackets")["summary"] == "Answer on tax brackets."
@@ -0,0 +1,53 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "servers"))
+
+from search_compaction import compact_results, estimate_tokens, normalize_url, strip_boilerplate  # noqa: E402
+
+LAW = "The new labour law raises the minimum wage to 70,000 naira per month for all employers. "
+
+
+def _result(url, content, score=0.5, title="Title"):
+    return {"title": title, "url": url, "content": content, "score": score}
+
+
+def test_normalize_url_ignores_mirrors_and_tracking():
+    assert normalize_url("https://www.example.com/news/?utm_source=x&id=3#top") == normalize_url("http://example.com/news?id=3")
+    assert normalize_url("https://example.com/news?id=3") != normalize_url("https://example.com/news?id=4")
+
+
+def test_strip_boilerplate_drops_page_furniture():
+    text = "Home | News | About\nSubscribe to our newsletter today!\n" + LAW + "\n© 2024 All rights reserved."
+    assert strip_boilerplate(text) == [LAW.strip()]
+
+
+def test_duplicate_urls_and_sentences_are_dropped():
+    payload = {"results": [
+        _result("https://example.com/law", LAW),
+        _result("https://www.example.com/law/?utm_campaign=x", LAW),
+        _result("https://other.example.org/law", LAW + "Unions welcomed the increase after months of negotiation."),
+    ]}
+    compact = compact_results("labour law minimum wage", payload, max_tokens=800)
+    assert [r["url"] for r in compact["results"]] == ["https://example.com/law", "https://other.example.org/law"]
+    assert compact["omitted"] == 1
+    assert compact["results"][1]["snippet"] == "Unions welcomed the increase after months of negotiation."
+
+
+def test_relevant_results_rank_first():
+    payload = {"results": [
+        _result("https://a.example.com", "Football results from the weekend were surprising to many fans.", score=0.6),
+        _result("https://b.example.com", LAW, score=0.5),
+    ]}
+    compact = compact_results("minimum wage labour law", payload, max_tokens=800)
+    assert compact["results"][0]["url"] == "https://b.example.com"
+
+
+def test_output_stays_under_the_token_cap():
+    long_text = " ".join(f"Sentence {i} explains the minimum wage labour law in more detail for readers." for i in range(200))
+    payload = {"answer": "Wages went up.", "results": [_result(f"https://example.com/{i}", long_text, score=1 - i / 20) for i in range(20)]}
+    compact = compact_results("minimum wage labour law", payload, max_tokens=300, sentences_per_result=20)
+    assert estimate_tokens(json.dumps(compact)) <= 300
+    assert compact["answer"] == "Wages went up."
+    assert compact["omitted"] > 0
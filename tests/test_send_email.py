@@ -0,0 +1,110 @@
+import os
+import sys
+import smtplib
+from email.mime.text import MIMEText
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "servers"))
+
+pytest.importorskip("mcp")
+pytest.importorskip("dotenv")
+
+from outbound import NotDelivered  # noqa: E402
+from send_email_server import SMTPConnectionPool  # noqa: E402
+
+
+class FakeSMTP:
+    def __init__(self, extensions, fail_with=None):
+        self.extensions = set(extensions)
+        self.fail_with = fail_with
+        self.events = []
+        self.closed = False
+
+    def ehlo(self):
+        self.events.append("ehlo")
+
+    def has_extn(self, name):
+        return name in self.extensions
+
+    def starttls(self, context=None):
+        self.events.append("starttls")
+        self.extensions.discard("starttls")
+
+    def login(self, user, password):
+        self.events.append("login")
+
+    def send_message(self, msg):
+        if self.fail_with:
+            raise self.fail_with
+        self.events.append("send")
+
+    def noop(self):
+        return (250, b"OK")
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    created = []
+
+    def connect(extensions=("auth",), fail_with=None):
+        def factory(host, port, timeout=None):
+            server = FakeSMTP(extensions, fail_with)
+            created.append(server)
+            return server
+
+        monkeypatch.setattr(smtplib, "SMTP", factory)
+        return SMTPConnectionPool("smtp.example.com", 587, use_ssl=False)
+
+    connect.created = created
+    return connect
+
+
+def _message():
+    msg = MIMEText("hi")
+    msg["From"], msg["To"], msg["Subject"] = "blaqie@example.com", "ada@example.com", "s"
+    return msg
+
+
+def test_upgrades_with_starttls_before_logging_in(connections):
+    pool = connections(extensions=("starttls", "auth"))
+    pool.send("blaqie@example.com", "secret", _message())
+    assert connections.created[0].events == ["ehlo", "starttls", "ehlo", "login", "send"]
+
+
+def test_missing_auth_fails_instead_of_sending_unauthenticated(connections):
+    pool = connections(extensions=())
+    with pytest.raises(NotDelivered) as excinfo:
+        pool.send("blaqie@example.com", "secret", _message())
+    assert isinstance(excinfo.value.cause, smtplib.SMTPNotSupportedError)
+    assert connections.created[0].closed
+    assert "send" not in connections.created[0].events
+
+
+def test_idle_connection_is_reused(connections):
+    pool = connections()
+    pool.send("blaqie@example.com", "secret", _message())
+    pool.send("blaqie@example.com", "secret", _message())
+    assert len(connections.created) == 1
+
+
+def test_rejected_recipient_keeps_the_connection(connections):
+    pool = connections(fail_with=smtplib.SMTPRecipientsRefused({"ada@example.com": (550, b"no such user")}))
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pool.send("blaqie@example.com", "secret", _message())
+    assert not connections.created[0].closed
+    assert pool._acquire(("blaqie@example.com", "secret")) is connections.created[0]
+
+
+def test_disconnect_discards_the_connection(connections):
+    pool = connections(fail_with=smtplib.SMTPServerDisconnected("gone"))
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        pool.send("blaqie@example.com", "secret", _message())
+    assert connections.created[0].closed
+    assert pool._acquire(("blaqie@example.com", "secret")) is None
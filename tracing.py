@@ -0,0 +1,284 @@
+# latency tracing: per-turn spans for LLM calls, MCP tool calls and HITL waits
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import argparse
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("blaqie_current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "component", "span_id", "trace_id", "parent_id", "start", "_t0", "attrs")
+
+    def __init__(self, name: str, component: str, parent: Optional["Span"] = None, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.component = component
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.attrs = dict(attrs or {})
+
+    def to_record(self, status: str, error: Optional[str] = None) -> Dict[str, Any]:
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "component": self.component,
+            "start": round(self.start, 6),
+            "duration_ms": round((time.perf_counter() - self._t0) * 1000, 3),
+            "status": status,
+        }
+        if error:
+            record["error"] = error
+        if self.attrs:
+            record["attrs"] = self.attrs
+        return record
+
+
+class JsonlSink:
+    """Appends one JSON line per finished span."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def export(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class WandbExporter:
+    """Logs span durations to a wandb run (and weave, when it is installed) for dashboards."""
+
+    def __init__(self, project: str):
+        import wandb
+
+        self._wandb = wandb
+        self._run = wandb.init(project=project, job_type="latency-trace", reinit=True)
+        try:
+            import weave
+
+            weave.init(project)
+        except Exception as e:
+            print(f"WARNING: weave tracing unavailable, logging span metrics only: {str(e)}")
+
+    def export(self, record: Dict[str, Any]):
+        self._run.log({
+            f"latency/{record['component']}/{record['name']}_ms": record["duration_ms"],
+            f"latency/{record['component']}_ms": record["duration_ms"],
+        })
+
+    def close(self):
+        self._run.finish()
+
+
+class Tracer:
+    """Records nested timing spans. Does nothing until a sink is added."""
+
+    def __init__(self):
+        self.sinks: List[Any] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def current(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def start_span(self, name: str, component: str, parent: Optional[Span] = None, **attrs) -> Optional[Span]:
+        """Starts a span without making it current (for callbacks that end it elsewhere)."""
+        if not self.sinks:
+            return None
+        return Span(name, component, parent or _current_span.get(), attrs)
+
+    def end_span(self, span: Optional[Span], status: str = "ok", error: Optional[str] = None):
+        if span is None:
+            return
+        record = span.to_record(status, error)
+        for sink in self.sinks:
+            try:
+                sink.export(record)
+            except Exception as e:
+                print(f"WARNING: Failed to export span '{span.name}': {str(e)}")
+
+    @contextmanager
+    def span(self, name: str, component: str, **attrs) -> Iterator[Optional[Span]]:
+        """Times the enclosed block; spans opened inside it become its children."""
+        span = self.start_span(name, component, **attrs)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, "error", repr(e))
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span.reset(token)
+
+    def close(self):
+        for sink in self.sinks:
+            close = getattr(sink, "close", None)
+            if close:
+                close()
+        self.sinks = []
+
+
+tracer = Tracer()
+
+
+def configure_from_env():
+    """Enables tracing from TRACE_FILE (JSONL sink) and TRACE_WANDB_PROJECT (optional exporter)."""
+    trace_file = os.getenv("TRACE_FILE", "")
+    if trace_file:
+        tracer.add_sink(JsonlSink(trace_file))
+    wandb_project = os.getenv("TRACE_WANDB_PROJECT", "")
+    if wandb_project:
+        try:
+            tracer.add_sink(WandbExporter(wandb_project))
+        except Exception as e:
+            print(f"WARNING: wandb exporter disabled: {str(e)}")
+    return tracer
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Turns LangChain callbacks into spans: one per chat model call and one per tool call.
+
+    Calls to the deepagents `task` tool are recorded as subagent spans. Pass
+    `parent` when the run is not started inside a `tracer.span` block (e.g.
+    from an async generator).
+    """
+
+    run_inline = True
+
+    def __init__(self, tracer: Tracer, parent: Optional[Span] = None):
+        self.tracer = tracer
+        self.parent = parent
+        self._spans: Dict[UUID, Span] = {}
+
+    def _start(self, run_id: UUID, name: str, component: str, metadata: Optional[Dict[str, Any]], **attrs):
+        node = (metadata or {}).get("langgraph_node")
+        if node:
+            attrs["node"] = node
+        span = self.tracer.start_span(name, component, parent=self.parent, **attrs)
+        if span is not None:
+            self._spans[run_id] = span
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs):
+        model = (kwargs.get("invocation_params") or {}).get("model") or (serialized or {}).get("name", "llm")
+        self._start(run_id, "llm.ainvoke", "llm", metadata, model=model)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            span.attrs["prompt_tokens"] = usage.get("prompt_tokens")
+            span.attrs["completion_tokens"] = usage.get("completion_tokens")
+        self.tracer.end_span(span)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self.tracer.end_span(self._spans.pop(run_id, None), "error", repr(error))
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, metadata=None, inputs=None, **kwargs):
+        name = (serialized or {}).get("name", "tool")
+        if name == "task":
+            subagent = (inputs or {}).get("subagent_type", "unknown")
+            self._start(run_id, f"subagent.{subagent}", "subagent", metadata)
+        else:
+            self._start(run_id, f"tool.{name}", "tool", metadata)
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs):
+        self.tracer.end_span(self._spans.pop(run_id, None))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self.tracer.end_span(self._spans.pop(run_id, None), "error", repr(error))
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, min(len(ordered), math.ceil(q / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def summarize(records: List[Dict[str, Any]], by: str = "component") -> Dict[str, Dict[str, float]]:
+    groups: Dict[str, List[float]] = {}
+    for record in records:
+        groups.setdefault(record.get(by, "unknown"), []).append(record["duration_ms"])
+    summary = {}
+    for key, durations in groups.items():
+        durations.sort()
+        summary[key] = {
+            "count": len(durations),
+            "p50_ms": percentile(durations, 50),
+            "p95_ms": percentile(durations, 95),
+            "p99_ms": percentile(durations, 99),
+            "total_ms": round(sum(durations), 3),
+        }
+    return summary
+
+
+def load_records(path: str, since: Optional[float] = None) -> List[Dict[str, Any]]:
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if since is None or record.get("start", 0) >= since:
+                records.append(record)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report p50/p95/p99 latency per component from a span JSONL file")
+    parser.add_argument("path", nargs="?", default=os.getenv("TRACE_FILE") or os.path.join(".cache", "traces.jsonl"))
+    parser.add_argument("--by", choices=["component", "name"], default="component", help="Group spans by component or by span name")
+    parser.add_argument("--hours", type=float, default=None, help="Only include spans from the last N hours")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    since = time.time() - args.hours * 3600 if args.hours else None
+    try:
+        records = load_records(args.path, since)
+    except OSError as e:
+        print(f"ERROR: Cannot read trace file: {str(e)}")
+        sys.exit(1)
+    summary = summarize(records, args.by)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"{args.by:<32} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'total ms':>12}")
+    for key, row in sorted(summary.items(), key=lambda item: -item[1]["total_ms"]):
+        print(f"{key:<32} {row['count']:>7} {row['p50_ms']:>10.1f} {row['p95_ms']:>10.1f} {row['p99_ms']:>10.1f} {row['total_ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()